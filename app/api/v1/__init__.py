@@ -1,6 +1,8 @@
-from .endpoints import protein
+from .endpoints import jobs, protein, xref
 
 from fastapi import APIRouter
 
 router = APIRouter()
 router.include_router(protein.router, prefix="/protein", tags=["uniprot"])
+router.include_router(xref.router, prefix="/xref", tags=["xref"])
+router.include_router(jobs.router, prefix="/jobs", tags=["jobs"])
@@ -0,0 +1,89 @@
+import json
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
+from core.config import Config, get_config
+from schema.job import JobRequest
+from service.jobs import JobManager, get_job_manager, result_line
+
+router = APIRouter()
+
+
+def existing_job(job_id: str, jobs: JobManager) -> dict:
+    status = jobs.status(job_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail="Job not found.")
+    return status
+
+
+@router.post("", status_code=202, summary="Submit a Batch Job")
+def submit_job(
+    request: JobRequest,
+    jobs: JobManager = Depends(get_job_manager),
+    cfg: Config = Depends(get_config),
+):
+    """
+    Queue a batch of protein IDs to be resolved in the background.
+
+    Args:
+        request (JobRequest): The protein IDs, and whether results should
+            include features, isoforms and disease associations.
+
+    Returns:
+        dict: The job ID and initial status.
+    """
+    if len(request.protein_ids) > cfg.job_max_ids:
+        raise HTTPException(
+            status_code=400,
+            detail=f"A job can hold at most {cfg.job_max_ids} IDs."
+        )
+    if not all(protein_id.isalnum() for protein_id in request.protein_ids):
+        raise HTTPException(
+            status_code=400,
+            detail="Invalid protein ID format."
+        )
+
+    job_id = jobs.submit(request.protein_ids, request.full)
+    return jobs.status(job_id)
+
+
+@router.get("/{job_id}", summary="Retrieve Batch Job Status")
+def retrieve_job(job_id: str, jobs: JobManager = Depends(get_job_manager)):
+    """
+    Poll the progress of a job: the number of items done and failed so far,
+    as of its last checkpoint.
+    """
+    return existing_job(job_id, jobs)
+
+
+@router.get("/{job_id}/events", summary="Follow Batch Job Progress")
+async def follow_job(job_id: str, jobs: JobManager = Depends(get_job_manager)):
+    """
+    Stream a job's progress as server-sent events, one per change, ending
+    once the job completes.
+    """
+    existing_job(job_id, jobs)
+
+    async def events():
+        async for status in jobs.events(job_id):
+            yield f"data: {json.dumps(status)}\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+
+@router.get("/{job_id}/results", summary="Download Batch Job Results")
+def download_job_results(job_id: str, jobs: JobManager = Depends(get_job_manager)):
+    """
+    Stream the results processed so far as newline-delimited JSON, in
+    submission order, one line per protein ID.
+    """
+    existing_job(job_id, jobs)
+
+    async def lines():
+        for item in jobs.store.iter_results(job_id):
+            yield result_line(*item)
+
+    return StreamingResponse(
+        lines(),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="{job_id}.ndjson"'},
+    )
@@ -1,62 +1,368 @@
+import asyncio
 import logging
-from fastapi import APIRouter, Depends, HTTPException
-from service.pdb.fetch import PDBFetchService
-from service.uniprot import UniprotFetchService
+import time
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from core.config import Config, get_config
+from schema.protein import HEAVY_FIELDS, AlignmentInput, AlignmentRequest, ProteinResponse, SimilarityQuery
+from service.alignment import AlignmentCache, get_alignment_cache
+from service.bcif import parse_bcif, structure_summary
+from service.cache import CachedProtein
+from service.fasta import parse_fasta
+from service.features import paginate
+from service.resolver import ProteinResolver
+from service.similarity import KmerIndex, get_kmer_index
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
 
-@router.get("/{protein_id}", summary="Retrieve Protein With ID")
+async def resolve_protein(protein_id: str, resolver: ProteinResolver) -> Optional[CachedProtein]:
+    if not protein_id.isalnum():
+        raise HTTPException(
+            status_code=400,
+            detail="Invalid protein ID format."
+        )
+
+    try:
+        return await resolver.resolve_entry(protein_id)
+    except Exception as e:
+        logger.error(f"Error fetching data for protein ID {protein_id}: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+async def resolve_existing_protein(protein_id: str, resolver: ProteinResolver) -> CachedProtein:
+    resolved = await resolve_protein(protein_id, resolver)
+    if resolved is None:
+        raise HTTPException(status_code=404, detail="Protein not found.")
+    return resolved
+
+
+@router.get("/{protein_id}", summary="Retrieve Protein With ID", response_model=Optional[ProteinResponse])
 async def retrieve_protein_by_id(
     protein_id: str,
-    pdb_fetch_service: PDBFetchService = Depends(),
-    uniprot_fetch_service: UniprotFetchService = Depends()
+    full: bool = Query(False, description="Include features, isoforms and disease associations"),
+    resolver: ProteinResolver = Depends(),
 ):
     """
     Fetch protein data from the PDB or UNIPROT API using the given protein ID.
 
+    Features, isoforms and disease associations are left out unless `full`
+    is set; they are served page by page from their own endpoints.
+
     Args:
         protein_id (str): The PDB ID of the protein.
+        full (bool): Whether to include the heavy lists.
 
     Returns:
-        dict: Protein structure and parsed data.
+        ProteinResponse: Protein structure and parsed data, encoded directly
+        by the model's serializer.
     """
 
-    if not protein_id.isalnum():
+    resolved = await resolve_protein(protein_id, resolver)
+
+    if resolved is None:
+        return None
+
+    data = resolved.materialize() if full else resolved.summary()
+    body = ProteinResponse.model_construct(protein_id=protein_id, data=data)
+    return Response(content=body.to_json(full), media_type="application/json")
+
+
+@router.get("/{protein_id}/features", summary="Retrieve Protein Features")
+async def retrieve_protein_features(
+    protein_id: str,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    type: Optional[str] = Query(None, description="Only features of this type, e.g. Domain"),
+    start: Optional[int] = Query(None, ge=1, description="Only features ending at or after this position"),
+    end: Optional[int] = Query(None, ge=1, description="Only features starting at or before this position"),
+    resolver: ProteinResolver = Depends(),
+):
+    """
+    Page through the sequence features of a protein.
+
+    Args:
+        protein_id (str): The UniProt or PDB ID of the protein.
+        offset (int): Index of the first feature to return.
+        limit (int): Maximum number of features to return.
+        type (str): Only return features of this type.
+        start (int): Start of the sequence range features must overlap.
+        end (int): End of the sequence range features must overlap.
+
+    Returns:
+        dict: The total number of matching features and the requested page.
+    """
+
+    features = (await resolve_existing_protein(protein_id, resolver)).features
+    page = paginate(features.select(type, start, end), offset, limit)
+    page["items"] = features.to_features(page["items"])
+    return {"protein_id": protein_id, **page}
+
+
+@router.get("/{protein_id}/isoforms", summary="Retrieve Protein Isoforms")
+async def retrieve_protein_isoforms(
+    protein_id: str,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    resolver: ProteinResolver = Depends(),
+):
+    """
+    Page through the isoforms of a protein.
+
+    Returns:
+        dict: The total number of isoforms and the requested page.
+    """
+
+    isoforms = (await resolve_existing_protein(protein_id, resolver)).isoforms()
+    return {"protein_id": protein_id, **paginate(isoforms, offset, limit)}
+
+
+@router.get("/{protein_id}/diseases", summary="Retrieve Protein Disease Associations")
+async def retrieve_protein_diseases(
+    protein_id: str,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    resolver: ProteinResolver = Depends(),
+):
+    """
+    Page through the disease associations of a protein.
+
+    Returns:
+        dict: The total number of disease associations and the requested page.
+    """
+
+    parsed_data = (await resolve_existing_protein(protein_id, resolver)).data
+    return {"protein_id": protein_id, **paginate(parsed_data.disease_associations, offset, limit)}
+
+
+@router.get("/{protein_id}/sequence", summary="Retrieve Protein Sequence")
+async def retrieve_protein_sequence(
+    protein_id: str,
+    start: int = Query(1, ge=1, description="First residue, 1-based"),
+    end: Optional[int] = Query(None, ge=1, description="Last residue, inclusive"),
+    resolver: ProteinResolver = Depends(),
+):
+    """
+    Fetch the sequence of a protein, or a window of it. Only the requested
+    window is decoded from the cached, packed sequence.
+
+    Args:
+        protein_id (str): The UniProt ID of the protein.
+        start (int): First residue, 1-based.
+        end (int): Last residue, inclusive; defaults to the end of the sequence.
+
+    Returns:
+        dict: The FASTA header, the sequence length and the residues of the window.
+    """
+
+    sequence = (await resolve_existing_protein(protein_id, resolver)).sequence
+    if sequence is None:
+        raise HTTPException(status_code=404, detail="Protein has no sequence.")
+
+    end = len(sequence) if end is None else min(end, len(sequence))
+    if start > end:
+        raise HTTPException(status_code=400, detail="Invalid sequence range.")
+
+    return {
+        "protein_id": protein_id,
+        "header": sequence.header,
+        "length": len(sequence),
+        "start": start,
+        "end": end,
+        "sequence": sequence.slice(start, end)
+    }
+
+
+@router.get("/{protein_id}/structures", summary="Retrieve Protein With Its PDB Structures")
+async def retrieve_protein_structures(
+    protein_id: str,
+    limit: Optional[int] = Query(None, ge=1, description="Only fetch the first N structures"),
+    deadline: Optional[float] = Query(None, gt=0, le=60, description="Seconds before returning partial results"),
+    resolver: ProteinResolver = Depends(),
+    cfg: Config = Depends(get_config),
+):
+    """
+    Fetch a UniProt entry together with all of its PDB structures.
+
+    The structures are fetched concurrently. When the deadline expires the
+    response is returned with whatever has been resolved; every structure
+    carries its own status ("ok", "error" or "timeout").
+
+    Args:
+        protein_id (str): The UniProt ID of the protein.
+        limit (int): Only fetch the first N structures.
+        deadline (float): Seconds to spend on the whole request.
+
+    Returns:
+        dict: The protein data and the per-structure results.
+    """
+
+    if not protein_id.isalnum() or len(protein_id) != 6:
+        raise HTTPException(
+            status_code=400,
+            detail="Invalid protein ID format."
+        )
+
+    deadline = deadline or cfg.structures_deadline
+    started = time.monotonic()
+
+    try:
+        parsed_data = await asyncio.wait_for(resolver.resolve(protein_id), timeout=deadline)
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail="Timed out fetching the UniProt entry.")
+    except Exception as e:
+        logger.error(f"Error fetching data for protein ID {protein_id}: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+    pdb_ids = parsed_data.pdb_ids[:limit] if limit else parsed_data.pdb_ids
+    structures = await resolver.resolve_structures(
+        pdb_ids,
+        concurrency=cfg.structures_concurrency,
+        timeout=deadline - (time.monotonic() - started),
+    )
+
+    return {
+        "protein_id": protein_id,
+        "data": parsed_data.model_dump(exclude=HEAVY_FIELDS),
+        "structures": structures
+    }
+
+
+@router.get("/{protein_id}/structure", summary="Summarise A PDB Structure")
+async def retrieve_structure_summary(
+    protein_id: str,
+    resolver: ProteinResolver = Depends(),
+):
+    """
+    Fetch the coordinates of a PDB entry as BinaryCIF and summarise them:
+    atom and model counts, chains with their atom and residue counts,
+    element counts, centroid and bounding box. The atom_site columns are
+    decoded into NumPy arrays, so large assemblies stay cheap.
+
+    Args:
+        protein_id (str): The PDB ID of the entry.
+
+    Returns:
+        dict: The structure summary.
+    """
+
+    if not protein_id.isalnum() or len(protein_id) != 4:
         raise HTTPException(
             status_code=400,
             detail="Invalid protein ID format."
         )
 
-    match len(protein_id):
-        case 6:
-            try:
-                raw_data = await uniprot_fetch_service.fetch_protein_data(protein_id)
-
-                # Extracting protein structure; Figure this part out with uniprot
-
-                parsed_data = uniprot_fetch_service.parse_protein_data(raw_data)
-                return {
-                    "protein_id": protein_id,
-                    "data": parsed_data
-                }
-
-            except Exception as e:
-                logger.error(f"Error fetching data for protein ID {protein_id}: {e}")
-                raise HTTPException(status_code=500, detail=str(e))
-        case 4:
-
-            try:
-                raw_data = await pdb_fetch_service.fetch_protein_data(protein_id)
-
-                # Extracting protein structure
-                parsed_data = await pdb_fetch_service.parse_protein_data(raw_data)
-                return {
-                    "protein_id": protein_id,
-                    "data": parsed_data
-                }
-
-            except Exception as e:
-                logger.error(f"Error fetching data for protein ID {protein_id}: {e}")
-                raise HTTPException(status_code=500, detail=str(e))
+    try:
+        content = await resolver.pdb_fetch_service.fetch_structure(protein_id)
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error fetching structure for PDB ID {protein_id}: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+    # Decoding is CPU-bound for large entries, so kept off the event loop
+    try:
+        categories = await asyncio.to_thread(parse_bcif, content, ("atom_site",))
+        summary = structure_summary(categories["atom_site"])
+    except Exception as e:
+        logger.error(f"Error decoding structure for PDB ID {protein_id}: {e}")
+        raise HTTPException(status_code=502, detail="Invalid BinaryCIF structure.")
+
+    return {
+        "protein_id": protein_id,
+        "bytes": len(content),
+        **summary
+    }
+
+
+@router.post("/similar", summary="Find Similar Proteins")
+async def find_similar_proteins(
+    query: SimilarityQuery,
+    resolver: ProteinResolver = Depends(),
+    index: KmerIndex = Depends(get_kmer_index),
+):
+    """
+    Find the already resolved proteins whose sequences share the most k-mers
+    with a query sequence, given either directly or as a protein ID.
+
+    Args:
+        query (SimilarityQuery): A sequence (plain or FASTA) or a protein
+            ID, and the number of hits to return.
+
+    Returns:
+        dict: The hits, best first, with their shared k-mer counts.
+    """
+
+    if query.sequence:
+        residues = parse_fasta(query.sequence.strip())[1]
+    elif query.protein_id:
+        sequence = (await resolve_existing_protein(query.protein_id, resolver)).sequence
+        if sequence is None:
+            raise HTTPException(status_code=404, detail="Protein has no sequence.")
+        residues = sequence.residues()
+    else:
+        raise HTTPException(status_code=400, detail="Either sequence or protein_id is required.")
+
+    return {
+        "k": index.k,
+        "indexed": len(index),
+        "hits": index.search(residues, query.limit, exclude=query.protein_id)
+    }
+
+
+async def alignment_residues(item: AlignmentInput, resolver: ProteinResolver) -> str:
+    if item.sequence:
+        return parse_fasta(item.sequence.strip())[1]
+    if not item.protein_id:
+        raise HTTPException(status_code=400, detail="Either sequence or protein_id is required.")
+
+    pdb_id, _, chain = item.protein_id.replace("_", ".").partition(".")
+    if len(pdb_id) == 4 and pdb_id.isalnum():
+        try:
+            _, residues = await resolver.pdb_fetch_service.fetch_chain_sequence(pdb_id, chain or None)
+        except LookupError as e:
+            raise HTTPException(status_code=404, detail=str(e))
+        except Exception as e:
+            logger.error(f"Error fetching sequence for PDB ID {item.protein_id}: {e}")
+            raise HTTPException(status_code=500, detail=str(e))
+        return residues
+
+    sequence = (await resolve_existing_protein(item.protein_id, resolver)).sequence
+    if sequence is None:
+        raise HTTPException(status_code=404, detail="Protein has no sequence.")
+    return sequence.residues()
+
+
+@router.post("/align", summary="Align Two Proteins")
+async def align_proteins(
+    request: AlignmentRequest,
+    resolver: ProteinResolver = Depends(),
+    alignments: AlignmentCache = Depends(get_alignment_cache),
+):
+    """
+    Align two proteins, each given as a UniProt accession, a PDB ID or
+    chain ("4HHB.A"), or a raw sequence, using BLOSUM62 and a linear gap
+    penalty. Results are cached per sequence pair.
+
+    Args:
+        request (AlignmentRequest): The two proteins, the alignment mode
+            ("global" or "local") and the gap penalty.
+
+    Returns:
+        dict: The score, identity and aligned sequences.
+    """
+
+    first = await alignment_residues(request.first, resolver)
+    second = await alignment_residues(request.second, resolver)
+    if not first or not second:
+        raise HTTPException(status_code=400, detail="Cannot align an empty sequence.")
+
+    # CPU-bound for long sequences, so kept off the event loop
+    result = await asyncio.to_thread(
+        alignments.align, first, second, request.mode, request.gap_penalty)
+    return {
+        "first": request.first.protein_id,
+        "second": request.second.protein_id,
+        **result
+    }
@@ -0,0 +1,31 @@
+from fastapi import APIRouter, Depends, HTTPException
+from service.xref import CrossReferenceIndex, get_xref_index
+
+router = APIRouter()
+
+
+@router.get("/{protein_id}", summary="Map Between PDB IDs and UniProt Accessions")
+def retrieve_cross_references(
+    protein_id: str,
+    xref: CrossReferenceIndex = Depends(get_xref_index),
+):
+    """
+    Look up the PDB structures of a UniProt accession, or the UniProt
+    accessions of a PDB entry, from the local cross-reference index.
+
+    Args:
+        protein_id (str): A UniProt accession or 4 character PDB ID.
+
+    Returns:
+        dict: The matching PDB IDs and UniProt accessions.
+    """
+    if not protein_id.isalnum():
+        raise HTTPException(
+            status_code=400,
+            detail="Invalid protein ID format."
+        )
+
+    return {
+        "protein_id": protein_id,
+        **xref.lookup(protein_id)
+    }
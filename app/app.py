@@ -1,19 +1,101 @@
+import asyncio
+import logging
 from contextlib import asynccontextmanager
 from typing import Annotated
 
-from fastapi import Depends, FastAPI
+from fastapi import Depends, FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
 
 from core.config import Config, get_config
+from core.lazy import preload
+from core.profiling import ProfilingMiddleware
 from api.v1 import router as v1_router
+from schema.base import build_models
+from service.cache import get_protein_cache, snapshot_periodically
+from service.jobs import get_job_manager
+from service.pdb.mirrors import get_mirror_router
+from service.shared_cache import acquire_leadership
+from service.similarity import get_kmer_index, load_sequence_index
+from service.sync import get_upstream_sync
+from service.warmup import CacheWarmer, get_cache_warmer
+from service.xref import get_xref_index, load_cross_references
+
+logger = logging.getLogger(__name__)
+
+
+def prewarm():
+    """
+    Load what the first requests would otherwise wait for: the lazily
+    imported HTTP client, NumPy and PDB schema, and the deferred validators.
+    """
+    preload("httpx", "numpy", "schema.pdb")
+    build_models()
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    _ = get_config()
+    cfg = get_config()
+    cache = get_protein_cache()
+    # Off the startup path: the server answers while this runs
+    prewarm_task = asyncio.create_task(asyncio.to_thread(prewarm))
+    # With several workers sharing a cache, once-per-host work (snapshots,
+    # access statistics, warm-up, resuming jobs) runs in one of them only
+    leader = not cfg.shared_cache_path or acquire_leadership(cfg.shared_cache_path)
+
+    snapshot_task = None
+    if cfg.cache_snapshot_path and leader:
+        restored = cache.restore(cfg.cache_snapshot_path)
+        logger.info(f"Restored {restored} cache entries from {cfg.cache_snapshot_path}")
+        if cfg.cache_snapshot_interval > 0:
+            snapshot_task = asyncio.create_task(snapshot_periodically(
+                cache, cfg.cache_snapshot_path, cfg.cache_snapshot_interval))
+
+    xref_task = None
+    if cfg.sifts_mapping_path or cfg.uniprot_store_path:
+        xref_task = asyncio.create_task(
+            asyncio.to_thread(load_cross_references, get_xref_index(), cfg))
+
+    # Cached entries are collected here, on the event loop that mutates them
+    sequence_task = asyncio.create_task(asyncio.to_thread(
+        load_sequence_index, get_kmer_index(), cfg,
+        [(key, cached) for key, cached, _, _ in cache.snapshot_entries()]))
+
+    # Resumes the jobs left unfinished by the previous run
+    jobs = get_job_manager()
+    jobs.start(resume=leader)
+
+    sync_task = None
+    if cfg.sync_interval > 0 and leader:
+        sync_task = asyncio.create_task(get_upstream_sync().run_periodically(cfg.sync_interval))
+
+    warmup_task = None
+    preload_ids = CacheWarmer.preload_ids(cfg, cache) if leader else []
+    if preload_ids:
+        warmup_task = get_cache_warmer().start(preload_ids)
 
     yield
 
+    await jobs.stop()
+    prewarm_task.cancel()
+    if warmup_task is not None:
+        warmup_task.cancel()
+    if sync_task is not None:
+        sync_task.cancel()
+    if xref_task is not None:
+        xref_task.cancel()
+    sequence_task.cancel()
+    if snapshot_task is not None:
+        snapshot_task.cancel()
+        # Lets a periodic write in progress finish before the final one
+        try:
+            await snapshot_task
+        except asyncio.CancelledError:
+            pass
+    if cfg.cache_snapshot_path and leader:
+        cache.snapshot(cfg.cache_snapshot_path)
+    if cfg.cache_stats_path and leader:
+        cache.save_access_stats(cfg.cache_stats_path)
+
 
 app = FastAPI(
     title="BioAPI service",
@@ -37,6 +119,12 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+
+# Profiling is opt-in; without it configured no middleware is installed
+config = get_config()
+if config.profiling_enabled:
+    app.add_middleware(ProfilingMiddleware, config=config)
+
 app.include_router(v1_router, prefix="/api/v1")
 
 
@@ -45,3 +133,22 @@ def read_settings(cfg: Annotated[Config, Depends(get_config)]):
     return {
         "service":  "up"
     }
+
+
+@app.get("/ready")
+def readiness(
+    response: Response,
+    cfg: Annotated[Config, Depends(get_config)],
+    warmer: Annotated[CacheWarmer, Depends(get_cache_warmer)],
+):
+    warmup = warmer.progress()
+    ready = warmup["complete"] or not cfg.warmup_block_readiness
+    if not ready:
+        response.status_code = 503
+    return {
+        "ready": ready,
+        "warmup": warmup,
+        "cache": get_protein_cache().stats(),
+        "pdb_mirrors": get_mirror_router().stats(),
+        "sync": get_upstream_sync().progress() if cfg.sync_interval > 0 else None,
+    }
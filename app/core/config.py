@@ -6,8 +6,92 @@ class Config(BaseSettings):
 
     redis_url: str = ''
 
+    # Upstream base URLs; empty means the services' public defaults
+    uniprot_base_url: str = ''
+    pdb_base_url: str = ''
+    # RCSB's BinaryCIF coordinates (models.rcsb.org)
+    pdb_models_base_url: str = ''
+    # RCSB's FASTA sequences (www.rcsb.org/fasta/entry)
+    pdb_fasta_base_url: str = ''
+
+    # Local SQLite store of imported UniProt entries, consulted before
+    # rest.uniprot.org (see service/uniprot/importer.py)
+    uniprot_store_path: str = ''
+
+    # SIFTS pdb_chain_uniprot.tsv(.gz) loaded into the PDB/UniProt index
+    sifts_mapping_path: str = ''
+
+    # PDB mirrors (rcsb, pdbe, pdbj) in order of preference; requests go to
+    # the fastest healthy one, racing the two fastest with pdb_mirror_race
+    pdb_mirrors: str = 'rcsb,pdbe,pdbj'
+    pdb_mirror_race: bool = False
+    pdb_mirror_timeout: float = 5
+    # Seconds after which a mirror not in use is probed again; 0 disables
+    pdb_mirror_probe_interval: float = 60
+    pdb_structure_timeout: float = 30
+
+    # Fan-out of /protein/{id}/structures to the PDB
+    structures_concurrency: int = 8
+    structures_deadline: float = 10
+
+    # k-mer length of the sequence similarity index
+    similarity_kmer_size: int = 4
+
+    # Alignment results kept, by sequence pair
+    alignment_cache_entries: int = 256
+
+    # Batch jobs; without a store path jobs are kept in memory only
+    job_store_path: str = ''
+    job_concurrency: int = 8
+    job_checkpoint_items: int = 100
+    job_max_ids: int = 200000
+
+    # In-process protein cache
+    cache_max_entries: int = 10000
+    cache_ttl: float = 3600
+    # Where access statistics are written on shutdown, for top-N preloading
+    cache_stats_path: str = ''
+    # Snapshot file restored at startup and written on shutdown, plus every
+    # cache_snapshot_interval seconds when that is non-zero
+    cache_snapshot_path: str = ''
+    cache_snapshot_interval: float = 0
+    # Cache segment shared by the worker processes of a multi-worker server
+    # (a file, ideally on /dev/shm); with it cache_max_entries only sizes
+    # each worker's small local tier
+    shared_cache_path: str = ''
+    shared_cache_size_mb: int = 256
+    shared_cache_shards: int = 64
+    # Distinct organisms, diseases, locations and feature types shared
+    # between cached entries
+    intern_max_entries: int = 100000
+
+    # Sync with upstream change lists (wwPDB weekly status, UniProt entry
+    # versions) every sync_interval seconds when non-zero; changed entries
+    # are refreshed (or only dropped without sync_refresh) and unchanged
+    # ones kept for sync_verified_ttl seconds
+    sync_interval: float = 0
+    sync_refresh: bool = True
+    sync_verified_ttl: float = 2592000
+
+    # Cache warm-up at startup
+    preload_manifest: str = ''
+    preload_top_n: int = 0
+    warmup_concurrency: int = 4
+    # Report not-ready from /ready until warm-up has finished
+    warmup_block_readiness: bool = False
+
+    # Request profiling; the middleware is only installed when either a
+    # token or a non-zero sample rate is configured.
+    profiling_token: str = ''
+    profiling_sample_rate: float = 0.0
+    profiling_dir: str = 'profiles'
+
     model_config = SettingsConfigDict(env_file='.env')
 
+    @property
+    def profiling_enabled(self) -> bool:
+        return bool(self.profiling_token) or self.profiling_sample_rate > 0
+
 
 # get_config retrieves the configuration detail for
 @lru_cache
@@ -0,0 +1,41 @@
+import importlib
+from types import ModuleType
+
+
+class LazyModule(ModuleType):
+    """
+    Stand-in for a module that is imported on first attribute access.
+
+    Used for heavy dependencies (NumPy, httpx) that only some requests
+    need, so they stay off the startup path. Any attribute access imports
+    the module, including accesses in annotations evaluated when a function
+    is defined, so modules using one put `from __future__ import
+    annotations` first. The import itself goes through `importlib`, whose
+    per-module locks make a first use from several threads safe.
+    """
+
+    def __getattr__(self, attr: str):
+        module = importlib.import_module(self.__name__)
+        # Later accesses are plain lookups in this module's namespace
+        self.__dict__.update(vars(module))
+        return getattr(module, attr)
+
+
+def lazy_import(name: str) -> ModuleType:
+    """
+    Args:
+        name (str): The absolute module name.
+
+    Returns:
+        ModuleType: A module that imports `name` on first use.
+    """
+    return LazyModule(name)
+
+
+def preload(*names: str):
+    """
+    Import modules now, e.g. from a background thread once the server is
+    up, so the first request does not pay for them.
+    """
+    for name in names:
+        importlib.import_module(name)
@@ -0,0 +1,81 @@
+import cProfile
+import hmac
+import logging
+import os
+import random
+import re
+import threading
+import time
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from core.config import Config
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = b"x-profile-token"
+
+
+class ProfilingMiddleware:
+    """
+    ASGI middleware that writes a cProfile capture of selected requests.
+
+    A request is profiled when it carries the admin token in the
+    `X-Profile-Token` header, or when it is picked by the configured
+    sample rate. Captures are written as pstats files into
+    `Config.profiling_dir`.
+
+    The profiler runs on the event-loop thread for as long as the
+    request is in flight, so a capture also includes any other request
+    the loop serves meanwhile. Sync endpoints, which run in the
+    threadpool, are not captured at all.
+    """
+
+    def __init__(self, app: ASGIApp, config: Config):
+        self.app = app
+        self.token = config.profiling_token.encode()
+        self.sample_rate = config.profiling_sample_rate
+        self.output_dir = config.profiling_dir
+        # cProfile traces the whole thread, so only one capture runs at a time
+        self._lock = threading.Lock()
+        os.makedirs(self.output_dir, exist_ok=True)
+
+    def _should_profile(self, scope: Scope) -> bool:
+        if self.token:
+            for name, value in scope.get("headers", []):
+                if name == PROFILE_HEADER and hmac.compare_digest(value, self.token):
+                    return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or not self._should_profile(scope):
+            await self.app(scope, receive, send)
+            return
+
+        if not self._lock.acquire(blocking=False):
+            await self.app(scope, receive, send)
+            return
+
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            profiler.disable()
+            self._lock.release()
+            self._dump(profiler, scope)
+
+    def _dump(self, profiler: cProfile.Profile, scope: Scope):
+        """
+        Write the captured profile as a pstats file.
+
+        Args:
+            profiler (cProfile.Profile): The finished profiler.
+            scope (Scope): The ASGI scope of the profiled request.
+        """
+        path = re.sub(r"[^A-Za-z0-9]+", "_", scope.get("path", "")).strip("_")
+        filename = f"{int(time.time() * 1000)}-{scope.get('method', '')}-{path}.pstats"
+        try:
+            profiler.dump_stats(os.path.join(self.output_dir, filename))
+        except OSError as e:
+            logger.error(f"Failed to write profile {filename}: {e}")
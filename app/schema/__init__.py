@@ -4,5 +4,9 @@ from .protein import (
     EntryAudit,
     DiseaseAssociation,
     Isoform,
-    Feature
+    Feature,
+    StructureResult,
+    SimilarityQuery,
+    AlignmentInput,
+    AlignmentRequest
 )
@@ -0,0 +1,28 @@
+from typing import Iterator, Type
+
+from pydantic import BaseModel, ConfigDict
+
+
+class DeferredModel(BaseModel):
+    """
+    Base of the protein and PDB models. Their validators and serializers are built
+    on first use rather than when the module is imported, which keeps the
+    models of a source that is never queried off the startup path.
+    """
+    model_config = ConfigDict(defer_build=True)
+
+
+def deferred_models(base: Type[BaseModel] = DeferredModel) -> Iterator[Type[BaseModel]]:
+    for model in base.__subclasses__():
+        yield model
+        yield from deferred_models(model)
+
+
+def build_models():
+    """
+    Build every deferred model that has not been used yet, e.g. from a
+    background thread once the server is up.
+    """
+    for model in deferred_models():
+        if not model.__pydantic_complete__:
+            model.model_rebuild()
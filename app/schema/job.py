@@ -0,0 +1,7 @@
+from typing import List
+from pydantic import BaseModel, Field
+
+
+class JobRequest(BaseModel):
+    protein_ids: List[str] = Field(min_length=1)
+    full: bool = False
@@ -1,14 +1,16 @@
 from typing import List, Optional
-from pydantic import BaseModel, Field
+from pydantic import Field
+
+from schema.base import DeferredModel
 
 
 # Nested Classes
-class Author(BaseModel):
+class Author(DeferredModel):
     name: Optional[str] = ""
     pdbx_ordinal: Optional[int] = 0
  
 
-class Cell(BaseModel):
+class Cell(DeferredModel):
     angle_alpha: Optional[float] = 0
     angle_beta: Optional[float] = 0
     angle_gamma: Optional[float] = 0
@@ -18,7 +20,7 @@ class Cell(BaseModel):
     zpdb: Optional[int] = 0
 
 
-class Citation(BaseModel):
+class Citation(DeferredModel):
     country: Optional[str] = ""
     id: Optional[str] = ""
     journal_abbrev: Optional[str] = ""
@@ -33,29 +35,29 @@ class Citation(BaseModel):
     rcsb_is_primary: Optional[str] = ""
 
 
-class Diffrn(BaseModel):
+class Diffrn(DeferredModel):
     crystal_id: Optional[str] = ""
     id: Optional[str] = ""
 
 
-class Exptl(BaseModel):
+class Exptl(DeferredModel):
     method: Optional[str] = ""
 
 
-class ExptlCrystal(BaseModel):
+class ExptlCrystal(DeferredModel):
     density_matthews: Optional[float] = 0
     density_percent_sol: Optional[float] = 0
     id: Optional[str] = ""
 
 
-class RevisionCategory(BaseModel):
+class RevisionCategory(DeferredModel):
     category: Optional[str] = ""
     data_content_type: Optional[str] = ""
     ordinal: Optional[int] = 0
     revision_ordinal: Optional[int] = 0
 
 
-class RevisionDetails(BaseModel):
+class RevisionDetails(DeferredModel):
     data_content_type: Optional[str] = ""
     details: Optional[str] = ""
     ordinal: Optional[int] = 0
@@ -64,14 +66,14 @@ class RevisionDetails(BaseModel):
     type: Optional[str] = ""
 
 
-class RevisionGroup(BaseModel):
+class RevisionGroup(DeferredModel):
     data_content_type: Optional[str] = ""
     group: Optional[str] = ""
     ordinal: Optional[int] = 0
     revision_ordinal: Optional[int] = 0
 
 
-class RevisionHistory(BaseModel):
+class RevisionHistory(DeferredModel):
     data_content_type: Optional[str] = ""
     major_revision: Optional[int] = 0
     minor_revision: Optional[int] = 0
@@ -79,7 +81,7 @@ class RevisionHistory(BaseModel):
     revision_date: Optional[str] = ""
 
 
-class RcsbAccessionInfo(BaseModel):
+class RcsbAccessionInfo(DeferredModel):
     deposit_date: Optional[str] = ""
     has_released_experimental_data: Optional[str] = ""
     initial_release_date: Optional[str] = ""
@@ -89,7 +91,7 @@ class RcsbAccessionInfo(BaseModel):
     status_code: Optional[str] = ""
 
 
-class RcsbEntryContainerIdentifiers(BaseModel):
+class RcsbEntryContainerIdentifiers(DeferredModel):
     assembly_ids: List[str] = []
     entity_ids: List[str] = []
     entry_id: Optional[str] = ""
@@ -100,7 +102,7 @@ class RcsbEntryContainerIdentifiers(BaseModel):
     pubmed_id: Optional[int] = 0
 
 
-class RcsbEntryInfo(BaseModel):
+class RcsbEntryInfo(DeferredModel):
     assembly_count: Optional[int] = 0
     deposited_atom_count: Optional[int] = 0
     deposited_model_count: Optional[int] = 0
@@ -108,17 +110,17 @@ class RcsbEntryInfo(BaseModel):
     molecular_weight: Optional[float] = 0
 
 
-class Struct(BaseModel):
+class Struct(DeferredModel):
     title: Optional[str] = ""
 
 
-class Symmetry(BaseModel):
+class Symmetry(DeferredModel):
     int_tables_number: Optional[int] = 0
     space_group_name_hm: Optional[str] = ""
 
 
 # Main Class
-class PDBEntry(BaseModel):
+class PDBEntry(DeferredModel):
     audit_author: List[Author] = []
     cell: Optional[Cell] = Cell()
     citation: List[Citation] = []
@@ -1,37 +1,47 @@
-from typing import List, Optional
-from pydantic import BaseModel
+from typing import List, Literal, Optional
+from pydantic import ConfigDict, Field
 
+from schema.base import DeferredModel
 
-class EntryAudit(BaseModel):
+
+class EntryAudit(DeferredModel):
     first_public_date: Optional[str] = ""
     last_annotation_update_date: Optional[str] = ""
     sequence_version: Optional[int] = 0
     entry_version: Optional[int] = 0
 
 
-class DiseaseAssociation(BaseModel):
+class DiseaseAssociation(DeferredModel):
+    # Shared between entries by service.intern
+    model_config = ConfigDict(frozen=True)
+
     disease_name: Optional[str] = ""
     acronym: Optional[str] = ""
     cross_reference: Optional[str] = ""
 
 
-class Isoform(BaseModel):
+class Isoform(DeferredModel):
     isoform_name: Optional[str] = ""
     sequence_status: Optional[str] = ""
+    isoform_id: Optional[str] = None
+    sequence: Optional[str] = None
 
 
-class Feature(BaseModel):
+class Feature(DeferredModel):
     type: Optional[str] = ""
     location: Optional[str] = ""
     description: Optional[str] = ""
 
 
-class Organism(BaseModel):
+class Organism(DeferredModel):
+    # Shared between entries by service.intern
+    model_config = ConfigDict(frozen=True)
+
     scientific_name: Optional[str] = ""
     common_name: Optional[str] = ""
 
 
-class ProteinData(BaseModel):
+class ProteinData(DeferredModel):
     primary_accession: Optional[str] = ""
     recommended_name: Optional[str] = ""
     organism: Optional[Organism] = Organism()
@@ -43,5 +53,54 @@ class ProteinData(BaseModel):
     isoforms: List[Isoform] = []
     features: List[Feature] = []
     pdb_ids: List[str] = []
+    uniprot_accessions: List[str] = []
     pdb_link: Optional[str] = None
     sequence: Optional[str] = None
+
+
+# Lists that can run to thousands of items; served by their own paged
+# endpoints and left out of summary responses
+HEAVY_FIELDS = {"features", "isoforms", "disease_associations"}
+
+
+class ProteinResponse(DeferredModel):
+    """
+    Body of `GET /protein/{id}`. Built with `model_construct` around data
+    that is already validated, and written straight to JSON bytes by the
+    model's serializer, so the entry is neither validated again nor walked
+    by `jsonable_encoder`.
+    """
+    protein_id: str
+    data: ProteinData
+
+    def to_json(self, full: bool = True) -> bytes:
+        """
+        The JSON body in one pass; without `full`, the heavy lists are left out.
+        """
+        return self.__pydantic_serializer__.to_json(self, exclude=None if full else {"data": HEAVY_FIELDS})
+
+
+class StructureResult(DeferredModel):
+    pdb_id: str
+    status: str = "ok"
+    data: Optional[ProteinData] = None
+    error: Optional[str] = None
+
+
+class SimilarityQuery(DeferredModel):
+    sequence: Optional[str] = None
+    protein_id: Optional[str] = None
+    limit: int = Field(10, ge=1, le=100)
+
+
+class AlignmentInput(DeferredModel):
+    # A UniProt accession, a PDB ID or a PDB chain ("4HHB.A")
+    protein_id: Optional[str] = None
+    sequence: Optional[str] = None
+
+
+class AlignmentRequest(DeferredModel):
+    first: AlignmentInput
+    second: AlignmentInput
+    mode: Literal["global", "local"] = "global"
+    gap_penalty: int = Field(8, ge=1, le=50)
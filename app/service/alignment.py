@@ -0,0 +1,261 @@
+"""
+Pairwise global (Needleman-Wunsch) and local (Smith-Waterman) alignment
+with BLOSUM62 and a linear gap penalty.
+
+The dynamic programming runs a row at a time on NumPy vectors. Within a
+row, the diagonal and vertical moves are plain element-wise maxima; the
+horizontal move, the only dependency along the row, becomes a running
+maximum: with a linear gap g,
+
+    H[j] = max over k <= j of (D[k] - g * (j - k))
+         = cummax(D + g * j) - g * j
+
+so each row is a handful of vector operations. Scores need one row of
+memory; alignments are traced back with Hirschberg's divide and conquer,
+keeping memory linear in the sequence lengths, and a local alignment is
+found as the global alignment of the best-scoring region.
+"""
+from __future__ import annotations
+
+import hashlib
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Dict, Optional, Tuple
+
+from core.config import get_config
+from core.lazy import lazy_import
+from service.fasta import ALPHABET, encode_residues
+
+np = lazy_import("numpy")
+
+GLOBAL = "global"
+LOCAL = "local"
+
+# Sub-problems up to this many cells are traced back from a full matrix
+FULL_MATRIX_CELLS = 1 << 20
+
+_BLOSUM62_ORDER = "ARNDCQEGHILKMFPSTWYVBZX*"
+_BLOSUM62 = """
+ 4 -1 -2 -2  0 -1 -1  0 -2 -1 -1 -1 -1 -2 -1  1  0 -3 -2  0 -2 -1  0 -4
+-1  5  0 -2 -3  1  0 -2  0 -3 -2  2 -1 -3 -2 -1 -1 -3 -2 -3 -1  0 -1 -4
+-2  0  6  1 -3  0  0  0  1 -3 -3  0 -2 -3 -2  1  0 -4 -2 -3  3  0 -1 -4
+-2 -2  1  6 -3  0  2 -1 -1 -3 -4 -1 -3 -3 -1  0 -1 -4 -3 -3  4  1 -1 -4
+ 0 -3 -3 -3  9 -3 -4 -3 -3 -1 -1 -3 -1 -2 -3 -1 -1 -2 -2 -1 -3 -3 -2 -4
+-1  1  0  0 -3  5  2 -2  0 -3 -2  1  0 -3 -1  0 -1 -2 -1 -2  0  3 -1 -4
+-1  0  0  2 -4  2  5 -2  0 -3 -3  1 -2 -3 -1  0 -1 -3 -2 -2  1  4 -1 -4
+ 0 -2  0 -1 -3 -2 -2  6 -2 -4 -4 -2 -3 -3 -2  0 -2 -2 -3 -3 -1 -2 -1 -4
+-2  0  1 -1 -3  0  0 -2  8 -3 -3 -1 -2 -1 -2 -1 -2 -2  2 -3  0  0 -1 -4
+-1 -3 -3 -3 -1 -3 -3 -4 -3  4  2 -3  1  0 -3 -2 -1 -3 -1  3 -3 -3 -1 -4
+-1 -2 -3 -4 -1 -2 -3 -4 -3  2  4 -2  2  0 -3 -2 -1 -2 -1  1 -4 -3 -1 -4
+-1  2  0 -1 -3  1  1 -2 -1 -3 -2  5 -1 -3 -1  0 -1 -3 -2 -2  0  1 -1 -4
+-1 -1 -2 -3 -1  0 -2 -3 -2  1  2 -1  5  0 -2 -1 -1 -1 -1  1 -3 -1 -1 -4
+-2 -3 -3 -3 -2 -3 -3 -3 -1  0  0 -3  0  6 -4 -2 -2  1  3 -1 -3 -3 -1 -4
+-1 -2 -2 -1 -3 -1 -1 -2 -2 -3 -3 -1 -2 -4  7 -1 -1 -4 -3 -2 -2 -1 -2 -4
+ 1 -1  1  0 -1  0  0  0 -1 -2 -2  0 -1 -2 -1  4  1 -3 -2 -2  0  0  0 -4
+ 0 -1  0 -1 -1 -1 -1 -2 -2 -1 -1 -1 -1 -2 -1  1  5 -2 -2  0 -1 -1  0 -4
+-3 -3 -4 -4 -2 -2 -3 -2 -2 -3 -2 -3 -1  1 -4 -3 -2 11  2 -3 -4 -3 -2 -4
+-2 -2 -2 -3 -2 -1 -2 -3  2 -1 -1 -2 -1  3 -3 -2 -2  2  7 -1 -3 -2 -1 -4
+ 0 -3 -3 -3 -1 -2 -2 -3 -3  3  1 -2  1 -1 -2 -2  0 -3 -1  4 -3 -2 -1 -4
+-2 -1  3  4 -3  0  1 -1  0 -3 -4  0 -3 -3 -2  0 -1 -4 -3 -3  4  1 -1 -4
+-1  0  0  1 -3  3  4 -2  0 -3 -3  1 -1 -3 -1  0 -1 -3 -2 -2  1  4 -1 -4
+ 0 -1 -1 -1 -2 -1 -1 -1 -1 -1 -1 -1 -1 -1 -2  0  0 -2 -1 -1 -1 -1 -1 -4
+-4 -4 -4 -4 -4 -4 -4 -4 -4 -4 -4 -4 -4 -4 -4 -4 -4 -4 -4 -4 -4 -4 -4  1
+"""
+
+
+@lru_cache
+def substitution_matrix() -> np.ndarray:
+    """
+    BLOSUM62 indexed by the residue codes of `service.fasta.ALPHABET`.
+    Residues BLOSUM62 has no row for (J, O, U, -) score as X.
+    """
+    blosum = np.array(_BLOSUM62.split(), dtype=np.int32).reshape(len(_BLOSUM62_ORDER), -1)
+    rows = [_BLOSUM62_ORDER.index(r) if r in _BLOSUM62_ORDER else _BLOSUM62_ORDER.index("X")
+            for r in ALPHABET]
+    return blosum[np.ix_(rows, rows)]
+
+
+def _codes(residues: str) -> np.ndarray:
+    return np.frombuffer(encode_residues(residues), dtype=np.uint8)
+
+
+def _rows(a: np.ndarray, b: np.ndarray, gap: int, local: bool):
+    """
+    Yield the DP rows of `a` against `b`, starting with row 0.
+    """
+    offsets = gap * np.arange(len(b) + 1, dtype=np.int32)
+    row = np.zeros(len(b) + 1, dtype=np.int32) if local else -offsets
+    yield row
+    profile = substitution_matrix()[:, b]
+    diagonal = np.empty(len(b) + 1, dtype=np.int32)
+    for code in a:
+        diagonal[0] = 0 if local else row[0] - gap
+        np.maximum(row[:-1] + profile[code], row[1:] - gap, out=diagonal[1:])
+        if local:
+            np.maximum(diagonal, 0, out=diagonal)
+        row = np.maximum.accumulate(diagonal + offsets) - offsets
+        yield row
+
+
+def _last_row(a: np.ndarray, b: np.ndarray, gap: int) -> np.ndarray:
+    for row in _rows(a, b, gap, local=False):
+        pass
+    return row
+
+
+def _best_cell(a: np.ndarray, b: np.ndarray, gap: int, local: bool) -> Tuple[int, int, int]:
+    """
+    The highest-scoring cell of the alignment matrix.
+
+    Returns:
+        tuple: The score and the (row, column) of the cell.
+    """
+    best = (0, 0, 0)
+    for i, row in enumerate(_rows(a, b, gap, local)):
+        j = int(row.argmax())
+        if row[j] > best[0]:
+            best = (int(row[j]), i, j)
+    return best
+
+
+def _full_matrix_alignment(a: np.ndarray, b: np.ndarray, gap: int) -> Tuple[str, str]:
+    """
+    Global alignment traced back through the full score matrix. Only used
+    for small sub-problems.
+    """
+    matrix = np.stack(list(_rows(a, b, gap, local=False)))
+    substitution = substitution_matrix()
+    top, bottom = [], []
+    i, j = len(a), len(b)
+    while i > 0 or j > 0:
+        if i > 0 and j > 0 and matrix[i, j] == matrix[i - 1, j - 1] + substitution[a[i - 1], b[j - 1]]:
+            i, j = i - 1, j - 1
+            top.append(ALPHABET[a[i]])
+            bottom.append(ALPHABET[b[j]])
+        elif i > 0 and matrix[i, j] == matrix[i - 1, j] - gap:
+            i -= 1
+            top.append(ALPHABET[a[i]])
+            bottom.append("-")
+        else:
+            j -= 1
+            top.append("-")
+            bottom.append(ALPHABET[b[j]])
+    return "".join(reversed(top)), "".join(reversed(bottom))
+
+
+def _hirschberg(a: np.ndarray, b: np.ndarray, gap: int) -> Tuple[str, str]:
+    """
+    Global alignment in linear space: split `a` in half, find where the
+    optimal path crosses the middle row from a forward and a backward
+    score pass, and solve both halves recursively.
+    """
+    if not len(a) or not len(b):
+        return (
+            "".join(ALPHABET[c] for c in a) or "-" * len(b),
+            "".join(ALPHABET[c] for c in b) or "-" * len(a),
+        )
+    if (len(a) + 1) * (len(b) + 1) <= FULL_MATRIX_CELLS or len(a) == 1:
+        return _full_matrix_alignment(a, b, gap)
+
+    middle = len(a) // 2
+    forward = _last_row(a[:middle], b, gap)
+    backward = _last_row(a[middle:][::-1], b[::-1], gap)
+    split = int((forward + backward[::-1]).argmax())
+    top_left, bottom_left = _hirschberg(a[:middle], b[:split], gap)
+    top_right, bottom_right = _hirschberg(a[middle:], b[split:], gap)
+    return top_left + top_right, bottom_left + bottom_right
+
+
+def align(first: str, second: str, mode: str = GLOBAL, gap: int = 8) -> Dict:
+    """
+    Align two protein sequences.
+
+    Args:
+        first (str): The first sequence, residues only.
+        second (str): The second sequence, residues only.
+        mode (str): "global" or "local".
+        gap (int): The penalty per gap position.
+
+    Returns:
+        dict: The score, the aligned sequences with their 1-based start and
+        end positions, and the identity over the alignment length.
+    """
+    a, b = _codes(first), _codes(second)
+    if mode == LOCAL:
+        score, end_a, end_b = _best_cell(a, b, gap, local=True)
+        # Aligning the reversed prefixes from that cell back, the best
+        # cell reached is where the local alignment starts
+        _, length_a, length_b = _best_cell(a[:end_a][::-1], b[:end_b][::-1], gap, local=False)
+        start_a, start_b = end_a - length_a, end_b - length_b
+    elif mode == GLOBAL:
+        score = int(_last_row(a, b, gap)[-1])
+        start_a, end_a, start_b, end_b = 0, len(a), 0, len(b)
+    else:
+        raise ValueError(f"Unknown alignment mode {mode!r}")
+
+    aligned_a, aligned_b = _hirschberg(a[start_a:end_a], b[start_b:end_b], gap)
+    matches = sum(x == y and x != "-" for x, y in zip(aligned_a, aligned_b))
+    return {
+        "mode": mode,
+        "score": score,
+        "length": len(aligned_a),
+        "identity": round(matches / len(aligned_a), 4) if aligned_a else 0.0,
+        "start_a": start_a + 1,
+        "end_a": end_a,
+        "start_b": start_b + 1,
+        "end_b": end_b,
+        "aligned_a": aligned_a,
+        "aligned_b": aligned_b,
+    }
+
+
+class AlignmentCache:
+    """
+    Bounded LRU of alignment results keyed by a hash of the sequence pair
+    and the alignment parameters.
+    """
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._results: "OrderedDict[bytes, Dict]" = OrderedDict()
+        # Alignments run in worker threads
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(first: str, second: str, mode: str, gap: int) -> bytes:
+        digest = hashlib.blake2b(digest_size=16)
+        for part in (mode, str(gap), first, second):
+            digest.update(part.encode())
+            digest.update(b"\0")
+        return digest.digest()
+
+    def get(self, key: bytes) -> Optional[Dict]:
+        with self._lock:
+            result = self._results.get(key)
+            if result is not None:
+                self._results.move_to_end(key)
+            return result
+
+    def set(self, key: bytes, result: Dict):
+        with self._lock:
+            self._results[key] = result
+            while len(self._results) > self.max_entries:
+                self._results.popitem(last=False)
+
+    def align(self, first: str, second: str, mode: str = GLOBAL, gap: int = 8) -> Dict:
+        """
+        `align`, served from the cache when the same pair was aligned before.
+        """
+        key = self.key(first, second, mode, gap)
+        result = self.get(key)
+        if result is None:
+            result = align(first, second, mode, gap)
+            self.set(key, result)
+        return result
+
+
+# get_alignment_cache returns the process-wide cache of alignment results
+@lru_cache
+def get_alignment_cache() -> AlignmentCache:
+    return AlignmentCache(max_entries=get_config().alignment_cache_entries)
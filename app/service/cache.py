@@ -0,0 +1,476 @@
+import asyncio
+import json
+import logging
+import os
+import pickle
+import tempfile
+import threading
+import time
+import zlib
+from collections import Counter, OrderedDict
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+from core.config import get_config
+from schema.protein import Isoform, ProteinData
+from service.fasta import PackedSequence
+from service.features import FeatureTable
+from service.intern import InternSavings, get_intern_table
+from service.shared_cache import SharedCache, Stamp
+
+logger = logging.getLogger(__name__)
+
+# Bumped whenever the layout of snapshot files changes
+SNAPSHOT_FORMAT = 4
+
+# Snapshot writes to one path run one at a time, in whichever thread
+_snapshot_lock = threading.Lock()
+
+
+@dataclass(slots=True)
+class CachedProtein:
+    """
+    A cached entry. Its features, sequence and isoform sequences are held
+    in compact form and `data` carries none of them; `isoform_sequences`
+    runs parallel to `data.isoforms`.
+    """
+    data: ProteinData
+    features: FeatureTable
+    sequence: Optional[PackedSequence]
+    isoform_sequences: Tuple[Optional[PackedSequence], ...] = ()
+
+    @classmethod
+    def compact(cls, value: ProteinData) -> "CachedProtein":
+        features = FeatureTable(value.features)
+        sequence = PackedSequence.from_fasta(value.sequence)
+        canonical = sequence.residues() if sequence is not None else None
+        # The displayed isoform is the canonical sequence; it is packed once
+        isoform_sequences = tuple(
+            sequence if isoform.sequence is not None and isoform.sequence == canonical
+            else PackedSequence.from_fasta(isoform.sequence)
+            for isoform in value.isoforms
+        )
+        update = {}
+        if value.features or value.sequence is not None:
+            update.update(features=[], sequence=None)
+        if any(isoform.sequence is not None for isoform in value.isoforms):
+            update["isoforms"] = [isoform.model_copy(update={"sequence": None}) for isoform in value.isoforms]
+        if update:
+            value = value.model_copy(update=update)
+        return cls(data=value, features=features, sequence=sequence, isoform_sequences=isoform_sequences)
+
+    def summary(self) -> ProteinData:
+        """
+        The data with its sequence restored, but without features or
+        isoform sequences.
+        """
+        if self.sequence is None:
+            return self.data
+        return self.data.model_copy(update={"sequence": self.sequence.fasta()})
+
+    def isoforms(self) -> List[Isoform]:
+        """
+        The isoforms with their sequences restored.
+        """
+        if not any(self.isoform_sequences):
+            return self.data.isoforms
+        return [
+            isoform if packed is None else isoform.model_copy(update={"sequence": packed.residues()})
+            for isoform, packed in zip(self.data.isoforms, self.isoform_sequences)
+        ]
+
+    def materialize(self) -> ProteinData:
+        """
+        The data exactly as it was cached, features and sequences included.
+        """
+        return self.summary().model_copy(update={
+            "features": self.features.to_features(),
+            "isoforms": self.isoforms(),
+        })
+
+
+@dataclass(slots=True)
+class CacheEntry:
+    value: CachedProtein
+    expires_at: float
+    version: int
+    # The entry's stamp in the shared segment when this copy was made
+    stamp: Optional[Stamp] = None
+
+
+def entry_version(value: ProteinData) -> int:
+    if value.entry_audit is None:
+        return 0
+    return value.entry_audit.entry_version or 0
+
+
+class ProteinCache:
+    """
+    In-process LRU cache of parsed protein data with a per-entry TTL.
+
+    Keys are protein IDs, normalised to upper case. The cache also counts
+    accesses per key so the hottest IDs can be carried over to the next run
+    and used to warm it up again.
+
+    Entries are stored as `CachedProtein`: features as a columnar
+    `FeatureTable` and the sequences 5-bit packed.
+
+    With a `SharedCache`, the LRU is a small per-process tier in front of
+    the segment shared by all worker processes: misses fall through to the
+    segment, and entries set by any worker are written to it. Local hits
+    are revalidated against the segment, so an entry another worker
+    invalidated or replaced is never served from a stale local copy.
+    """
+
+    def __init__(self, max_entries: int = 10000, ttl: float = 3600, shared: Optional[SharedCache] = None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.shared = shared
+        self.hits = 0
+        self.misses = 0
+        self.access_counts: Counter = Counter()
+        self.interned = InternSavings()
+        self._entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+
+    @staticmethod
+    def key(protein_id: str) -> str:
+        return protein_id.upper()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, protein_id: str) -> bool:
+        key = self.key(protein_id)
+        entry = self._entries.get(key)
+        return entry is not None and entry.expires_at > time.time() and self._current(key, entry)
+
+    def get(self, protein_id: str, count: bool = True) -> Optional[ProteinData]:
+        """
+        Look up a protein.
+
+        Args:
+            protein_id (str): The UniProt or PDB ID.
+            count (bool): Whether this lookup counts towards hit/miss and
+                access statistics; background work passes False.
+
+        Returns:
+            ProteinData: The cached data without its features, or None when
+            missing or expired.
+        """
+        cached = self.lookup(protein_id, count)
+        return cached.summary() if cached else None
+
+    def lookup(self, protein_id: str, count: bool = True, touch: bool = True) -> Optional[CachedProtein]:
+        """
+        Like `get`, but returns the entry in its compact cached form.
+
+        Args:
+            protein_id (str): The UniProt or PDB ID.
+            count (bool): Whether this lookup counts towards the statistics.
+            touch (bool): Whether a hit is marked as recently used and a hit
+                in the shared segment copied into the local tier; bulk
+                readers such as batch jobs pass False so they leave the
+                LRU order of live traffic alone.
+
+        Returns:
+            CachedProtein: The cached entry, or None when missing or expired.
+        """
+        key = self.key(protein_id)
+        if count:
+            self._count_access(key)
+        entry = self._entries.get(key)
+        if entry is None or entry.expires_at <= time.time() or not self._current(key, entry):
+            if entry is not None:
+                self._drop(key)
+            entry = self._lookup_shared(key, keep=touch)
+        if entry is None:
+            if count:
+                self.misses += 1
+            return None
+        if touch:
+            self._entries.move_to_end(key)
+        if count:
+            self.hits += 1
+        return entry.value
+
+    def _current(self, key: str, entry: CacheEntry) -> bool:
+        """
+        Whether a local entry still matches the shared segment. Usually one
+        read of its shard's sequence; only when something in the shard was
+        written since is the key's own stamp compared, and the expiry time
+        taken over in case another worker extended the entry.
+        """
+        if self.shared is None:
+            return True
+        if entry.stamp is not None and self.shared.sequence(key) == entry.stamp[0]:
+            return True
+        found = self.shared.stamp(key)
+        if found is None or entry.stamp is None:
+            # Entries too large for the segment only ever live locally
+            return found is None and entry.stamp is None
+        stamp, expires_at = found
+        if stamp[1] != entry.stamp[1]:
+            return False
+        entry.stamp = stamp
+        entry.expires_at = max(entry.expires_at, expires_at)
+        return True
+
+    def _lookup_shared(self, key: str, keep: bool = True) -> Optional[CacheEntry]:
+        if self.shared is None:
+            return None
+        found = self.shared.read(key)
+        if found is None:
+            return None
+        entry = CacheEntry(*found)
+        if keep:
+            get_intern_table().protein(entry.value.data)
+            self._store(key, entry)
+        return entry
+
+    def _store(self, key: str, entry: CacheEntry):
+        self._drop(key)
+        self._entries[key] = entry
+        self.interned.add(entry.value.data, entry.value.features.types)
+        while len(self._entries) > self.max_entries:
+            self._drop(next(iter(self._entries)))
+
+    def _drop(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.interned.remove(entry.value.data, entry.value.features.types)
+
+    def set(
+        self,
+        protein_id: str,
+        value: ProteinData,
+        ttl: Optional[float] = None,
+    ) -> CachedProtein:
+        """
+        Store a protein, evicting the least recently used entries when full.
+
+        Args:
+            protein_id (str): The UniProt or PDB ID.
+            value (ProteinData): The parsed data.
+            ttl (float): Seconds to keep the entry; defaults to the cache TTL.
+
+        Returns:
+            CachedProtein: The entry as cached.
+        """
+        key = self.key(protein_id)
+        cached = CachedProtein.compact(value)
+        entry = CacheEntry(
+            value=cached,
+            expires_at=time.time() + (self.ttl if ttl is None else ttl),
+            version=entry_version(value),
+        )
+        if self.shared is not None:
+            entry.stamp = self.shared.set(key, entry.value, entry.expires_at, entry.version)
+        self._store(key, entry)
+        return cached
+
+    def extend(self, protein_id: str, ttl: float) -> bool:
+        """
+        Keep an entry for at least another `ttl` seconds, e.g. once it has
+        been verified against upstream.
+
+        Returns:
+            bool: False when the entry is not cached.
+        """
+        key = self.key(protein_id)
+        expires_at = time.time() + ttl
+        entry = self._entries.get(key)
+        if entry is not None and (entry.expires_at <= time.time() or not self._current(key, entry)):
+            self._drop(key)
+            entry = None
+        stamp = None
+        if self.shared is not None:
+            # Only the entry's index slot is rewritten, not its payload
+            stamp = self.shared.extend(key, expires_at)
+            if stamp is None and entry is not None:
+                stamp = self.shared.set(key, entry.value, max(entry.expires_at, expires_at), entry.version)
+        if entry is None:
+            return stamp is not None
+        entry.expires_at = max(entry.expires_at, expires_at)
+        entry.stamp = stamp
+        return True
+
+    def invalidate(self, protein_id: str):
+        key = self.key(protein_id)
+        self._drop(key)
+        if self.shared is not None:
+            self.shared.delete(key)
+
+    def clear(self):
+        self._entries.clear()
+        self.interned.clear()
+        if self.shared is not None:
+            self.shared.clear()
+
+    def _count_access(self, key: str):
+        self.access_counts[key] += 1
+        # Keep the statistics bounded; only the hottest keys are ever used
+        if len(self.access_counts) > 10 * self.max_entries:
+            self.access_counts = Counter(dict(self.access_counts.most_common(self.max_entries)))
+
+    def top_keys(self, n: int) -> List[str]:
+        return [key for key, _ in self.access_counts.most_common(n)]
+
+    def save_access_stats(self, path: str):
+        """
+        Write the access counts of the hottest keys to a JSON file.
+        """
+        with open(path, "w") as file:
+            json.dump(dict(self.access_counts.most_common(self.max_entries)), file)
+
+    @staticmethod
+    def load_access_stats(path: str) -> Dict[str, int]:
+        try:
+            with open(path) as file:
+                return json.load(file)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not read cache access statistics {path}: {e}")
+            return {}
+
+    def snapshot_entries(self) -> List[Tuple[str, CachedProtein, float, int]]:
+        """
+        Collect the live entries, least recently used first, for a snapshot.
+        With a shared cache, this includes the entries of all workers.
+        """
+        entries = self._local_entries()
+        return entries if self.shared is None else self._with_shared(entries)
+
+    async def collect_entries(self) -> List[Tuple[str, CachedProtein, float, int]]:
+        """
+        Like `snapshot_entries`, but reads the shared segment, which
+        unpickles every entry in it, in a thread.
+        """
+        entries = self._local_entries()
+        return entries if self.shared is None else await asyncio.to_thread(self._with_shared, entries)
+
+    def _local_entries(self) -> List[Tuple[str, CachedProtein, float, int]]:
+        now = time.time()
+        return [
+            (key, entry.value, entry.expires_at, entry.version)
+            for key, entry in list(self._entries.items())
+            if entry.expires_at > now and self._current(key, entry)
+        ]
+
+    def _with_shared(self, entries: List[Tuple[str, CachedProtein, float, int]]) -> List[Tuple[str, CachedProtein, float, int]]:
+        # Entries only other workers have used come first, as the least recent
+        local = {entry[0] for entry in entries}
+        return [entry for entry in self.shared.items() if entry[0] not in local] + entries
+
+    @staticmethod
+    def write_snapshot(path: str, entries: List[Tuple[str, CachedProtein, float, int]]):
+        """
+        Write snapshot entries to disk as a compressed pickle. The file is
+        replaced atomically so a crash never leaves a truncated snapshot,
+        and each write goes through its own temporary file.
+        """
+        payload = zlib.compress(pickle.dumps((SNAPSHOT_FORMAT, entries), protocol=5), 1)
+        with _snapshot_lock:
+            file = tempfile.NamedTemporaryFile(
+                dir=os.path.dirname(path) or ".", prefix=f"{os.path.basename(path)}.", suffix=".tmp", delete=False)
+            try:
+                with file:
+                    file.write(payload)
+                os.replace(file.name, path)
+            except BaseException:
+                os.unlink(file.name)
+                raise
+
+    def snapshot(self, path: str) -> int:
+        """
+        Write the cache contents to a snapshot file.
+
+        Args:
+            path (str): The snapshot file to (over)write.
+
+        Returns:
+            int: The number of entries written.
+        """
+        entries = self.snapshot_entries()
+        self.write_snapshot(path, entries)
+        return len(entries)
+
+    def restore(self, path: str) -> int:
+        """
+        Load a snapshot written by `snapshot`, keeping each entry's original
+        expiry time and version. Entries are unpickled as-is rather than
+        re-validated, so snapshots must only come from a trusted location.
+
+        Args:
+            path (str): The snapshot file.
+
+        Returns:
+            int: The number of entries restored.
+        """
+        try:
+            with open(path, "rb") as file:
+                snapshot_format, entries = pickle.loads(zlib.decompress(file.read()))
+        except FileNotFoundError:
+            return 0
+        except Exception as e:
+            logger.warning(f"Could not read cache snapshot {path}: {e}")
+            return 0
+        if snapshot_format != SNAPSHOT_FORMAT:
+            logger.warning(f"Ignoring cache snapshot {path} with format {snapshot_format}")
+            return 0
+
+        now = time.time()
+        restored = 0
+        interned = get_intern_table()
+        for key, value, expires_at, version in entries:
+            if expires_at <= now:
+                continue
+            interned.protein(value.data)
+            entry = CacheEntry(value=value, expires_at=expires_at, version=version)
+            if self.shared is not None:
+                entry.stamp = self.shared.set(key, value, expires_at, version)
+            self._store(key, entry)
+            restored += 1
+        return restored
+
+    def stats(self) -> dict:
+        stats = {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+        if self.shared is not None:
+            stats["shared"] = self.shared.stats()
+        stats["interning"] = {**get_intern_table().stats(), "saved_bytes": self.interned.saved_bytes}
+        return stats
+
+
+async def snapshot_periodically(cache: ProteinCache, path: str, interval: float):
+    """
+    Snapshot the cache every `interval` seconds until cancelled. Entries are
+    collected on the event loop; pickling and writing happen in a thread.
+
+    Cancelling does not stop a thread already writing, so a write in
+    progress is waited for: once the cancelled task has been awaited, a
+    final snapshot cannot be replaced by an older one.
+    """
+    while True:
+        await asyncio.sleep(interval)
+        write = asyncio.ensure_future(asyncio.to_thread(cache.write_snapshot, path, cache.snapshot_entries()))
+        try:
+            await asyncio.shield(write)
+        except asyncio.CancelledError:
+            await asyncio.wait([write])
+            raise
+        except Exception as e:
+            logger.error(f"Periodic cache snapshot to {path} failed: {e}")
+
+
+# get_protein_cache returns the process-wide protein cache
+@lru_cache
+def get_protein_cache() -> ProteinCache:
+    cfg = get_config()
+    shared = None
+    if cfg.shared_cache_path:
+        shared = SharedCache(cfg.shared_cache_path, cfg.shared_cache_size_mb << 20, cfg.shared_cache_shards)
+    return ProteinCache(max_entries=cfg.cache_max_entries, ttl=cfg.cache_ttl, shared=shared)
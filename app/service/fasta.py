@@ -0,0 +1,229 @@
+from __future__ import annotations
+
+from typing import AsyncIterable, AsyncIterator, Iterator, List, Optional, Tuple
+
+from core.lazy import lazy_import
+
+np = lazy_import("numpy")
+
+# Residue codes; every other character is stored as X (unknown)
+ALPHABET = "ACDEFGHIKLMNPQRSTVWYBJOUXZ*-"
+RESIDUES_PER_GROUP = 8
+BYTES_PER_GROUP = 5  # 8 residues of 5 bits
+
+_UNKNOWN = ALPHABET.index("X")
+_ENCODE = bytearray([_UNKNOWN] * 256)
+for _code, _residue in enumerate(ALPHABET):
+    _ENCODE[ord(_residue)] = _code
+    _ENCODE[ord(_residue.lower())] = _code
+_ENCODE = bytes(_ENCODE)
+_DECODE = ALPHABET.encode().ljust(256, b"X")
+
+
+def encode_residues(residues: str) -> bytes:
+    """
+    Map residues to their codes in `ALPHABET`, one byte per residue.
+    """
+    return residues.encode("ascii", "replace").translate(_ENCODE)
+
+
+def fasta(header: str, residues: str) -> str:
+    """
+    Format a FASTA record, wrapping the residues at 60 columns.
+    """
+    return f">{header}\n" + "".join(
+        residues[i:i + 60] + "\n" for i in range(0, len(residues), 60))
+
+
+def parse_fasta(text: str) -> Tuple[str, str]:
+    """
+    Split a single FASTA record into its header and residues.
+
+    Args:
+        text (str): The FASTA text. Text without a header line is taken to
+            be residues only.
+
+    Returns:
+        tuple: The header (without ">") and the residues, whitespace removed.
+    """
+    header = ""
+    if text.startswith(">"):
+        header, _, text = text.partition("\n")
+        header = header[1:].strip()
+    return header, "".join(text.split())
+
+
+def record_accession(header: str) -> str:
+    """
+    The accession of a UniProt FASTA header such as "sp|P01308-2|INS_HUMAN
+    Isoform 2 of Insulin", or the first word of any other header.
+    """
+    identifier = header.split(maxsplit=1)[0] if header.strip() else ""
+    parts = identifier.split("|")
+    return parts[1] if len(parts) >= 3 else identifier
+
+
+class FastaStreamParser:
+    """
+    Incremental multi-FASTA parser.
+
+    Text is fed in chunks of any size, split anywhere; every record is
+    yielded as soon as the header of the next one (or the end of input)
+    shows it is complete. Only the record being read is held in memory.
+    """
+
+    def __init__(self):
+        self._pending = ""
+        self._header: Optional[str] = None
+        self._residues: List[str] = []
+
+    def feed(self, chunk: str) -> Iterator[Tuple[str, str]]:
+        """
+        Parse a chunk of text.
+
+        Yields:
+            tuple: The header (without ">") and residues of each record
+            completed by this chunk.
+        """
+        lines = (self._pending + chunk).split("\n")
+        self._pending = lines.pop()
+        for line in lines:
+            yield from self._line(line)
+
+    def close(self) -> Iterator[Tuple[str, str]]:
+        """
+        Signal the end of input, yielding the last record.
+        """
+        if self._pending:
+            yield from self._line(self._pending)
+            self._pending = ""
+        if self._header is not None:
+            yield self._header, "".join(self._residues)
+            self._header = None
+            self._residues = []
+
+    def _line(self, line: str) -> Iterator[Tuple[str, str]]:
+        line = line.strip()
+        if line.startswith(">"):
+            if self._header is not None:
+                yield self._header, "".join(self._residues)
+            self._header = line[1:].strip()
+            self._residues = []
+        elif line and self._header is not None:
+            self._residues.append(line)
+
+
+async def aiter_fasta(chunks: AsyncIterable[str]) -> AsyncIterator[Tuple[str, str]]:
+    """
+    Parse a multi-FASTA text stream record by record.
+
+    Args:
+        chunks (AsyncIterable[str]): The text, e.g. `response.aiter_text()`.
+
+    Yields:
+        tuple: The header and residues of each record.
+    """
+    parser = FastaStreamParser()
+    async for chunk in chunks:
+        for record in parser.feed(chunk):
+            yield record
+    for record in parser.close():
+        yield record
+
+
+class PackedSequence:
+    """
+    A protein sequence stored at 5 bits per residue.
+
+    Residues are packed in groups of 8 into 5 bytes, so any window can be
+    decoded by unpacking only the groups it spans, all of them at once.
+    """
+
+    __slots__ = ("header", "length", "data", "raw")
+
+    def __init__(self, header: str, residues: str, raw: Optional[str] = None):
+        self.header = header
+        self.length = len(residues)
+        codes = encode_residues(residues)
+        codes += bytes(-len(codes) % RESIDUES_PER_GROUP)
+        packed = bytearray()
+        for i in range(0, len(codes), RESIDUES_PER_GROUP):
+            value = 0
+            for code in codes[i:i + RESIDUES_PER_GROUP]:
+                value = (value << 5) | code
+            packed += value.to_bytes(BYTES_PER_GROUP, "big")
+        self.data = bytes(packed)
+        # Source text that `fasta()` would not reproduce, kept as-is
+        self.raw = raw
+
+    @classmethod
+    def from_fasta(cls, text: Optional[str]) -> Optional["PackedSequence"]:
+        """
+        Pack the sequence of a FASTA record.
+
+        Args:
+            text (str): The FASTA text as fetched from UniProt.
+
+        Returns:
+            PackedSequence: The packed sequence, or None when there is none.
+        """
+        if text is None:
+            return None
+        header, residues = parse_fasta(text)
+        sequence = cls(header, residues)
+        if sequence.fasta() != text:
+            sequence.raw = text
+        return sequence
+
+    def __len__(self) -> int:
+        return self.length
+
+    def slice(self, start: int = 1, end: Optional[int] = None) -> str:
+        """
+        Decode a window of the sequence.
+
+        Args:
+            start (int): First residue, 1-based.
+            end (int): Last residue, inclusive; defaults to the end of the
+                sequence.
+
+        Returns:
+            str: The residues in the window.
+        """
+        start = max(start, 1)
+        end = self.length if end is None else min(end, self.length)
+        if start > end:
+            return ""
+        first_group = (start - 1) // RESIDUES_PER_GROUP
+        last_group = (end - 1) // RESIDUES_PER_GROUP
+        # All groups of the window at once: the 8 codes of each group are
+        # cut from its 5 bytes column-wise, then mapped to residues by a table
+        b0, b1, b2, b3, b4 = np.frombuffer(
+            self.data, dtype=np.uint8, count=(last_group - first_group + 1) * BYTES_PER_GROUP,
+            offset=first_group * BYTES_PER_GROUP,
+        ).reshape(-1, BYTES_PER_GROUP).T
+        codes = np.empty((len(b0), RESIDUES_PER_GROUP), dtype=np.uint8)
+        codes[:, 0] = b0 >> 3
+        codes[:, 1] = ((b0 & 7) << 2) | (b1 >> 6)
+        codes[:, 2] = (b1 >> 1) & 31
+        codes[:, 3] = ((b1 & 1) << 4) | (b2 >> 4)
+        codes[:, 4] = ((b2 & 15) << 1) | (b3 >> 7)
+        codes[:, 5] = (b3 >> 2) & 31
+        codes[:, 6] = ((b3 & 3) << 3) | (b4 >> 5)
+        codes[:, 7] = b4 & 31
+        residues = codes.tobytes().translate(_DECODE)
+        skip = start - 1 - first_group * RESIDUES_PER_GROUP
+        return residues[skip:skip + end - start + 1].decode("ascii")
+
+    def residues(self) -> str:
+        return self.slice()
+
+    def fasta(self) -> str:
+        """
+        Rebuild the FASTA text the sequence was packed from.
+        """
+        if self.raw is not None:
+            return self.raw
+        if not self.header:
+            return self.residues()
+        return fasta(self.header, self.residues())
@@ -0,0 +1,189 @@
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Dict, List, Optional, Sequence, Tuple, TypeVar
+
+from schema.protein import Feature
+from service.intern import get_intern_table
+
+T = TypeVar("T")
+
+# Stored for a position that is missing or not a number
+UNKNOWN = 0
+
+
+def parse_location(location: Optional[str]) -> Tuple[Optional[int], Optional[int]]:
+    """
+    Parse a feature location of the form "start - end".
+
+    Args:
+        location (str): The location as stored on a `Feature`.
+
+    Returns:
+        tuple: The start and end positions; either is None when unknown.
+    """
+    start, _, end = (location or "").partition(" - ")
+
+    def position(value: str) -> Optional[int]:
+        value = value.strip()
+        return int(value) if value.isdigit() else None
+
+    return position(start), position(end)
+
+
+def format_location(start: Optional[int], end: Optional[int]) -> str:
+    return f"{start} - {end}"
+
+
+class FeatureTable:
+    """
+    Columnar, read-only representation of the features of one entry.
+
+    Instead of a `Feature` model per feature, positions are kept in integer
+    arrays, types as codes into a small table of interned type names and
+    descriptions as indexes into a table of distinct strings. Features are
+    only turned back into `Feature` models for the page being returned.
+
+    Location range queries use an interval index: feature indexes sorted by
+    start, together with the running maximum of their ends. All features
+    that can overlap a range then sit in one contiguous slice of the sorted
+    order, found by bisection.
+    """
+
+    __slots__ = (
+        "starts", "ends", "type_codes", "types", "description_ids", "descriptions",
+        "odd_locations", "_order", "_sorted_starts", "_max_ends",
+    )
+
+    def __init__(self, features: Sequence[Feature] = ()):
+        self.starts = array("I")
+        self.ends = array("I")
+        self.type_codes = array("H")
+        self.description_ids = array("I")
+        # Locations that "start - end" does not reproduce, by feature index
+        self.odd_locations: Dict[int, Optional[str]] = {}
+
+        interned = get_intern_table()
+        type_codes: Dict[Optional[str], int] = {}
+        description_ids: Dict[Optional[str], int] = {}
+        for index, feature in enumerate(features):
+            start, end = parse_location(feature.location)
+            if format_location(start, end) != feature.location:
+                self.odd_locations[index] = feature.location
+            self.starts.append(start or UNKNOWN)
+            self.ends.append(end or UNKNOWN)
+            feature_type = interned.string(feature.type)
+            self.type_codes.append(type_codes.setdefault(feature_type, len(type_codes)))
+            self.description_ids.append(description_ids.setdefault(feature.description, len(description_ids)))
+        self.types: Tuple[Optional[str], ...] = tuple(type_codes)
+        self.descriptions: Tuple[Optional[str], ...] = tuple(description_ids)
+        self._build_index()
+
+    def _build_index(self):
+        # Features without a position are never part of a range query
+        located = [i for i in range(len(self.starts)) if self.starts[i] != UNKNOWN]
+        located.sort(key=self.starts.__getitem__)
+        self._order = array("I", located)
+        self._sorted_starts = array("I", (self.starts[i] for i in located))
+        self._max_ends = array("I")
+        max_end = 0
+        for i in located:
+            # A point feature may only carry its start
+            max_end = max(max_end, self.ends[i] or self.starts[i])
+            self._max_ends.append(max_end)
+
+    def __getstate__(self):
+        return {name: getattr(self, name) for name in self.__slots__ if not name.startswith("_")}
+
+    def __setstate__(self, state):
+        for name, value in state.items():
+            setattr(self, name, value)
+        self.types = tuple(get_intern_table().string(t) for t in self.types)
+        self._build_index()
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def feature(self, index: int) -> Feature:
+        """
+        Materialize a single feature.
+        """
+        if index in self.odd_locations:
+            location = self.odd_locations[index]
+        else:
+            location = format_location(self.starts[index] or None, self.ends[index] or None)
+        return Feature(
+            type=self.types[self.type_codes[index]],
+            location=location,
+            description=self.descriptions[self.description_ids[index]],
+        )
+
+    def to_features(self, indexes: Optional[Sequence[int]] = None) -> List[Feature]:
+        if indexes is None:
+            indexes = range(len(self))
+        return [self.feature(i) for i in indexes]
+
+    def overlapping(self, start: Optional[int] = None, end: Optional[int] = None) -> List[int]:
+        """
+        Find the features overlapping a sequence range.
+
+        Args:
+            start (int): Only features ending at or after this position.
+            end (int): Only features starting at or before this position.
+
+        Returns:
+            List[int]: The feature indexes, in their original order.
+        """
+        # Sorted by start, the features starting after `end` form the tail;
+        # with the ends' running maximum, those ending before `start` form
+        # the head. Only the slice in between needs checking.
+        high = bisect_right(self._sorted_starts, end) if end is not None else len(self._order)
+        low = bisect_left(self._max_ends, start) if start is not None else 0
+        if start is None:
+            return sorted(self._order[low:high])
+        return sorted(
+            i for i in self._order[low:high]
+            if (self.ends[i] or self.starts[i]) >= start
+        )
+
+    def select(
+        self,
+        feature_type: Optional[str] = None,
+        start: Optional[int] = None,
+        end: Optional[int] = None,
+    ) -> List[int]:
+        """
+        Select the features of a given type and/or overlapping a sequence range.
+
+        Args:
+            feature_type (str): Only keep features of this type (case-insensitive).
+            start (int): Only keep features ending at or after this position.
+            end (int): Only keep features starting at or before this position.
+
+        Returns:
+            List[int]: The indexes of the matching features, in their original order.
+        """
+        if start is None and end is None:
+            indexes = range(len(self))
+        else:
+            indexes = self.overlapping(start, end)
+        if not feature_type:
+            return list(indexes)
+        feature_type = feature_type.lower()
+        codes = {code for code, name in enumerate(self.types) if (name or "").lower() == feature_type}
+        return [i for i in indexes if self.type_codes[i] in codes]
+
+
+def paginate(items: Sequence[T], offset: int, limit: int) -> dict:
+    """
+    Slice one page out of a list.
+
+    Returns:
+        dict: The total number of items, the paging parameters and the
+        items of the page.
+    """
+    return {
+        "total": len(items),
+        "offset": offset,
+        "limit": limit,
+        "items": list(items[offset:offset + limit]),
+    }
@@ -0,0 +1,161 @@
+import sys
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Dict, Hashable, Iterable, Iterator, List, Optional, Tuple, TypeVar
+
+from pydantic import BaseModel
+
+from core.config import get_config
+from schema.protein import ProteinData
+
+T = TypeVar("T")
+M = TypeVar("M", bound=BaseModel)
+
+
+def model_size(model: BaseModel) -> int:
+    """
+    Approximate bytes held by a flat model: the instance, its field dict
+    and its string values.
+    """
+    return sys.getsizeof(model) + sys.getsizeof(model.__dict__) + sum(
+        sys.getsizeof(value) for value in model.__dict__.values() if isinstance(value, str))
+
+
+class InternTable:
+    """
+    Bounded table of canonical instances of repeated annotation values.
+
+    Organisms, disease associations, subcellular locations and feature
+    types recur across thousands of entries. Interning maps every equal
+    value to one shared instance, so each entry holds a reference rather
+    than its own copy. Interned models are frozen, so sharing them is safe.
+
+    The table keeps the `max_entries` most recently used values; values
+    evicted stay shared by the entries already holding them. The memory
+    sharing saves is measured per set of entries, by `InternSavings`.
+    """
+
+    def __init__(self, max_entries: int = 100000):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._values: "OrderedDict[Hashable, object]" = OrderedDict()
+        # Snapshot and store loads run in threads too
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def _intern(self, key: Hashable, value: T) -> T:
+        with self._lock:
+            shared = self._values.get(key)
+            if shared is not None:
+                self._values.move_to_end(key)
+                if shared is not value:
+                    self.hits += 1
+                return shared
+            self.misses += 1
+            self._values[key] = value
+            if len(self._values) > self.max_entries:
+                self._values.popitem(last=False)
+            return value
+
+    def string(self, value: Optional[str]) -> Optional[str]:
+        if not value:
+            return value
+        return self._intern(value, value)
+
+    def model(self, value: Optional[M]) -> Optional[M]:
+        """
+        The shared instance equal to a flat model whose fields are all
+        hashable, such as `Organism` or `DiseaseAssociation`.
+        """
+        if value is None:
+            return value
+        key = (type(value), *value.__dict__.values())
+        return self._intern(key, value)
+
+    def protein(self, data: ProteinData) -> ProteinData:
+        """
+        Intern the repeated values of an entry, in place; meant for entries
+        just parsed or loaded, before anything else refers to them.
+        """
+        data.organism = self.model(data.organism)
+        data.disease_associations = [self.model(disease) for disease in data.disease_associations]
+        data.subcellular_locations = [self.string(location) for location in data.subcellular_locations]
+        return data
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._values),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+def interned_values(data: ProteinData, feature_types: Iterable[Optional[str]] = ()) -> Iterator[Tuple[object, int]]:
+    """
+    The values of an entry that are interned, with their sizes in bytes.
+    """
+    if data.organism is not None:
+        yield data.organism, model_size(data.organism)
+    for disease in data.disease_associations:
+        yield disease, model_size(disease)
+    for value in (*data.subcellular_locations, *feature_types):
+        if value:
+            yield value, sys.getsizeof(value)
+
+
+class InternSavings:
+    """
+    The memory interning currently saves across a set of entries, such as
+    the ones in a cache.
+
+    Every reference to an interned value beyond its first would otherwise
+    be a copy of its own, so `saved_bytes` is the size of each value times
+    its references less one. Entries are added when stored and removed
+    when evicted or invalidated, so it follows the entries held, not the
+    traffic that produced them.
+    """
+
+    def __init__(self):
+        self.saved_bytes = 0
+        # id of a value -> [value, references, size]; holding the value
+        # keeps its id from being reused while counted
+        self._references: Dict[int, List] = {}
+
+    def add(self, data: ProteinData, feature_types: Iterable[Optional[str]] = ()):
+        for value, size in interned_values(data, feature_types):
+            held = self._references.get(id(value))
+            if held is None:
+                self._references[id(value)] = [value, 1, size]
+            else:
+                held[1] += 1
+                self.saved_bytes += held[2]
+
+    def remove(self, data: ProteinData, feature_types: Iterable[Optional[str]] = ()):
+        for value, _ in interned_values(data, feature_types):
+            held = self._references.get(id(value))
+            if held is None:
+                continue
+            held[1] -= 1
+            if held[1]:
+                self.saved_bytes -= held[2]
+            else:
+                del self._references[id(value)]
+
+    def clear(self):
+        self.saved_bytes = 0
+        self._references.clear()
+
+
+# get_intern_table returns the process-wide intern table
+@lru_cache
+def get_intern_table() -> InternTable:
+    return InternTable(max_entries=get_config().intern_max_entries)
@@ -0,0 +1,306 @@
+import asyncio
+import json
+import logging
+import sqlite3
+import time
+import uuid
+import zlib
+from functools import lru_cache
+from typing import AsyncIterator, Callable, Iterator, List, Optional, Tuple
+
+from core.config import get_config
+from schema.protein import HEAVY_FIELDS
+from service.resolver import ProteinResolver
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+
+PENDING = "pending"
+OK = "ok"
+ERROR = "error"
+
+
+class JobStore:
+    """
+    SQLite store of batch jobs and their per-item results.
+
+    Every item of a job is a row that starts out pending and is updated
+    with its result (zlib-compressed JSON) or error when processed. Items
+    that are no longer pending are never processed again, so a job picked
+    up after a restart continues where its last checkpoint left off.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " job_id TEXT PRIMARY KEY,"
+            " created_at REAL NOT NULL,"
+            " status TEXT NOT NULL,"
+            " full INTEGER NOT NULL,"
+            " total INTEGER NOT NULL,"
+            " done INTEGER NOT NULL DEFAULT 0,"
+            " failed INTEGER NOT NULL DEFAULT 0"
+            ")"
+        )
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS items ("
+            " job_id TEXT NOT NULL,"
+            " position INTEGER NOT NULL,"
+            " protein_id TEXT NOT NULL,"
+            " status TEXT NOT NULL,"
+            " data BLOB,"
+            " error TEXT,"
+            " PRIMARY KEY (job_id, position)"
+            ") WITHOUT ROWID"
+        )
+
+    def close(self):
+        self.connection.close()
+
+    def create(self, job_id: str, protein_ids: List[str], full: bool = False):
+        with self.connection:
+            self.connection.execute("BEGIN")
+            self.connection.execute(
+                "INSERT INTO jobs (job_id, created_at, status, full, total) VALUES (?, ?, ?, ?, ?)",
+                (job_id, time.time(), QUEUED, int(full), len(protein_ids)),
+            )
+            self.connection.executemany(
+                "INSERT INTO items (job_id, position, protein_id, status) VALUES (?, ?, ?, ?)",
+                ((job_id, position, protein_id, PENDING) for position, protein_id in enumerate(protein_ids)),
+            )
+
+    def job(self, job_id: str) -> Optional[dict]:
+        row = self.connection.execute(
+            "SELECT status, full, total, done, failed, created_at FROM jobs WHERE job_id = ?", (job_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        status, full, total, done, failed, created_at = row
+        return {
+            "job_id": job_id,
+            "status": status,
+            "full": bool(full),
+            "total": total,
+            "done": done,
+            "failed": failed,
+            "created_at": created_at,
+        }
+
+    def set_status(self, job_id: str, status: str):
+        self.connection.execute("UPDATE jobs SET status = ? WHERE job_id = ?", (status, job_id))
+
+    def unfinished(self) -> List[str]:
+        return [job_id for (job_id,) in self.connection.execute(
+            "SELECT job_id FROM jobs WHERE status != ? ORDER BY created_at", (COMPLETED,))]
+
+    def pending_items(self, job_id: str) -> List[Tuple[int, str]]:
+        return self.connection.execute(
+            "SELECT position, protein_id FROM items WHERE job_id = ? AND status = ? ORDER BY position",
+            (job_id, PENDING),
+        ).fetchall()
+
+    def save_results(self, job_id: str, results: List[Tuple[int, str, Optional[bytes], Optional[str]]]):
+        """
+        Checkpoint processed items and the job's counters in one transaction.
+
+        Args:
+            job_id (str): The job.
+            results (list): (position, status, compressed JSON data, error)
+                tuples.
+        """
+        failed = sum(1 for _, status, _, _ in results if status == ERROR)
+        with self.connection:
+            self.connection.execute("BEGIN")
+            self.connection.executemany(
+                "UPDATE items SET status = ?, data = ?, error = ? WHERE job_id = ? AND position = ?",
+                ((status, data, error, job_id, position) for position, status, data, error in results),
+            )
+            self.connection.execute(
+                "UPDATE jobs SET done = done + ?, failed = failed + ? WHERE job_id = ?",
+                (len(results) - failed, failed, job_id),
+            )
+
+    def iter_results(self, job_id: str, batch_size: int = 500) -> Iterator[Tuple[str, str, Optional[bytes], Optional[str]]]:
+        """
+        Yield the processed items of a job in submission order, a page at a
+        time so no more than one page is held in memory.
+        """
+        position = -1
+        while True:
+            rows = self.connection.execute(
+                "SELECT position, protein_id, status, data, error FROM items"
+                " WHERE job_id = ? AND position > ? AND status != ? ORDER BY position LIMIT ?",
+                (job_id, position, PENDING, batch_size),
+            ).fetchall()
+            if not rows:
+                return
+            for position, protein_id, status, data, error in rows:
+                yield protein_id, status, data, error
+
+
+def result_line(protein_id: str, status: str, data: Optional[bytes], error: Optional[str]) -> str:
+    """
+    Format one result as an NDJSON line, splicing in the stored JSON as-is.
+    """
+    line = f'{{"protein_id": {json.dumps(protein_id)}, "status": "{status}"'
+    if data is not None:
+        line += f', "data": {zlib.decompress(data).decode()}'
+    if error is not None:
+        line += f', "error": {json.dumps(error)}'
+    return line + "}\n"
+
+
+class JobManager:
+    """
+    Runs batch jobs in the background, one at a time in submission order,
+    resolving each job's items with bounded concurrency. Results are
+    checkpointed to the job store every `checkpoint_items` items and when
+    the job ends; on startup, unfinished jobs are resumed.
+    """
+
+    def __init__(
+        self,
+        store: JobStore,
+        resolver_factory: Callable[[], ProteinResolver] = ProteinResolver.standalone,
+        concurrency: int = 8,
+        checkpoint_items: int = 100,
+    ):
+        self.store = store
+        self.resolver_factory = resolver_factory
+        self.concurrency = concurrency
+        self.checkpoint_items = checkpoint_items
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def submit(self, protein_ids: List[str], full: bool = False) -> str:
+        """
+        Create a job and queue it.
+
+        Args:
+            protein_ids (List[str]): The IDs to resolve.
+            full (bool): Whether results include features, isoforms and
+                disease associations.
+
+        Returns:
+            str: The job ID.
+        """
+        job_id = uuid.uuid4().hex
+        self.store.create(job_id, protein_ids, full)
+        if self._queue is not None:
+            self._queue.put_nowait(job_id)
+        return job_id
+
+    def status(self, job_id: str) -> Optional[dict]:
+        return self.store.job(job_id)
+
+    def start(self, resume: bool = True) -> asyncio.Task:
+        """
+        Queue the unfinished jobs of a previous run and start processing.
+
+        Args:
+            resume (bool): Whether to pick up unfinished jobs; with several
+                worker processes on one job store only one of them does.
+
+        Returns:
+            asyncio.Task: The running dispatcher task.
+        """
+        self._queue = asyncio.Queue()
+        if resume:
+            for job_id in self.store.unfinished():
+                self._queue.put_nowait(job_id)
+        self._task = asyncio.create_task(self._dispatch())
+        return self._task
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def events(self, job_id: str, interval: float = 0.5) -> AsyncIterator[dict]:
+        """
+        Follow a job's progress.
+
+        Yields:
+            dict: The job status, each time it changes, until it completes.
+        """
+        last = None
+        while True:
+            status = self.store.job(job_id)
+            if status != last:
+                yield status
+                last = status
+            if status["status"] == COMPLETED:
+                return
+            await asyncio.sleep(interval)
+
+    async def _dispatch(self):
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await self._run(job_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Job {job_id} failed: {e}")
+
+    async def _run(self, job_id: str):
+        job = self.store.job(job_id)
+        if job is None or job["status"] == COMPLETED:
+            return
+        self.store.set_status(job_id, RUNNING)
+        pending = iter(self.store.pending_items(job_id))
+        resolver = self.resolver_factory()
+        results = []
+
+        async def process(protein_id: str) -> Tuple[str, Optional[bytes], Optional[str]]:
+            try:
+                # Job items are not cached: one large job would otherwise
+                # evict the entries live requests depend on
+                resolved = await resolver.resolve_entry(protein_id, background=True, store=False)
+            except Exception as e:
+                return ERROR, None, str(e)
+            if resolved is None:
+                return ERROR, None, "Invalid protein ID format."
+            if job["full"]:
+                data = resolved.materialize().model_dump_json()
+            else:
+                data = resolved.summary().model_dump_json(exclude=HEAVY_FIELDS)
+            return OK, zlib.compress(data.encode(), 1), None
+
+        async def worker():
+            for position, protein_id in pending:
+                results.append((position, *await process(protein_id)))
+                if len(results) >= self.checkpoint_items:
+                    self.store.save_results(job_id, results[:])
+                    results.clear()
+
+        try:
+            await asyncio.gather(*(worker() for _ in range(self.concurrency)))
+        finally:
+            # Also on cancellation, so a shutdown keeps the finished items
+            if results:
+                self.store.save_results(job_id, results)
+        self.store.set_status(job_id, COMPLETED)
+        logger.info(f"Job {job_id} completed")
+
+
+# get_job_manager returns the process-wide batch job manager
+@lru_cache
+def get_job_manager() -> JobManager:
+    cfg = get_config()
+    return JobManager(
+        JobStore(cfg.job_store_path or ":memory:"),
+        concurrency=cfg.job_concurrency,
+        checkpoint_items=cfg.job_checkpoint_items,
+    )
@@ -1,7 +1,14 @@
+from __future__ import annotations
+
+import re
+from typing import TYPE_CHECKING, Optional, Tuple
+
+from service.pdb.mirrors import get_mirror_router
 from service.utils import pdb_file_download_link
-from schema.pdb import PDBEntry
 from schema.protein import EntryAudit, ProteinData
-from httpx import AsyncClient
+
+if TYPE_CHECKING:
+    from schema.pdb import PDBEntry
 
 
 class PDBFetchService:
@@ -9,24 +16,63 @@ class PDBFetchService:
     Service to handle fetching and parsing protein data from the PDB API.
     """
 
-    BASE_URL = "https://data.rcsb.org/rest/v1/core/entry"
+    def __init__(self):
+        self.mirrors = get_mirror_router()
 
     async def fetch_protein_data(self, protein_id: str) -> PDBEntry:
         """
-        Fetch raw protein data from the PDB API.
+        Fetch raw protein data from the fastest PDB mirror.
 
         Args:
             protein_id (str): The PDB ID of the protein.
 
         Returns:
-            dict: Raw protein data.
-        """
-        async with AsyncClient() as client:
-            response = await client.get(f"{self.BASE_URL}/{protein_id}")
-            if response.status_code != 200:
-                raise Exception(f"Failed to fetch protein data for ID {protein_id}")
-            data = PDBEntry(**response.json())
-            return data
+            PDBEntry: The entry metadata, normalised to RCSB's shape.
+        """
+        return await self.mirrors.fetch_entry(protein_id)
+
+    async def fetch_chain_sequence(self, pdb_id: str, chain: Optional[str] = None) -> Tuple[str, str]:
+        """
+        Fetch the sequence of one chain of a PDB entry from the fastest
+        mirror.
+
+        Args:
+            pdb_id (str): The PDB ID of the entry.
+            chain (str): The chain ID; defaults to the first entity.
+
+        Returns:
+            tuple: The FASTA header and the residues of the chain's entity.
+        """
+        for header, residues in await self.mirrors.fetch_sequences(pdb_id):
+            if chain is None or chain in self.header_chains(header):
+                return header, residues
+        raise LookupError(f"PDB entry {pdb_id} has no chain {chain}")
+
+    async def fetch_structure(self, pdb_id: str) -> bytes:
+        """
+        Fetch the coordinates of a PDB entry as BinaryCIF from the fastest
+        mirror that serves them.
+
+        Args:
+            pdb_id (str): The PDB ID of the entry.
+
+        Returns:
+            bytes: The BinaryCIF file, to be decoded with `service.bcif`.
+        """
+        return await self.mirrors.fetch_structure(pdb_id)
+
+    @staticmethod
+    def header_chains(header: str) -> set:
+        """
+        The chain IDs named by an RCSB-style FASTA header such as
+        "4HHB_1|Chains A, C|Hemoglobin subunit alpha|Homo sapiens (9606)",
+        both label and author IDs ("A[auth B]").
+        """
+        fields = header.split("|")
+        if len(fields) < 2:
+            return set()
+        names = fields[1].removeprefix("Chains ").removeprefix("Chain ")
+        return set(re.findall(r"[A-Za-z0-9]+", names.replace("auth", " ")))
 
     async def parse_protein_data(self, data: PDBEntry) -> ProteinData:
         """
@@ -0,0 +1,606 @@
+"""
+PDB archive mirrors and latency-aware routing between them.
+
+Each wwPDB partner serves entry metadata in its own shape; the mirror
+adapters below normalise RCSB's data API, PDBe's entry summaries and
+PDBj's mmJSON into `PDBEntry`, and their polymer sequences into RCSB-style
+FASTA records. `MirrorRouter` keeps an exponentially
+weighted moving average (EWMA) of each mirror's latency and sends every
+request to the fastest healthy one, optionally racing the two fastest.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from functools import lru_cache
+from typing import TYPE_CHECKING, Awaitable, Callable, Dict, List, Optional, Sequence, Set, Tuple, TypeVar
+
+from core.config import get_config
+from core.lazy import lazy_import
+from service.fasta import FastaStreamParser
+
+if TYPE_CHECKING:
+    from schema.pdb import PDBEntry
+
+httpx = lazy_import("httpx")
+pdb_schema = lazy_import("schema.pdb")
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class EntryNotFound(LookupError):
+    """
+    The mirror answered, but has no such entry; other mirrors are not
+    asked, as the archive is the same everywhere.
+    """
+
+
+class PDBMirror:
+    """
+    One mirror of the PDB archive.
+    """
+
+    name = ""
+
+    async def fetch_entry(self, pdb_id: str, timeout: float) -> PDBEntry:
+        """
+        Fetch the metadata of an entry.
+
+        Args:
+            pdb_id (str): The PDB ID.
+            timeout (float): Seconds to wait for the mirror.
+
+        Returns:
+            PDBEntry: The entry, normalised to the RCSB data API's shape.
+        """
+        raise NotImplementedError
+
+    async def fetch_sequences(self, pdb_id: str, timeout: float) -> List[Tuple[str, str]]:
+        """
+        Fetch the polymer sequences of an entry.
+
+        Args:
+            pdb_id (str): The PDB ID.
+            timeout (float): Seconds to wait for the mirror.
+
+        Returns:
+            list: A (FASTA header, residues) record per polymer entity, with
+            headers in RCSB's form (see `fasta_header`).
+        """
+        raise NotImplementedError
+
+    def download_link(self, pdb_id: str) -> str:
+        """
+        The URL of the entry's mmCIF coordinate file on this mirror.
+        """
+        raise NotImplementedError
+
+    def bcif_link(self, pdb_id: str) -> Optional[str]:
+        """
+        The URL of the entry's BinaryCIF coordinates on this mirror, or None
+        when the mirror serves none.
+        """
+        return None
+
+    async def fetch_structure(self, pdb_id: str, timeout: float) -> bytes:
+        """
+        Fetch the entry's coordinates as BinaryCIF.
+        """
+        return (await self._get(self.bcif_link(pdb_id), pdb_id, timeout)).content
+
+    async def _get(self, url: str, pdb_id: str, timeout: float):
+        async with httpx.AsyncClient(timeout=timeout) as client:
+            response = await client.get(url)
+        if response.status_code == 404:
+            raise EntryNotFound(f"PDB entry {pdb_id} not found on {self.name}")
+        if response.status_code != 200:
+            raise Exception(f"{self.name} answered {response.status_code} for PDB entry {pdb_id}")
+        return response
+
+    async def _get_json(self, url: str, pdb_id: str, timeout: float):
+        return (await self._get(url, pdb_id, timeout)).json()
+
+
+class RCSBMirror(PDBMirror):
+    """
+    RCSB PDB (US), whose data API `PDBEntry` mirrors.
+    """
+
+    name = "rcsb"
+    BASE_URL = "https://data.rcsb.org/rest/v1/core/entry"
+    MODELS_URL = "https://models.rcsb.org"
+    FASTA_URL = "https://www.rcsb.org/fasta/entry"
+
+    def __init__(self, base_url: str = "", models_url: str = "", fasta_url: str = ""):
+        self.base_url = base_url or self.BASE_URL
+        self.models_url = models_url or self.MODELS_URL
+        self.fasta_url = fasta_url or self.FASTA_URL
+
+    async def fetch_entry(self, pdb_id: str, timeout: float) -> PDBEntry:
+        return pdb_schema.PDBEntry(**await self._get_json(f"{self.base_url}/{pdb_id}", pdb_id, timeout))
+
+    async def fetch_sequences(self, pdb_id: str, timeout: float) -> List[Tuple[str, str]]:
+        response = await self._get(f"{self.fasta_url}/{pdb_id}", pdb_id, timeout)
+        parser = FastaStreamParser()
+        return [*parser.feed(response.text), *parser.close()]
+
+    def download_link(self, pdb_id: str) -> str:
+        return f"https://files.rcsb.org/download/{pdb_id}.cif"
+
+    def bcif_link(self, pdb_id: str) -> Optional[str]:
+        return f"{self.models_url}/{pdb_id}.bcif"
+
+
+def rcsb_date(value: Optional[str]) -> str:
+    """
+    A date in the RCSB data API's form, "1984-07-17T00:00:00+0000", from
+    PDBe's "19840717" or mmCIF's "1984-07-17", so that entries read the
+    same whichever mirror served them.
+    """
+    if not value:
+        return ""
+    if len(value) == 8 and value.isdigit():
+        value = f"{value[:4]}-{value[4:6]}-{value[6:]}"
+    if len(value) == 10:
+        return f"{value}T00:00:00+0000"
+    return value
+
+
+def fasta_header(pdb_id: str, entity_id, chains: Sequence[str], description: str = "") -> str:
+    """
+    An RCSB FASTA header, "4HHB_1|Chains A, C|Hemoglobin subunit alpha",
+    for a polymer entity served by another mirror.
+    """
+    label = "Chain" if len(chains) == 1 else "Chains"
+    return f"{pdb_id.upper()}_{entity_id}|{label} {', '.join(chains)}|{description}"
+
+
+class PDBeMirror(PDBMirror):
+    """
+    PDBe (EU), read through its entry summary API.
+    """
+
+    name = "pdbe"
+    BASE_URL = "https://www.ebi.ac.uk/pdbe/api/pdb/entry/summary"
+    MOLECULES_URL = "https://www.ebi.ac.uk/pdbe/api/pdb/entry/molecules"
+
+    def __init__(self, base_url: str = "", molecules_url: str = ""):
+        self.base_url = base_url or self.BASE_URL
+        self.molecules_url = molecules_url or self.MOLECULES_URL
+
+    async def fetch_entry(self, pdb_id: str, timeout: float) -> PDBEntry:
+        data = await self._get_json(f"{self.base_url}/{pdb_id.lower()}", pdb_id, timeout)
+        summaries = data.get(pdb_id.lower()) or []
+        if not summaries:
+            raise EntryNotFound(f"PDB entry {pdb_id} not found on {self.name}")
+        return self.normalise(pdb_id, summaries[0])
+
+    @staticmethod
+    def normalise(pdb_id: str, summary: dict) -> PDBEntry:
+        pdb_id = pdb_id.upper()
+        methods = summary.get("experimental_method") or []
+        return pdb_schema.PDBEntry(
+            rcsb_id=pdb_id,
+            audit_author=[
+                {"name": name, "pdbx_ordinal": ordinal}
+                for ordinal, name in enumerate(summary.get("entry_authors") or [], 1)
+            ],
+            exptl=[{"method": method.upper()} for method in methods],
+            rcsb_accession_info={
+                "deposit_date": rcsb_date(summary.get("deposition_date")),
+                "initial_release_date": rcsb_date(summary.get("release_date")),
+                "revision_date": rcsb_date(summary.get("revision_date")),
+            },
+            rcsb_entry_container_identifiers={
+                "entry_id": pdb_id,
+                "rcsb_id": pdb_id,
+                "assembly_ids": [str(assembly["assembly_id"]) for assembly in summary.get("assemblies") or []],
+            },
+            rcsb_entry_info={"experimental_method": methods[0] if methods else ""},
+            struct={"title": summary.get("title") or ""},
+        )
+
+    async def fetch_sequences(self, pdb_id: str, timeout: float) -> List[Tuple[str, str]]:
+        data = await self._get_json(f"{self.molecules_url}/{pdb_id.lower()}", pdb_id, timeout)
+        molecules = data.get(pdb_id.lower()) or []
+        if not molecules:
+            raise EntryNotFound(f"PDB entry {pdb_id} not found on {self.name}")
+        # Ligands and waters are entities too, but without a sequence
+        return [
+            (fasta_header(pdb_id, molecule["entity_id"], molecule.get("in_chains") or [],
+                          ", ".join(molecule.get("molecule_name") or [])),
+             molecule["sequence"])
+            for molecule in molecules if molecule.get("sequence")
+        ]
+
+    def download_link(self, pdb_id: str) -> str:
+        return f"https://www.ebi.ac.uk/pdbe/entry-files/download/{pdb_id.lower()}.cif"
+
+    def bcif_link(self, pdb_id: str) -> Optional[str]:
+        return f"https://www.ebi.ac.uk/pdbe/entry-files/download/{pdb_id.lower()}.bcif"
+
+
+def mmjson_rows(category: Optional[Dict[str, list]]) -> List[dict]:
+    """
+    Turn an mmJSON category (item name to column of values) into rows,
+    leaving out null values so model defaults apply. Values are passed on
+    as strings, which pydantic coerces to the fields' numeric types.
+    """
+    if not category:
+        return []
+    names = list(category)
+    return [
+        {name: str(value) for name, value in zip(names, values) if value is not None}
+        for values in zip(*category.values())
+    ]
+
+
+class PDBjMirror(PDBMirror):
+    """
+    PDBj (Japan), read as mmJSON, whose categories are the mmCIF ones the
+    RCSB data API is built from.
+    """
+
+    name = "pdbj"
+    BASE_URL = "https://pdbj.org/rest/newweb/fetch/file"
+
+    # PDBEntry fields holding a single row rather than a list
+    SINGLE = ("cell", "struct", "symmetry")
+    LISTS = (
+        "audit_author", "citation", "diffrn", "exptl", "exptl_crystal",
+        "pdbx_audit_revision_category", "pdbx_audit_revision_details",
+        "pdbx_audit_revision_group", "pdbx_audit_revision_history",
+    )
+
+    def __init__(self, base_url: str = ""):
+        self.base_url = base_url or self.BASE_URL
+
+    async def fetch_entry(self, pdb_id: str, timeout: float) -> PDBEntry:
+        return self.normalise(pdb_id, await self._block(pdb_id, timeout))
+
+    async def fetch_sequences(self, pdb_id: str, timeout: float) -> List[Tuple[str, str]]:
+        return self.sequences(pdb_id, await self._block(pdb_id, timeout))
+
+    async def _block(self, pdb_id: str, timeout: float) -> Dict[str, dict]:
+        data = await self._get_json(
+            f"{self.base_url}?cat=pdb&type=json&id={pdb_id.lower()}", pdb_id, timeout)
+        block = data.get(f"data_{pdb_id.upper()}")
+        if not block:
+            raise EntryNotFound(f"PDB entry {pdb_id} not found on {self.name}")
+        return block
+
+    @staticmethod
+    def sequences(pdb_id: str, block: Dict[str, dict]) -> List[Tuple[str, str]]:
+        descriptions = {row.get("id"): row.get("pdbx_description", "") for row in mmjson_rows(block.get("entity"))}
+        return [
+            (fasta_header(pdb_id, row.get("entity_id"), row.get("pdbx_strand_id", "").split(","),
+                          descriptions.get(row.get("entity_id"), "")),
+             "".join(row.get("pdbx_seq_one_letter_code_can", "").split()))
+            for row in mmjson_rows(block.get("entity_poly"))
+        ]
+
+    @classmethod
+    def normalise(cls, pdb_id: str, block: Dict[str, dict]) -> PDBEntry:
+        pdb_id = pdb_id.upper()
+        entry = {name: mmjson_rows(block.get(name)) for name in cls.LISTS}
+        for name in cls.SINGLE:
+            rows = mmjson_rows(block.get(name))
+            if rows:
+                entry[name] = rows[0]
+        history = entry["pdbx_audit_revision_history"]
+        for row in history:
+            row["revision_date"] = rcsb_date(row.get("revision_date"))
+        status = (mmjson_rows(block.get("pdbx_database_status")) or [{}])[0]
+        latest = history[-1] if history else {}
+        methods = [row.get("method", "") for row in entry["exptl"]]
+        return pdb_schema.PDBEntry(
+            **entry,
+            rcsb_id=pdb_id,
+            rcsb_accession_info={
+                "deposit_date": rcsb_date(status.get("recvd_initial_deposition_date")),
+                "initial_release_date": history[0].get("revision_date", "") if history else "",
+                "revision_date": latest.get("revision_date", ""),
+                "major_revision": latest.get("major_revision", 0),
+                "minor_revision": latest.get("minor_revision", 0),
+                "status_code": status.get("status_code", ""),
+            },
+            rcsb_entry_container_identifiers={"entry_id": pdb_id, "rcsb_id": pdb_id},
+            rcsb_entry_info={"experimental_method": methods[0] if methods else ""},
+        )
+
+    def download_link(self, pdb_id: str) -> str:
+        return f"{self.base_url}?cat=pdb&type=cif&id={pdb_id.lower()}"
+
+
+MIRRORS = {mirror.name: mirror for mirror in (RCSBMirror, PDBeMirror, PDBjMirror)}
+
+
+class MirrorRouter:
+    """
+    Routes PDB requests to the fastest healthy mirror.
+
+    Every request updates the mirror's latency EWMA; a failed request
+    counts as `timeout` seconds, and `max_failures` consecutive failures
+    take a mirror out of rotation for `cooldown` seconds. Mirrors are tried
+    fastest first, falling over to the next on failure. Mirrors that have
+    not been used yet rank after those that have, in configured order.
+
+    Requests only measure the mirrors they go to, so a healthy mirror whose
+    latency is unknown or older than `probe_interval` seconds is probed:
+    the next entry request is also sent to it in the background, and the
+    answer only feeds its EWMA. Untried mirrors are first probed once the
+    router is `probe_interval` seconds old, so the first configured mirror
+    is the default until then.
+
+    Args:
+        mirrors (Sequence[PDBMirror]): The mirrors, in order of preference.
+        race (bool): Whether to send each request to the two fastest
+            mirrors and take the first answer.
+        timeout (float): Seconds to wait for a mirror.
+        structure_timeout (float): Seconds to wait for a coordinate download.
+        alpha (float): Weight of the newest sample in the EWMA.
+        probe_interval (float): Seconds after which a mirror's latency is
+            measured again; 0 disables probing.
+    """
+
+    def __init__(
+        self,
+        mirrors: Sequence[PDBMirror],
+        race: bool = False,
+        timeout: float = 5,
+        structure_timeout: float = 30,
+        alpha: float = 0.3,
+        max_failures: int = 3,
+        cooldown: float = 30,
+        probe_interval: float = 60,
+    ):
+        if not mirrors:
+            raise ValueError("At least one PDB mirror is required")
+        self.mirrors = list(mirrors)
+        self.race = race
+        self.timeout = timeout
+        self.structure_timeout = structure_timeout
+        self.alpha = alpha
+        self.max_failures = max_failures
+        self.cooldown = cooldown
+        self.probe_interval = probe_interval
+        self.latency: Dict[str, Optional[float]] = {mirror.name: None for mirror in self.mirrors}
+        # When each mirror was last measured (or probed), by time.monotonic()
+        self._measured_at: Dict[str, float] = {mirror.name: time.monotonic() for mirror in self.mirrors}
+        self._probes: Set[asyncio.Task] = set()
+        self._failures: Dict[str, int] = {mirror.name: 0 for mirror in self.mirrors}
+        self._down_until: Dict[str, float] = {mirror.name: 0 for mirror in self.mirrors}
+
+    def healthy(self, mirror: PDBMirror) -> bool:
+        return self._down_until[mirror.name] <= time.monotonic()
+
+    def ranked(self) -> List[PDBMirror]:
+        """
+        The mirrors in the order they are tried: healthy ones by latency
+        EWMA, then untried ones, then those cooling down after failures.
+        """
+        def rank(item):
+            position, mirror = item
+            latency = self.latency[mirror.name]
+            return (not self.healthy(mirror), latency is None, latency or 0, position)
+        return [mirror for _, mirror in sorted(enumerate(self.mirrors), key=rank)]
+
+    def record(self, mirror: PDBMirror, latency: float, ok: bool):
+        self._measured_at[mirror.name] = time.monotonic()
+        previous = self.latency[mirror.name]
+        self.latency[mirror.name] = latency if previous is None else (
+            self.alpha * latency + (1 - self.alpha) * previous)
+        if ok:
+            self._failures[mirror.name] = 0
+            return
+        self._failures[mirror.name] += 1
+        if self._failures[mirror.name] >= self.max_failures:
+            self._down_until[mirror.name] = time.monotonic() + self.cooldown
+            logger.warning(f"PDB mirror {mirror.name} is down for {self.cooldown}s")
+
+    def _record_lower_bound(self, mirror: PDBMirror, latency: float):
+        """
+        Account for a request cancelled after `latency` seconds. Recording
+        it as a sample would pull the mirror towards the winner's latency,
+        so it only counts when above the mirror's average, and not at all
+        for a mirror that has no average yet.
+        """
+        previous = self.latency[mirror.name]
+        if previous is not None and latency > previous:
+            self.latency[mirror.name] = self.alpha * latency + (1 - self.alpha) * previous
+
+    async def _fetch_from(self, mirror: PDBMirror, pdb_id: str) -> PDBEntry:
+        started = time.monotonic()
+        try:
+            entry = await mirror.fetch_entry(pdb_id, self.timeout)
+        except EntryNotFound:
+            self.record(mirror, time.monotonic() - started, ok=True)
+            raise
+        except asyncio.CancelledError:
+            # Lost a race: its latency is unknown but at least this much,
+            # which may only ever raise the average
+            self._record_lower_bound(mirror, time.monotonic() - started)
+            raise
+        except Exception:
+            self.record(mirror, self.timeout, ok=False)
+            raise
+        self.record(mirror, time.monotonic() - started, ok=True)
+        return entry
+
+    async def fetch_entry(self, pdb_id: str) -> PDBEntry:
+        """
+        Fetch an entry from the fastest mirror that can serve it.
+
+        Raises:
+            EntryNotFound: When a mirror reports there is no such entry.
+            Exception: When every mirror failed.
+        """
+        ranked = self.ranked()
+        self._probe_stale(pdb_id, ranked[0])
+        if self.race and len(ranked) > 1 and self.healthy(ranked[1]):
+            racers, ranked = ranked[:2], ranked[2:]
+            try:
+                return await self._race(racers, pdb_id)
+            except EntryNotFound:
+                raise
+            except Exception as e:
+                if not ranked:
+                    raise Exception(f"Failed to fetch protein data for ID {pdb_id}") from e
+        error = None
+        for mirror in ranked:
+            try:
+                return await self._fetch_from(mirror, pdb_id)
+            except EntryNotFound:
+                raise
+            except Exception as e:
+                logger.warning(f"PDB mirror {mirror.name} failed for {pdb_id}: {e}")
+                error = e
+        raise Exception(f"Failed to fetch protein data for ID {pdb_id}") from error
+
+    def _probe_stale(self, pdb_id: str, serving: PDBMirror):
+        """
+        Send a background request for `pdb_id` to each healthy mirror not
+        measured for `probe_interval` seconds, other than the one serving
+        the request.
+        """
+        if not self.probe_interval:
+            return
+        now = time.monotonic()
+        for mirror in self.mirrors:
+            if (mirror is serving or not self.healthy(mirror)
+                    or now - self._measured_at[mirror.name] < self.probe_interval):
+                continue
+            # One probe per interval, however it ends
+            self._measured_at[mirror.name] = now
+            task = asyncio.create_task(self._probe(mirror, pdb_id))
+            self._probes.add(task)
+            task.add_done_callback(self._probes.discard)
+
+    async def _probe(self, mirror: PDBMirror, pdb_id: str):
+        try:
+            await self._fetch_from(mirror, pdb_id)
+        except Exception as e:
+            logger.info(f"Probe of PDB mirror {mirror.name} failed: {e}")
+
+    async def _race(self, mirrors: List[PDBMirror], pdb_id: str) -> PDBEntry:
+        """
+        Ask several mirrors at once; the first answer wins and the other
+        requests are cancelled.
+        """
+        pending = {asyncio.create_task(self._fetch_from(mirror, pdb_id)) for mirror in mirrors}
+        error = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+                    if isinstance(error, EntryNotFound):
+                        raise error
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def fetch_structure(self, pdb_id: str) -> bytes:
+        """
+        Fetch an entry's BinaryCIF coordinates from the fastest mirror that
+        serves them. Downloads vary too much in size to feed the latency
+        EWMA, but their failures count towards a mirror's health.
+
+        Raises:
+            EntryNotFound: When a mirror reports there is no such entry.
+            Exception: When every mirror failed.
+        """
+        return await self._fall_over(
+            [mirror for mirror in self.ranked() if mirror.bcif_link(pdb_id) is not None],
+            pdb_id, "structure", lambda mirror: mirror.fetch_structure(pdb_id, self.structure_timeout))
+
+    async def fetch_sequences(self, pdb_id: str) -> List[Tuple[str, str]]:
+        """
+        Fetch an entry's polymer sequences from the fastest mirror, as
+        RCSB-style FASTA records whichever mirror served them. Failures
+        count towards a mirror's health, as for structures.
+
+        Raises:
+            EntryNotFound: When a mirror reports there is no such entry.
+            Exception: When every mirror failed.
+        """
+        return await self._fall_over(
+            self.ranked(), pdb_id, "sequences", lambda mirror: mirror.fetch_sequences(pdb_id, self.timeout))
+
+    async def _fall_over(
+        self,
+        mirrors: List[PDBMirror],
+        pdb_id: str,
+        what: str,
+        fetch: Callable[[PDBMirror], Awaitable[T]],
+    ) -> T:
+        error = None
+        for mirror in mirrors:
+            try:
+                return await fetch(mirror)
+            except EntryNotFound:
+                raise
+            except Exception as e:
+                self.record(mirror, self.timeout, ok=False)
+                logger.warning(f"PDB mirror {mirror.name} failed for the {what} of {pdb_id}: {e}")
+                error = e
+        raise Exception(f"Failed to fetch the {what} of PDB ID {pdb_id}") from error
+
+    def download_link(self, pdb_id: str) -> str:
+        """
+        The mmCIF coordinate file URL on the currently fastest mirror.
+        """
+        return self.ranked()[0].download_link(pdb_id)
+
+    def stats(self) -> Dict[str, dict]:
+        return {
+            mirror.name: {
+                "latency_ms": None if self.latency[mirror.name] is None else round(self.latency[mirror.name] * 1000, 1),
+                "healthy": self.healthy(mirror),
+            }
+            for mirror in self.mirrors
+        }
+
+
+def build_mirrors(
+    names: str,
+    rcsb_base_url: str = "",
+    rcsb_models_url: str = "",
+    rcsb_fasta_url: str = "",
+) -> List[PDBMirror]:
+    """
+    Args:
+        names (str): Comma separated mirror names, in order of preference.
+        rcsb_base_url (str): Overrides RCSB's data API URL.
+        rcsb_models_url (str): Overrides RCSB's BinaryCIF models URL.
+        rcsb_fasta_url (str): Overrides RCSB's FASTA URL.
+    """
+    mirrors = []
+    for name in (name.strip().lower() for name in names.split(",")):
+        if not name:
+            continue
+        if name not in MIRRORS:
+            raise ValueError(f"Unknown PDB mirror {name!r}; expected one of {', '.join(MIRRORS)}")
+        mirrors.append(
+            RCSBMirror(rcsb_base_url, rcsb_models_url, rcsb_fasta_url) if name == RCSBMirror.name
+            else MIRRORS[name]())
+    return mirrors
+
+
+# get_mirror_router returns the process-wide PDB mirror router
+@lru_cache
+def get_mirror_router() -> MirrorRouter:
+    cfg = get_config()
+    return MirrorRouter(
+        build_mirrors(cfg.pdb_mirrors, cfg.pdb_base_url, cfg.pdb_models_base_url, cfg.pdb_fasta_base_url),
+        race=cfg.pdb_mirror_race,
+        timeout=cfg.pdb_mirror_timeout,
+        structure_timeout=cfg.pdb_structure_timeout,
+        probe_interval=cfg.pdb_mirror_probe_interval,
+    )
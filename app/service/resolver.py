@@ -0,0 +1,204 @@
+import asyncio
+import dataclasses
+from typing import Iterable, List, Optional
+
+from fastapi import Depends
+
+from schema.protein import ProteinData, StructureResult
+from service.cache import CachedProtein, ProteinCache, get_protein_cache
+from service.fasta import parse_fasta
+from service.pdb import PDBFetchService
+from service.uniprot import UniprotFetchService
+from service.similarity import KmerIndex, get_kmer_index
+from service.xref import CrossReferenceIndex, get_xref_index
+
+# ProteinData fields copied from a linked UniProt entry onto PDB responses
+UNIPROT_ANNOTATIONS = (
+    "recommended_name",
+    "organism",
+    "functions",
+    "subunit_structure",
+    "subcellular_locations",
+    "disease_associations",
+)
+
+
+class ProteinResolver:
+    """
+    Resolves a protein ID to parsed protein data, serving it from the
+    in-process cache when possible and from UniProt or the PDB otherwise.
+    """
+
+    # Live (non-background) resolutions currently waiting on an upstream.
+    # Background work such as cache warm-up backs off while this is non-zero.
+    live_in_flight = 0
+
+    def __init__(
+        self,
+        pdb_fetch_service: PDBFetchService = Depends(),
+        uniprot_fetch_service: UniprotFetchService = Depends(),
+        cache: ProteinCache = Depends(get_protein_cache),
+        xref: CrossReferenceIndex = Depends(get_xref_index),
+        similarity: KmerIndex = Depends(get_kmer_index),
+    ):
+        self.pdb_fetch_service = pdb_fetch_service
+        self.uniprot_fetch_service = uniprot_fetch_service
+        self.cache = cache
+        self.xref = xref
+        self.similarity = similarity
+
+    @classmethod
+    def standalone(cls) -> "ProteinResolver":
+        """
+        Build a resolver outside of a request, e.g. for background tasks.
+        """
+        return cls(PDBFetchService(), UniprotFetchService(), get_protein_cache(), get_xref_index(),
+                   get_kmer_index())
+
+    async def resolve(self, protein_id: str, background: bool = False) -> Optional[ProteinData]:
+        """
+        Resolve a protein ID.
+
+        Args:
+            protein_id (str): A 6 character UniProt or 4 character PDB ID.
+            background (bool): Whether this is background work, which does
+                not count towards the cache access statistics.
+
+        Returns:
+            ProteinData: Parsed protein data without its features (see
+            `resolve_entry`), or None for IDs of any other length.
+        """
+        resolved = await self.resolve_entry(protein_id, background)
+        return resolved.summary() if resolved else None
+
+    async def resolve_entry(
+        self,
+        protein_id: str,
+        background: bool = False,
+        store: bool = True,
+    ) -> Optional[CachedProtein]:
+        """
+        Like `resolve`, but returns the protein in its compact cached form,
+        features and packed sequence included.
+
+        Args:
+            protein_id (str): A 6 character UniProt or 4 character PDB ID.
+            background (bool): Whether this is background work.
+            store (bool): Whether a fetched protein is cached and its
+                sequence indexed for similarity search. Bulk work such as
+                batch jobs passes False: it still reads cached entries, but
+                neither evicts the working set of live traffic nor changes
+                its LRU order.
+
+        Returns:
+            CachedProtein: The resolved protein, or None for IDs of any
+            other length.
+        """
+        if len(protein_id) not in (4, 6):
+            return None
+
+        cached = self.cache.lookup(protein_id, count=not background, touch=store)
+        if cached is None:
+            parsed_data = await self._fetch(protein_id, background, index=store)
+            if store:
+                cached = self.cache.set(protein_id, parsed_data)
+            else:
+                cached = CachedProtein.compact(parsed_data)
+
+        if len(protein_id) == 4:
+            cached = dataclasses.replace(cached, data=await self._enrich_pdb(protein_id, cached.data))
+        return cached
+
+    async def resolve_structures(
+        self,
+        pdb_ids: Iterable[str],
+        concurrency: int,
+        timeout: float,
+    ) -> List[StructureResult]:
+        """
+        Resolve several PDB entries concurrently, giving up on whatever is
+        still outstanding when the timeout expires.
+
+        Args:
+            pdb_ids (Iterable[str]): The PDB IDs to resolve.
+            concurrency (int): Maximum number of fetches in flight.
+            timeout (float): Seconds to wait for all of them.
+
+        Returns:
+            List[StructureResult]: One result per PDB ID, in input order,
+            with status "ok", "error" or "timeout".
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def resolve_one(pdb_id: str) -> Optional[ProteinData]:
+            async with semaphore:
+                return await self.resolve(pdb_id)
+
+        tasks = {
+            pdb_id: asyncio.create_task(resolve_one(pdb_id))
+            for pdb_id in dict.fromkeys(pdb_ids)
+        }
+        if not tasks:
+            return []
+        _, pending = await asyncio.wait(tasks.values(), timeout=max(timeout, 0))
+        for task in pending:
+            task.cancel()
+
+        results = []
+        for pdb_id, task in tasks.items():
+            if task in pending:
+                results.append(StructureResult(pdb_id=pdb_id, status="timeout"))
+            elif task.exception() is not None:
+                results.append(StructureResult(pdb_id=pdb_id, status="error", error=str(task.exception())))
+            else:
+                results.append(StructureResult(pdb_id=pdb_id, data=task.result()))
+        return results
+
+    async def _fetch(self, protein_id: str, background: bool, index: bool = True) -> ProteinData:
+        if not background:
+            ProteinResolver.live_in_flight += 1
+        try:
+            if len(protein_id) == 6:
+                parsed_data = await self._fetch_uniprot(protein_id, index)
+            else:
+                parsed_data = await self._fetch_pdb(protein_id)
+        finally:
+            if not background:
+                ProteinResolver.live_in_flight -= 1
+        return parsed_data
+
+    async def _fetch_uniprot(self, protein_id: str, index: bool = True) -> ProteinData:
+        # A local store read (SQLite, zlib, validation) blocks, so kept off the event loop
+        parsed_data = await asyncio.to_thread(self.uniprot_fetch_service.get_local, protein_id)
+        if parsed_data is None:
+            raw_data = await self.uniprot_fetch_service.fetch_protein_data(protein_id)
+            parsed_data = self.uniprot_fetch_service.parse_protein_data(raw_data)
+        self.xref.add(parsed_data.primary_accession or protein_id, parsed_data.pdb_ids)
+        if index and parsed_data.sequence:
+            # Indexing a new sequence is CPU-bound, so kept off the event loop
+            await asyncio.to_thread(self.similarity.add, parsed_data.primary_accession or protein_id,
+                                    parse_fasta(parsed_data.sequence)[1])
+        return parsed_data
+
+    async def _fetch_pdb(self, protein_id: str) -> ProteinData:
+        raw_data = await self.pdb_fetch_service.fetch_protein_data(protein_id)
+        return await self.pdb_fetch_service.parse_protein_data(raw_data)
+
+    async def _enrich_pdb(self, protein_id: str, parsed_data: ProteinData) -> ProteinData:
+        """
+        Attach the UniProt accessions of a PDB entry and, when one of them
+        is available without an upstream call, its annotations.
+        """
+        accessions = self.xref.accessions_for(protein_id)
+        if not accessions:
+            return parsed_data
+
+        update = {"uniprot_accessions": accessions}
+        for accession in accessions:
+            cached = self.cache.lookup(accession, count=False)
+            annotations = cached.data if cached else await asyncio.to_thread(
+                self.uniprot_fetch_service.get_local, accession)
+            if annotations is not None:
+                update.update({field: getattr(annotations, field) for field in UNIPROT_ANNOTATIONS})
+                break
+        return parsed_data.model_copy(update=update)
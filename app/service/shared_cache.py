@@ -0,0 +1,412 @@
+"""
+Protein cache segment shared by the worker processes of one host.
+
+The segment is a memory-mapped file (put it on /dev/shm to keep it in
+memory) split into shards. Each shard has a header, an open-addressing
+hash index and a heap that serialized entries are appended to:
+
+    shard header   sequence (u64), heap bytes used (u32), entries (u32),
+                   dead heap bytes (u32)
+    index slot     key hash (u64), heap offset (u32), length (u32), crc32 (u32),
+                   version (u32), expires_at (f64)
+
+Writers take an `fcntl` lock on their shard, so workers only contend when
+they write to the same shard. Readers take no lock: the shard's sequence
+number is odd while a write is in progress and is bumped on every write,
+so a reader that sees it odd or changed across its read retries (a
+seqlock). The CRC of each entry guards against torn reads on top of that.
+
+An entry's expiry and version live in its index slot, so extending an
+entry rewrites the slot only. A rewritten entry whose payload fits in the
+old one's space is overwritten in place; otherwise it is appended and the
+old payload counted as dead. When the heap fills up the shard is compacted
+if that frees enough dead space, and cleared otherwise, as it is when the
+index fills up; either way memory is bounded at the size of the file.
+
+Processes that keep decoded copies of entries revalidate them by their
+stamp, the shard sequence and payload CRC seen when the copy was made:
+an unchanged sequence means nothing in the shard was written since, and
+otherwise the key's current CRC tells whether its own entry changed.
+"""
+import fcntl
+import mmap
+import os
+import pickle
+import struct
+import threading
+import time
+import zlib
+from typing import Iterator, Optional, Tuple
+
+# (shard sequence, payload crc32) of a stored entry
+Stamp = Tuple[int, int]
+
+# Bumped whenever the layout, or the pickled CachedProtein, changes
+MAGIC = b"BIOAPIC3"
+# magic, shard count, shard size
+_FILE_HEADER = struct.Struct("<8sII")
+_SHARD_HEADER = struct.Struct("<QIII")
+_SLOT = struct.Struct("<QIIIId")
+
+# Expected average entry size, used to size the index of each shard
+AVERAGE_ENTRY_SIZE = 2048
+MAX_LOAD = 0.7
+READ_RETRIES = 8
+
+
+def key_hash(key: str) -> int:
+    # 0 marks an empty slot
+    return int.from_bytes(zlib.crc32(key.encode()).to_bytes(4, "little") +
+                          zlib.adler32(key.encode()).to_bytes(4, "little"), "little") or 1
+
+
+class SharedCache:
+    """
+    A fixed-size, cross-process cache of pickled values keyed by string.
+
+    Args:
+        path (str): The backing file, created if needed.
+        size (int): Total size in bytes.
+        shards (int): Number of independently locked shards.
+    """
+
+    def __init__(self, path: str, size: int = 256 << 20, shards: int = 64):
+        self.path = path
+        self.shards = shards
+        self.shard_size = (size - _FILE_HEADER.size) // shards
+        self.index_slots = max(64, self.shard_size // AVERAGE_ENTRY_SIZE)
+        self.heap_offset = _SHARD_HEADER.size + self.index_slots * _SLOT.size
+        self.heap_size = self.shard_size - self.heap_offset
+        if self.heap_size <= 0:
+            raise ValueError("Shared cache too small for its number of shards")
+        self.hits = 0
+        self.misses = 0
+        self.resets = 0
+        self.compactions = 0
+        # fcntl locks are per process; this serializes threads within it
+        self._thread_lock = threading.Lock()
+
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        total = _FILE_HEADER.size + shards * self.shard_size
+        fcntl.lockf(self._fd, fcntl.LOCK_EX, _FILE_HEADER.size, 0)
+        try:
+            header = os.pread(self._fd, _FILE_HEADER.size, 0)
+            if len(header) < _FILE_HEADER.size or _FILE_HEADER.unpack(header) != (MAGIC, shards, self.shard_size):
+                # New file, or one laid out differently: start empty
+                os.ftruncate(self._fd, 0)
+                os.ftruncate(self._fd, total)
+                os.pwrite(self._fd, _FILE_HEADER.pack(MAGIC, shards, self.shard_size), 0)
+        finally:
+            fcntl.lockf(self._fd, fcntl.LOCK_UN, _FILE_HEADER.size, 0)
+        self._map = mmap.mmap(self._fd, total)
+
+    def close(self):
+        self._map.close()
+        os.close(self._fd)
+
+    def _shard(self, hashed: int) -> int:
+        return _FILE_HEADER.size + (hashed % self.shards) * self.shard_size
+
+    def _find(self, shard: int, hashed: int) -> Tuple[int, Optional[Tuple[int, int, int, int, float]]]:
+        """
+        Probe the index of a shard for a key hash.
+
+        Returns:
+            tuple: The slot position, and the (offset, length, crc, version,
+            expires_at) stored there, or None when the probe ended on an
+            empty slot.
+        """
+        start = (hashed // self.shards) % self.index_slots
+        for probe in range(self.index_slots):
+            slot = shard + _SHARD_HEADER.size + ((start + probe) % self.index_slots) * _SLOT.size
+            stored, *found = _SLOT.unpack_from(self._map, slot)
+            if stored == hashed:
+                return slot, tuple(found)
+            if stored == 0:
+                return slot, None
+        return -1, None
+
+    def get(self, key: str) -> Optional[Tuple[object, float, int]]:
+        """
+        Look up a key.
+
+        Returns:
+            tuple: The value, its expiry time and its version, or None when
+            missing, expired or not readable consistently.
+        """
+        found = self.read(key)
+        return found[:3] if found else None
+
+    def read(self, key: str) -> Optional[Tuple[object, float, int, Stamp]]:
+        """
+        Like `get`, but also returns the entry's stamp.
+        """
+        hashed = key_hash(key)
+        shard = self._shard(hashed)
+        for _ in range(READ_RETRIES):
+            before = _SHARD_HEADER.unpack_from(self._map, shard)[0]
+            if before & 1:
+                time.sleep(0)
+                continue
+            _, found = self._find(shard, hashed)
+            payload = None
+            if found is not None:
+                offset, length, crc, version, expires_at = found
+                start = shard + self.heap_offset + offset
+                payload = self._map[start:start + length]
+            if _SHARD_HEADER.unpack_from(self._map, shard)[0] != before:
+                continue
+            if payload is None or zlib.crc32(payload) != crc or expires_at <= time.time():
+                break
+            stored_key, value = pickle.loads(payload)
+            if stored_key != key:
+                break
+            self.hits += 1
+            return value, expires_at, version, (before, crc)
+        self.misses += 1
+        return None
+
+    def sequence(self, key: str) -> int:
+        """
+        The current sequence number of the shard holding a key.
+        """
+        return _SHARD_HEADER.unpack_from(self._map, self._shard(key_hash(key)))[0]
+
+    def stamp(self, key: str) -> Optional[Tuple[Stamp, float]]:
+        """
+        The stamp of a key's current entry, without reading the entry.
+
+        Returns:
+            tuple: The stamp (shard sequence and the entry's CRC) and the
+            entry's expiry time, or None when the key is missing or its
+            shard is being written.
+        """
+        hashed = key_hash(key)
+        shard = self._shard(hashed)
+        for _ in range(READ_RETRIES):
+            before = _SHARD_HEADER.unpack_from(self._map, shard)[0]
+            if before & 1:
+                time.sleep(0)
+                continue
+            _, found = self._find(shard, hashed)
+            if _SHARD_HEADER.unpack_from(self._map, shard)[0] != before:
+                continue
+            return ((before, found[2]), found[4]) if found else None
+        return None
+
+    def set(self, key: str, value: object, expires_at: float, version: int = 0) -> Optional[Stamp]:
+        """
+        Store a value. A key's previous payload is overwritten in place when
+        the new one fits; when the heap is full the shard is compacted, or
+        cleared if compacting would not make room.
+
+        Returns:
+            tuple: The stamp of the stored entry, or None when the value is
+            too large for a shard.
+        """
+        payload = pickle.dumps((key, value), protocol=5)
+        if len(payload) > self.heap_size:
+            return None
+        hashed = key_hash(key)
+        shard = self._shard(hashed)
+        crc = zlib.crc32(payload)
+        with self._write_lock(shard):
+            sequence, used, count, dead = _SHARD_HEADER.unpack_from(self._map, shard)
+            _SHARD_HEADER.pack_into(self._map, shard, sequence + 1, used, count, dead)
+            slot, found = self._find(shard, hashed)
+            if found is not None and len(payload) <= found[1]:
+                offset = found[0]
+                dead += found[1] - len(payload)
+            else:
+                if used + len(payload) > self.heap_size and used - dead + len(payload) <= self.heap_size:
+                    used, dead = self._compact_shard(shard), 0
+                    self.compactions += 1
+                    slot, found = self._find(shard, hashed)
+                if used + len(payload) > self.heap_size or (
+                        found is None and count + 1 > MAX_LOAD * self.index_slots):
+                    self._clear_shard(shard)
+                    used = count = dead = 0
+                    self.resets += 1
+                    slot, found = self._find(shard, hashed)
+                if found is not None:
+                    dead += found[1]
+                offset = used
+                used += len(payload)
+            start = shard + self.heap_offset + offset
+            self._map[start:start + len(payload)] = payload
+            _SLOT.pack_into(self._map, slot, hashed, offset, len(payload), crc, version, expires_at)
+            _SHARD_HEADER.pack_into(self._map, shard, sequence + 2, used, count + (found is None), dead)
+        return sequence + 2, crc
+
+    def extend(self, key: str, expires_at: float) -> Optional[Stamp]:
+        """
+        Keep a key until at least `expires_at`, rewriting its index slot
+        only; the payload is left as it is.
+
+        Returns:
+            tuple: The entry's new stamp, or None when the key is missing or
+            already expired.
+        """
+        hashed = key_hash(key)
+        shard = self._shard(hashed)
+        with self._write_lock(shard):
+            slot, found = self._find(shard, hashed)
+            if found is None or found[4] <= time.time():
+                return None
+            sequence, *counts = _SHARD_HEADER.unpack_from(self._map, shard)
+            _SHARD_HEADER.pack_into(self._map, shard, sequence + 1, *counts)
+            offset, length, crc, version, current = found
+            _SLOT.pack_into(self._map, slot, hashed, offset, length, crc, version, max(current, expires_at))
+            _SHARD_HEADER.pack_into(self._map, shard, sequence + 2, *counts)
+        return sequence + 2, crc
+
+    def delete(self, key: str):
+        """
+        Drop a key. Its slot is emptied by clearing the rest of its probe
+        run and re-inserting it, so later probes stay intact.
+        """
+        hashed = key_hash(key)
+        shard = self._shard(hashed)
+        with self._write_lock(shard):
+            slot, found = self._find(shard, hashed)
+            if found is None:
+                return
+            sequence, used, count, dead = _SHARD_HEADER.unpack_from(self._map, shard)
+            _SHARD_HEADER.pack_into(self._map, shard, sequence + 1, used, count, dead)
+            index_start = shard + _SHARD_HEADER.size
+            position = (slot - index_start) // _SLOT.size
+            run = []
+            for probe in range(1, self.index_slots):
+                other = index_start + ((position + probe) % self.index_slots) * _SLOT.size
+                entry = _SLOT.unpack_from(self._map, other)
+                if entry[0] == 0:
+                    break
+                run.append(entry)
+                _SLOT.pack_into(self._map, other, 0, 0, 0, 0, 0, 0)
+            _SLOT.pack_into(self._map, slot, 0, 0, 0, 0, 0, 0)
+            for entry in run:
+                free, _ = self._find(shard, entry[0])
+                _SLOT.pack_into(self._map, free, *entry)
+            _SHARD_HEADER.pack_into(self._map, shard, sequence + 2, used, count - 1, dead + found[1])
+
+    def items(self) -> Iterator[Tuple[str, object, float, int]]:
+        """
+        Yield every live entry as (key, value, expires_at, version), reading
+        each shard under its lock. Meant for snapshots, not the request path.
+        """
+        now = time.time()
+        for number in range(self.shards):
+            shard = _FILE_HEADER.size + number * self.shard_size
+            with self._write_lock(shard):
+                payloads = []
+                for position in range(self.index_slots):
+                    slot = shard + _SHARD_HEADER.size + position * _SLOT.size
+                    hashed, offset, length, crc, version, expires_at = _SLOT.unpack_from(self._map, slot)
+                    if hashed and expires_at > now:
+                        start = shard + self.heap_offset + offset
+                        payloads.append((self._map[start:start + length], crc, expires_at, version))
+            for payload, crc, expires_at, version in payloads:
+                if zlib.crc32(payload) == crc:
+                    yield (*pickle.loads(payload), expires_at, version)
+
+    def clear(self):
+        for number in range(self.shards):
+            shard = _FILE_HEADER.size + number * self.shard_size
+            with self._write_lock(shard):
+                sequence, *counts = _SHARD_HEADER.unpack_from(self._map, shard)
+                _SHARD_HEADER.pack_into(self._map, shard, sequence + 1, *counts)
+                self._clear_shard(shard)
+                _SHARD_HEADER.pack_into(self._map, shard, sequence + 2, 0, 0, 0)
+
+    def _clear_shard(self, shard: int):
+        index_start = shard + _SHARD_HEADER.size
+        self._map[index_start:index_start + self.index_slots * _SLOT.size] = bytes(self.index_slots * _SLOT.size)
+
+    def _compact_shard(self, shard: int) -> int:
+        """
+        Move a shard's live payloads to the start of its heap, in heap
+        order, dropping the space of overwritten and deleted entries.
+
+        Returns:
+            int: The heap bytes now used.
+        """
+        index_start = shard + _SHARD_HEADER.size
+        slots = []
+        for position in range(self.index_slots):
+            slot = index_start + position * _SLOT.size
+            entry = _SLOT.unpack_from(self._map, slot)
+            if entry[0]:
+                slots.append((entry[1], slot, entry))
+        used = 0
+        for offset, slot, (hashed, _, length, *rest) in sorted(slots):
+            if offset != used:
+                heap = shard + self.heap_offset
+                self._map.move(heap + used, heap + offset, length)
+                _SLOT.pack_into(self._map, slot, hashed, used, length, *rest)
+            used += length
+        return used
+
+    def _write_lock(self, shard: int):
+        return _ShardLock(self, shard)
+
+    def __len__(self) -> int:
+        return sum(
+            _SHARD_HEADER.unpack_from(self._map, _FILE_HEADER.size + number * self.shard_size)[2]
+            for number in range(self.shards)
+        )
+
+    def stats(self) -> dict:
+        return {
+            "path": self.path,
+            "entries": len(self),
+            "shards": self.shards,
+            "hits": self.hits,
+            "misses": self.misses,
+            "shard_resets": self.resets,
+            "shard_compactions": self.compactions,
+        }
+
+
+class _ShardLock:
+    """Exclusive lock on one shard's header, across threads and processes."""
+
+    def __init__(self, cache: SharedCache, shard: int):
+        self.cache = cache
+        self.shard = shard
+
+    def __enter__(self):
+        self.cache._thread_lock.acquire()
+        fcntl.lockf(self.cache._fd, fcntl.LOCK_EX, _SHARD_HEADER.size, self.shard)
+
+    def __exit__(self, *exc):
+        fcntl.lockf(self.cache._fd, fcntl.LOCK_UN, _SHARD_HEADER.size, self.shard)
+        self.cache._thread_lock.release()
+
+
+# Held open for the lifetime of the process that won the election
+_leader_fd: Optional[int] = None
+
+
+def acquire_leadership(path: str) -> bool:
+    """
+    Elect one worker process per shared cache to run the once-per-host
+    background work (warm-up, snapshots, resuming jobs).
+
+    Args:
+        path (str): The shared cache file; the lock is taken on a sibling
+            `.leader` file.
+
+    Returns:
+        bool: Whether this process is the leader.
+    """
+    global _leader_fd
+    if _leader_fd is not None:
+        return True
+    fd = os.open(f"{path}.leader", os.O_RDWR | os.O_CREAT, 0o600)
+    try:
+        fcntl.lockf(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        os.close(fd)
+        return False
+    _leader_fd = fd
+    return True
@@ -0,0 +1,201 @@
+from __future__ import annotations
+
+import threading
+from array import array
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from core.config import Config, get_config
+from core.lazy import lazy_import
+from service.cache import CachedProtein
+from service.fasta import encode_residues, parse_fasta
+from service.uniprot.store import UniprotStore
+
+np = lazy_import("numpy")
+
+# Retired sequence numbers are compacted away once there are more of them
+# than live ones, and at least this many
+COMPACT_MIN_RETIRED = 1024
+
+
+class KmerIndex:
+    """
+    Incremental inverted index from k-mers to the sequences containing them.
+
+    Residues are encoded at 5 bits each, so a k-mer is a single integer.
+    Each k-mer maps to a posting list of sequence numbers (an unsigned int
+    array, each sequence listed once). A query concatenates the posting
+    lists of its distinct k-mers and counts, per sequence, the k-mers it
+    shares with the query using `np.bincount`.
+
+    Re-adding an accession with the same sequence is a no-op; with a new
+    sequence it retires the previous sequence number rather than rewriting
+    posting lists. Retired numbers are dropped from the posting lists, and
+    the live ones renumbered, once they outnumber the live ones.
+    """
+
+    def __init__(self, k: int = 4):
+        if not 1 <= k <= 12:
+            raise ValueError("k must be between 1 and 12")
+        self.k = k
+        self._postings: Dict[int, array] = {}
+        self._accessions: List[str] = []
+        self._live = array("B")
+        self._numbers: Dict[str, int] = {}
+        # Hash of each indexed accession's residues, to skip unchanged re-adds
+        self._digests: Dict[str, int] = {}
+        self._retired = 0
+        # Bulk loads run in a thread while requests query the index
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._numbers)
+
+    def __contains__(self, accession: str) -> bool:
+        return accession.upper() in self._numbers
+
+    def kmers(self, residues: str) -> np.ndarray:
+        """
+        The distinct k-mers of a sequence, as sorted integers.
+        """
+        codes = np.frombuffer(encode_residues(residues), dtype=np.uint8).astype(np.int64)
+        if len(codes) < self.k:
+            return np.empty(0, dtype=np.int64)
+        n = len(codes) - self.k + 1
+        kmers = np.zeros(n, dtype=np.int64)
+        for i in range(self.k):
+            kmers = (kmers << 5) | codes[i:i + n]
+        return np.unique(kmers)
+
+    def add(self, accession: str, residues: str):
+        """
+        Index the sequence of an entry, replacing any earlier one.
+
+        Args:
+            accession (str): The UniProt accession.
+            residues (str): The sequence, residues only.
+        """
+        accession = accession.upper()
+        digest = hash(residues)
+        if self._digests.get(accession) == digest:
+            return
+        kmers = self.kmers(residues)
+        with self._lock:
+            previous = self._numbers.get(accession)
+            if previous is not None:
+                self._live[previous] = 0
+                self._retired += 1
+            number = len(self._accessions)
+            self._accessions.append(accession)
+            self._live.append(1)
+            self._numbers[accession] = number
+            self._digests[accession] = digest
+            for kmer in kmers.tolist():
+                postings = self._postings.get(kmer)
+                if postings is None:
+                    self._postings[kmer] = array("I", (number,))
+                else:
+                    postings.append(number)
+            if self._retired >= max(COMPACT_MIN_RETIRED, len(self._numbers)):
+                self._compact()
+
+    def _compact(self):
+        """
+        Drop retired sequence numbers and renumber the live ones. Called
+        with the lock held.
+        """
+        live = np.frombuffer(self._live, dtype=np.uint8).astype(bool)
+        renumbered = np.full(len(live), -1, dtype=np.int64)
+        renumbered[live] = np.arange(int(live.sum()))
+        postings = {}
+        for kmer, numbers in self._postings.items():
+            numbers = renumbered[np.frombuffer(numbers, dtype=np.uint32)]
+            numbers = numbers[numbers >= 0]
+            if len(numbers):
+                postings[kmer] = array("I", numbers.astype(np.uint32).tobytes())
+        self._postings = postings
+        self._accessions = [accession for accession, alive in zip(self._accessions, live.tolist()) if alive]
+        self._live = array("B", bytes([1]) * len(self._accessions))
+        self._numbers = {accession: number for number, accession in enumerate(self._accessions)}
+        self._retired = 0
+
+    def search(self, residues: str, limit: int = 10, exclude: Optional[str] = None) -> List[dict]:
+        """
+        Find the indexed sequences sharing the most k-mers with a query.
+
+        Args:
+            residues (str): The query sequence.
+            limit (int): The maximum number of hits.
+            exclude (str): An accession to leave out, e.g. the query's own.
+
+        Returns:
+            List[dict]: The hits, best first, with the number of shared
+            k-mers and the fraction of the query's k-mers they cover.
+        """
+        kmers = self.kmers(residues)
+        if not len(kmers):
+            return []
+        with self._lock:
+            postings = [self._postings[kmer] for kmer in kmers.tolist() if kmer in self._postings]
+            if not postings:
+                return []
+            # Copies out of the arrays so they stay free to grow
+            numbers = np.concatenate([np.frombuffer(p, dtype=np.uint32) for p in postings])
+            live = np.frombuffer(self._live, dtype=np.uint8).copy()
+            accessions = self._accessions
+            excluded = self._numbers.get(exclude.upper()) if exclude else None
+
+        scores = np.bincount(numbers, minlength=len(live))
+        scores[live == 0] = 0
+        if excluded is not None:
+            scores[excluded] = 0
+        limit = min(limit, int(np.count_nonzero(scores)))
+        if limit == 0:
+            return []
+        top = np.argpartition(-scores, limit - 1)[:limit]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [
+            {
+                "accession": accessions[number],
+                "shared_kmers": int(scores[number]),
+                "coverage": round(float(scores[number]) / len(kmers), 4),
+            }
+            for number in top.tolist()
+        ]
+
+
+def load_sequence_index(index: KmerIndex, cfg: Config, cached: Iterable[Tuple[str, CachedProtein]]) -> int:
+    """
+    Index the UniProt sequences of the given cache entries and of the local
+    store. Blocking; meant to run in a thread at startup.
+
+    Args:
+        index (KmerIndex): The index to fill.
+        cfg (Config): The configuration naming the local store, if any.
+        cached (Iterable[Tuple[str, CachedProtein]]): Cache entries by key.
+
+    Returns:
+        int: The number of sequences indexed.
+    """
+    loaded = 0
+    for key, entry in cached:
+        if len(key) == 6 and entry.sequence is not None:
+            index.add(key, entry.sequence.residues())
+            loaded += 1
+    if cfg.uniprot_store_path:
+        # A connection of its own, as the shared one serves requests
+        store = UniprotStore(cfg.uniprot_store_path)
+        try:
+            for protein_data in store:
+                if protein_data.sequence and protein_data.primary_accession not in index:
+                    index.add(protein_data.primary_accession, parse_fasta(protein_data.sequence)[1])
+                    loaded += 1
+        finally:
+            store.close()
+    return loaded
+
+
+# get_kmer_index returns the process-wide k-mer index of resolved sequences
+@lru_cache
+def get_kmer_index() -> KmerIndex:
+    return KmerIndex(k=get_config().similarity_kmer_size)
@@ -0,0 +1,270 @@
+"""
+Cache invalidation driven by upstream change lists instead of TTLs alone.
+
+The wwPDB publishes the entries added, modified and obsoleted in each
+weekly release, and every UniProt entry carries an entry version that
+changes with each release that touches it. `UpstreamSync` checks the
+cached entries against these periodically, refreshes (or drops) the ones
+that changed and extends the expiry of the ones verified unchanged, so
+entries that never change stay cached for as long as the sync keeps
+confirming them.
+"""
+import asyncio
+import logging
+import time
+from functools import lru_cache
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from core.config import get_config
+from core.lazy import lazy_import
+from service.cache import ProteinCache, get_protein_cache
+from service.resolver import ProteinResolver
+
+httpx = lazy_import("httpx")
+
+logger = logging.getLogger(__name__)
+
+
+def parse_id_list(text: str) -> Set[str]:
+    """
+    The PDB IDs of a wwPDB status list such as `modified.pdb`, one per line.
+    """
+    return {line.strip().upper() for line in text.splitlines() if len(line.strip()) == 4}
+
+
+def parse_versions(text: str) -> Dict[str, int]:
+    """
+    Entry versions by accession from a UniProt TSV search result with the
+    `accession,version` fields.
+    """
+    versions = {}
+    for line in text.splitlines()[1:]:
+        fields = line.split("\t")
+        if len(fields) >= 2 and fields[1].strip().isdigit():
+            versions[fields[0].strip().upper()] = int(fields[1])
+    return versions
+
+
+class UpstreamSync:
+    """
+    Keeps cached entries in step with upstream releases.
+
+    Args:
+        cache (ProteinCache): The cache to keep in step.
+        resolver_factory (Callable): Builds the resolver used for refreshes.
+        refresh (bool): Whether changed entries are re-fetched right away;
+            otherwise they are only dropped from the cache.
+        verified_ttl (float): Seconds an entry verified unchanged is kept.
+        concurrency (int): Upstream requests in flight at once.
+        batch_size (int): Accessions per UniProt version query.
+    """
+
+    STATUS_URL = "https://files.wwpdb.org/pub/pdb/data/status/latest"
+    UNIPROT_URL = "https://rest.uniprot.org/uniprotkb"
+
+    def __init__(
+        self,
+        cache: ProteinCache,
+        resolver_factory: Callable[[], ProteinResolver] = ProteinResolver.standalone,
+        refresh: bool = True,
+        verified_ttl: float = 30 * 86400,
+        concurrency: int = 4,
+        batch_size: int = 100,
+        status_url: str = "",
+        uniprot_url: str = "",
+    ):
+        self.cache = cache
+        self.resolver_factory = resolver_factory
+        self.refresh = refresh
+        self.verified_ttl = verified_ttl
+        self.concurrency = concurrency
+        self.batch_size = batch_size
+        self.status_url = status_url or self.STATUS_URL
+        self.uniprot_url = uniprot_url or self.UNIPROT_URL
+        # What the last successful runs were checked against
+        self.pdb_lists: Optional[Tuple[str, str]] = None
+        self.uniprot_release: Optional[str] = None
+        self.last_run: Optional[float] = None
+        self.counts = {"verified": 0, "refreshed": 0, "invalidated": 0, "failed": 0}
+
+    async def _cached(self, id_length: int, entries: Optional[List[tuple]] = None) -> Dict[str, Tuple[object, int]]:
+        """
+        The cached entries of one source, as (CachedProtein, version) by key.
+
+        Args:
+            id_length (int): 4 for PDB entries, 6 for UniProt ones.
+            entries (list): The cache's entries, when already collected.
+        """
+        if entries is None:
+            entries = await self.cache.collect_entries()
+        return {key: (cached, version) for key, cached, _, version in entries if len(key) == id_length}
+
+    async def _each(self, keys: Iterable[str], action: Callable[[str], Awaitable[None]]):
+        """
+        Run `action` on every key, `concurrency` at a time.
+        """
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def run(key: str):
+            async with semaphore:
+                await action(key)
+
+        await asyncio.gather(*(run(key) for key in keys))
+
+    def _verify(self, keys: Iterable[str]):
+        for key in keys:
+            if self.cache.extend(key, self.verified_ttl):
+                self.counts["verified"] += 1
+
+    def _invalidate(self, keys: Iterable[str]):
+        for key in keys:
+            self.cache.invalidate(key)
+            self.counts["invalidated"] += 1
+
+    async def _refresh(self, resolver: ProteinResolver, keys: Iterable[str]):
+        """
+        Replace changed entries with their current upstream version, or only
+        drop them when refreshing is off.
+        """
+        keys = list(keys)
+        self._invalidate(keys)
+        if not self.refresh:
+            return
+
+        async def refresh_one(key: str):
+            try:
+                await resolver.resolve_entry(key, background=True)
+            except Exception as e:
+                self.counts["failed"] += 1
+                logger.warning(f"Refreshing changed entry {key} failed: {e}")
+                return
+            self.counts["refreshed"] += 1
+            self.cache.extend(key, self.verified_ttl)
+
+        await self._each(keys, refresh_one)
+
+    async def sync_pdb(self, resolver: ProteinResolver, entries: Optional[List[tuple]] = None):
+        """
+        Check cached PDB entries against the latest weekly status lists.
+        Obsoleted entries are dropped; modified ones are refreshed when
+        their revision date changed; all others are verified.
+
+        Args:
+            resolver (ProteinResolver): Fetches modified entries.
+            entries (list): The cache's entries, when already collected.
+        """
+        async with httpx.AsyncClient() as client:
+            lists = []
+            for name in ("modified.pdb", "obsolete.pdb"):
+                response = await client.get(f"{self.status_url}/{name}")
+                if response.status_code != 200:
+                    raise Exception(f"Failed to fetch wwPDB status list {name}")
+                lists.append(response.text)
+        modified, obsolete = (parse_id_list(text) for text in lists)
+
+        cached = await self._cached(4, entries)
+        self._invalidate(obsolete & cached.keys())
+        changed, unchecked = [], set()
+
+        async def check(key: str):
+            try:
+                entry = await resolver.pdb_fetch_service.fetch_protein_data(key)
+            except Exception as e:
+                self.counts["failed"] += 1
+                unchecked.add(key)
+                logger.warning(f"Checking modified PDB entry {key} failed: {e}")
+                return
+            audit = cached[key][0].data.entry_audit
+            revision_date = entry.rcsb_accession_info.revision_date if entry.rcsb_accession_info else None
+            if audit is None or audit.last_annotation_update_date != revision_date:
+                changed.append(key)
+
+        if tuple(lists) != self.pdb_lists:
+            await self._each(sorted(modified & cached.keys()), check)
+        await self._refresh(resolver, changed)
+        self._verify(cached.keys() - obsolete - set(changed) - unchecked)
+        # Lists with unchecked entries are checked again next time
+        if not unchecked:
+            self.pdb_lists = tuple(lists)
+
+    async def sync_uniprot(self, resolver: ProteinResolver, entries: Optional[List[tuple]] = None):
+        """
+        Check cached UniProt entries against the current release. Entry
+        versions are compared only when the release changed since the last
+        check; entries whose version changed are refreshed, and those no
+        longer found (merged or deleted) are dropped.
+
+        Args:
+            resolver (ProteinResolver): Fetches changed entries.
+            entries (list): The cache's entries, when already collected.
+        """
+        cached = await self._cached(6, entries)
+        async with httpx.AsyncClient() as client:
+            response = await client.get(
+                f"{self.uniprot_url}/search?query=*&fields=accession&format=tsv&size=1")
+            if response.status_code != 200:
+                raise Exception("Failed to fetch the current UniProt release")
+            release = response.headers.get("X-UniProt-Release", "")
+
+            if release and release == self.uniprot_release:
+                self._verify(cached)
+                return
+            current: Dict[str, int] = {}
+            keys = list(cached)
+            for start in range(0, len(keys), self.batch_size):
+                batch = keys[start:start + self.batch_size]
+                query = " OR ".join(f"accession:{key}" for key in batch)
+                response = await client.get(
+                    f"{self.uniprot_url}/search",
+                    params={"query": query, "fields": "accession,version", "format": "tsv", "size": len(batch)},
+                )
+                if response.status_code != 200:
+                    raise Exception("Failed to fetch UniProt entry versions")
+                current.update(parse_versions(response.text))
+
+        self._invalidate(key for key in keys if key not in current)
+        changed = [key for key in keys if key in current and current[key] != cached[key][1]]
+        await self._refresh(resolver, changed)
+        self._verify(key for key in keys if key in current and key not in changed)
+        self.uniprot_release = release or None
+
+    async def run_once(self):
+        resolver = self.resolver_factory()
+        # Collected once for both steps: with a shared cache this unpickles
+        # the whole segment
+        entries = await self.cache.collect_entries()
+        for sync in (self.sync_pdb, self.sync_uniprot):
+            try:
+                await sync(resolver, entries)
+            except Exception as e:
+                self.counts["failed"] += 1
+                logger.error(f"Upstream sync step {sync.__name__} failed: {e}")
+        self.last_run = time.time()
+
+    async def run_periodically(self, interval: float):
+        """
+        Sync now and then every `interval` seconds until cancelled.
+        """
+        while True:
+            await self.run_once()
+            await asyncio.sleep(interval)
+
+    def progress(self) -> dict:
+        return {
+            "last_run": self.last_run,
+            "uniprot_release": self.uniprot_release,
+            **self.counts,
+        }
+
+
+# get_upstream_sync returns the process-wide upstream change sync
+@lru_cache
+def get_upstream_sync() -> UpstreamSync:
+    cfg = get_config()
+    return UpstreamSync(
+        get_protein_cache(),
+        refresh=cfg.sync_refresh,
+        verified_ttl=cfg.sync_verified_ttl,
+        concurrency=cfg.warmup_concurrency,
+        uniprot_url=cfg.uniprot_base_url,
+    )
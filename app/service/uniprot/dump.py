@@ -0,0 +1,352 @@
+"""
+Streaming readers for UniProtKB dump files.
+
+Both readers yield the raw text of one entry at a time, so a dump of any
+size is read in constant memory; `entry_from_text` then turns that text
+into the same dict shape `UniprotFetchService.fetch_protein_data` returns
+(the REST JSON with the FASTA text under "sequence").
+
+Supported dumps, optionally gzip-compressed:
+    * JSON, either `{"results": [...]}`, a top-level array or JSON lines
+    * The UniProtKB flat-file (`.dat`) format
+"""
+import gzip
+import json
+import re
+from datetime import datetime
+from typing import IO, Iterator, List, Optional
+
+from service.fasta import fasta
+
+JSON = "json"
+FLAT_FILE = "flat"
+
+CHUNK_SIZE = 1 << 20
+
+_TOKEN = re.compile(r'[{}\[\]"]')
+_STRING_TAIL = re.compile(r'(?:[^"\\]|\\.)*"', re.DOTALL)
+
+
+def open_dump(path: str) -> IO[str]:
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8")
+    return open(path, "r", encoding="utf-8")
+
+
+def detect_format(head: str) -> str:
+    return FLAT_FILE if head.lstrip().startswith("ID ") else JSON
+
+
+def iter_entry_texts(stream: IO[str]) -> Iterator[str]:
+    """
+    Yield the raw text of every entry in a dump, detecting its format.
+    """
+    head = stream.read(CHUNK_SIZE)
+    if detect_format(head) == FLAT_FILE:
+        yield from iter_flat_file_records(stream, head)
+    else:
+        yield from iter_json_records(stream, head)
+
+
+def iter_flat_file_records(stream: IO[str], head: str = "") -> Iterator[str]:
+    """
+    Yield flat-file records, each ending with its `//` terminator line.
+    """
+    lines: List[str] = []
+    for line in _lines(stream, head):
+        lines.append(line)
+        if line.startswith("//"):
+            yield "".join(lines)
+            lines = []
+
+
+def _lines(stream: IO[str], head: str) -> Iterator[str]:
+    if head:
+        *complete, rest = head.split("\n")
+        for line in complete:
+            yield line + "\n"
+        first = rest + stream.readline()
+        if first:
+            yield first
+    yield from stream
+
+
+def iter_json_records(stream: IO[str], head: str = "") -> Iterator[str]:
+    """
+    Yield the text of each entry object in a JSON dump without decoding it.
+
+    Entries are the objects inside the `results` array of a
+    `{"results": [...]}` document, inside a top-level array, or the
+    top-level objects of a JSON lines file. Only bracket and string tokens
+    are scanned, so the work is mostly done by the regex engine.
+    """
+    buf = head
+    # Read enough to tell the layouts apart
+    while len(buf.lstrip()) < 16:
+        chunk = stream.read(CHUNK_SIZE)
+        if not chunk:
+            break
+        buf += chunk
+    stripped = buf.lstrip()
+    if stripped.startswith("["):
+        entry_stack = "["
+    elif re.match(r'\{\s*"results"', stripped):
+        entry_stack = "{["
+    else:
+        entry_stack = ""
+
+    stack = ""
+    pos = 0
+    start = -1
+    eof = False
+    while True:
+        match = _TOKEN.search(buf, pos)
+        if match is None:
+            if eof:
+                return
+            pos = len(buf)
+        else:
+            char = match.group()
+            if char == '"':
+                tail = _STRING_TAIL.match(buf, match.end())
+                if tail is None:
+                    if eof:
+                        raise ValueError("Unterminated string in JSON dump")
+                    pos = match.start()
+                else:
+                    pos = tail.end()
+                    continue
+            else:
+                pos = match.end()
+                if char in "{[":
+                    if char == "{" and stack == entry_stack:
+                        start = match.start()
+                    stack += char
+                else:
+                    stack = stack[:-1]
+                    if char == "}" and stack == entry_stack and start >= 0:
+                        yield buf[start:pos]
+                        start = -1
+                continue
+
+        # The buffer is exhausted or ends mid-token: drop what has been
+        # consumed and read more.
+        keep = start if start >= 0 else pos
+        buf, pos = buf[keep:], pos - keep
+        if start >= 0:
+            start = 0
+        chunk = stream.read(CHUNK_SIZE)
+        if not chunk:
+            if eof:
+                return
+            eof = True
+        buf += chunk
+
+
+def entry_from_text(text: str, fmt: str) -> dict:
+    """
+    Decode one entry's text into the UniProt REST JSON shape, with the
+    sequence replaced by FASTA text as `fetch_protein_data` returns it.
+    """
+    if fmt == FLAT_FILE:
+        return parse_flat_file_record(text)
+    entry = json.loads(text)
+    entry["sequence"] = fasta_from_entry(entry)
+    return entry
+
+
+def fasta_from_entry(entry: dict) -> str:
+    sequence = entry.get("sequence")
+    if not isinstance(sequence, dict):
+        return sequence or ""
+    db = "tr" if "unreviewed" in entry.get("entryType", "") else "sp"
+    return fasta(f"{db}|{entry.get('primaryAccession')}|{entry.get('uniProtkbId')}",
+                 sequence.get("value", ""))
+
+
+FEATURE_TYPES = {
+    "INIT_MET": "Initiator methionine", "SIGNAL": "Signal", "PROPEP": "Propeptide",
+    "TRANSIT": "Transit peptide", "CHAIN": "Chain", "PEPTIDE": "Peptide",
+    "TOPO_DOM": "Topological domain", "TRANSMEM": "Transmembrane",
+    "INTRAMEM": "Intramembrane", "DOMAIN": "Domain", "REPEAT": "Repeat",
+    "ZN_FING": "Zinc finger", "DNA_BIND": "DNA binding", "REGION": "Region",
+    "COILED": "Coiled coil", "MOTIF": "Motif", "COMPBIAS": "Compositional bias",
+    "ACT_SITE": "Active site", "BINDING": "Binding site", "SITE": "Site",
+    "NON_STD": "Non-standard residue", "MOD_RES": "Modified residue",
+    "LIPID": "Lipidation", "CARBOHYD": "Glycosylation", "DISULFID": "Disulfide bond",
+    "CROSSLNK": "Cross-link", "VAR_SEQ": "Alternative sequence",
+    "VARIANT": "Natural variant", "MUTAGEN": "Mutagenesis",
+    "UNSURE": "Sequence uncertainty", "CONFLICT": "Sequence conflict",
+    "NON_CONS": "Non-adjacent residues", "NON_TER": "Non-terminal residue",
+    "HELIX": "Helix", "STRAND": "Beta strand", "TURN": "Turn",
+}
+
+_NOTE = re.compile(r'/note="([^"]*)"')
+_EVIDENCE = re.compile(r"\s*\{ECO:[^}]*\}")
+_DISEASE = re.compile(r"^(?P<name>.*?)(?: \((?P<acronym>[^)]*)\))?(?: \[(?P<db>\w+):(?P<id>[^\]]*)\])?: (?P<description>.*)$", re.DOTALL)
+
+
+def _flat_date(value: str) -> str:
+    return datetime.strptime(value, "%d-%b-%Y").strftime("%Y-%m-%d")
+
+
+def _position(value: str) -> Optional[int]:
+    value = value.strip("<>")
+    return int(value) if value.isdigit() else None
+
+
+def _clean(text: str) -> str:
+    return _EVIDENCE.sub("", text).strip().rstrip(".")
+
+
+def parse_flat_file_record(text: str) -> dict:
+    """
+    Convert a UniProtKB flat-file record into the subset of the REST JSON
+    shape that `UniprotFetchService.parse_protein_data` reads.
+    """
+    accessions: List[str] = []
+    entry = {
+        "comments": [],
+        "features": [],
+        "uniProtKBCrossReferences": [],
+        "entryAudit": {},
+    }
+    organism: List[str] = []
+    comments: List[List[str]] = []
+    residues: List[str] = []
+    in_sequence = False
+
+    for line in text.splitlines():
+        code, value = line[:2], line[5:]
+        if in_sequence:
+            if code == "//":
+                break
+            residues.append(value.replace(" ", ""))
+            continue
+        match code:
+            case "ID":
+                entry["uniProtkbId"] = value.split()[0]
+                reviewed = "Reviewed" in value
+                entry["entryType"] = ("UniProtKB reviewed (Swiss-Prot)" if reviewed
+                                      else "UniProtKB unreviewed (TrEMBL)")
+            case "AC":
+                accessions.extend(a.strip() for a in value.split(";") if a.strip())
+            case "DT":
+                date, _, event = value.partition(", ")
+                audit = entry["entryAudit"]
+                if "integrated into" in event:
+                    audit["firstPublicDate"] = _flat_date(date)
+                elif event.startswith("sequence version"):
+                    audit["sequenceVersion"] = int(event.split()[-1].rstrip("."))
+                elif event.startswith("entry version"):
+                    audit["lastAnnotationUpdateDate"] = _flat_date(date)
+                    audit["entryVersion"] = int(event.split()[-1].rstrip("."))
+            case "DE":
+                if value.startswith("RecName: Full=") and "proteinDescription" not in entry:
+                    name = _clean(value[len("RecName: Full="):].rstrip(";"))
+                    entry["proteinDescription"] = {"recommendedName": {"fullName": {"value": name}}}
+            case "OS":
+                organism.append(value)
+            case "CC":
+                if value.startswith("-!- "):
+                    comments.append([value[4:]])
+                elif value.startswith("---") or value.startswith("Copyrighted"):
+                    comments.append([])
+                elif comments:
+                    comments[-1].append(value.strip())
+            case "DR":
+                database, _, rest = value.partition("; ")
+                entry["uniProtKBCrossReferences"].append(
+                    {"database": database, "id": rest.split(";")[0].strip()})
+            case "FT":
+                _feature_line(entry["features"], value)
+            case "SQ":
+                in_sequence = True
+
+    entry["primaryAccession"] = accessions[0] if accessions else None
+    entry["secondaryAccessions"] = accessions[1:]
+
+    if organism:
+        os_text = " ".join(organism).rstrip(".")
+        scientific, _, common = os_text.partition(" (")
+        entry["organism"] = {"scientificName": scientific, "commonName": common.split(")")[0] or None}
+
+    for lines in comments:
+        comment = _comment(" ".join(lines), lines) if lines else None
+        if comment is not None:
+            entry["comments"].append(comment)
+
+    for feature in entry["features"]:
+        feature["description"] = _feature_description(feature)
+
+    db = "sp" if entry.get("entryType", "").startswith("UniProtKB reviewed") else "tr"
+    entry["sequence"] = fasta(f"{db}|{entry['primaryAccession']}|{entry.get('uniProtkbId')}",
+                              "".join(residues))
+    return entry
+
+
+def _feature_line(features: List[dict], value: str):
+    key = value[:16].strip()
+    if key:
+        start, _, end = value[16:].strip().partition("..")
+        start_value = _position(start.split(":")[-1])
+        features.append({
+            "type": FEATURE_TYPES.get(key, key.replace("_", " ").capitalize()),
+            "location": {
+                "start": {"value": start_value},
+                "end": {"value": _position(end) if end else start_value},
+            },
+            "description": "",
+            "qualifiers": [],
+        })
+    elif features:
+        features[-1]["qualifiers"].append(value.strip())
+
+
+def _feature_description(feature: dict) -> str:
+    match = _NOTE.search(" ".join(feature.pop("qualifiers")))
+    return match.group(1) if match else ""
+
+
+def _comment(text: str, lines: List[str]) -> Optional[dict]:
+    topic, _, body = text.partition(": ")
+    topic = topic.rstrip(":")
+    match topic:
+        case "FUNCTION" | "SUBUNIT":
+            return {"commentType": topic, "texts": [{"value": _clean(body)}]}
+        case "SUBCELLULAR LOCATION":
+            body = body.split("Note=")[0]
+            body = re.sub(r"^\[[^\]]*\]:\s*", "", body)
+            locations = []
+            for part in _clean(body).split(". "):
+                name = part.split(";")[0].strip().rstrip(".")
+                if name:
+                    locations.append({"location": {"value": name}})
+            return {"commentType": topic, "subcellularLocations": locations}
+        case "DISEASE":
+            match_ = _DISEASE.match(body)
+            if match_ is None:
+                return None
+            disease = {
+                "diseaseId": match_.group("name"),
+                "acronym": match_.group("acronym"),
+                "description": _clean(match_.group("description").split(" Note=")[0]) + ".",
+            }
+            if match_.group("db"):
+                disease["diseaseCrossReference"] = {"database": match_.group("db"),
+                                                    "id": match_.group("id")}
+            return {"commentType": topic, "disease": disease}
+        case "ALTERNATIVE PRODUCTS":
+            isoforms = []
+            for field in " ".join(lines[1:]).split(";"):
+                key, _, value = field.strip().partition("=")
+                if key == "Name":
+                    isoforms.append({"name": {"value": _clean(value)}, "isoformIds": []})
+                elif key == "IsoId" and isoforms:
+                    isoforms[-1]["isoformIds"] = [i.strip() for i in value.split(",")]
+                elif key == "Sequence" and isoforms:
+                    isoforms[-1]["isoformSequenceStatus"] = (
+                        value if value in ("Displayed", "External", "Not described")
+                        else "Described")
+            return {"commentType": topic, "isoforms": isoforms}
+    return None
@@ -1,10 +1,17 @@
+from core.config import get_config
+from core.lazy import lazy_import
+from service.intern import get_intern_table
+from service.fasta import aiter_fasta, fasta, parse_fasta, record_accession
 from service.utils import pdb_file_download_link
-from typing import Dict
-from httpx import AsyncClient
+from service.uniprot.store import get_uniprot_store
+from typing import Dict, Optional, Tuple
 from schema import (
     ProteinData, Organism, EntryAudit, DiseaseAssociation, Isoform, Feature
 )
 
+# Only needed once an entry is fetched
+httpx = lazy_import("httpx")
+
 
 class UniprotFetchService:
     """
@@ -13,6 +20,25 @@ class UniprotFetchService:
 
     BASE_URL = "https://rest.uniprot.org/uniprotkb"
 
+    def __init__(self):
+        self.base_url = get_config().uniprot_base_url or self.BASE_URL
+        self.store = get_uniprot_store()
+
+    def get_local(self, protein_id: str) -> Optional[ProteinData]:
+        """
+        Look up a protein in the local UniProt store, if one is configured.
+
+        Args:
+            protein_id (str): The UniProt accession.
+
+        Returns:
+            ProteinData: The imported entry, or None if it is not available locally.
+        """
+        if self.store is None:
+            return None
+        protein_data = self.store.get(protein_id)
+        return get_intern_table().protein(protein_data) if protein_data else None
+
     async def fetch_protein_data(self, protein_id: str, format: str="json") -> dict:
         """
         Fetch raw protein data from the PDB API.
@@ -24,24 +50,50 @@ class UniprotFetchService:
             dict: Raw protein data.
         """
         res: Dict = {}
-        async with AsyncClient() as client:
+        async with httpx.AsyncClient() as client:
             response = await client.get(
-                f"{self.BASE_URL}/{protein_id}?format={format}")
+                f"{self.base_url}/{protein_id}?format={format}")
             if response.status_code != 200:
                 raise Exception(
                     f"Failed to fetch protein data for ID {protein_id}")
             res = response.json()
 
-        async with AsyncClient() as client:
-            response = await client.get(
-                f"{self.BASE_URL}/{protein_id}?format=fasta")
-            if response.status_code != 200:
-                raise Exception(
-                    f"Failed to fetch protein data for ID {protein_id}")
-            res["sequence"] = response.text
+        res["sequence"], res["isoformSequences"] = await self.fetch_sequences(protein_id)
 
         return res
 
+    async def fetch_sequences(self, protein_id: str) -> Tuple[str, Dict[str, str]]:
+        """
+        Fetch the canonical and all isoform sequences of an entry in one
+        request. The FASTA response is parsed record by record as it
+        streams in.
+
+        Args:
+            protein_id (str): The UniProt accession.
+
+        Returns:
+            tuple: The FASTA text of the canonical sequence, and the
+            residues of the other isoforms by isoform ID.
+        """
+        canonical = None
+        isoforms: Dict[str, str] = {}
+        async with httpx.AsyncClient() as client:
+            async with client.stream(
+                "GET",
+                f"{self.base_url}/stream?query=accession:{protein_id}"
+                f"&format=fasta&includeIsoform=true",
+            ) as response:
+                if response.status_code != 200:
+                    raise Exception(
+                        f"Failed to fetch protein data for ID {protein_id}")
+                async for header, residues in aiter_fasta(response.aiter_text()):
+                    accession = record_accession(header)
+                    if canonical is None and "-" not in accession:
+                        canonical = fasta(header, residues)
+                    else:
+                        isoforms[accession] = residues
+        return canonical or "", isoforms
+
     def parse_protein_data(self, data: dict) -> ProteinData:
         """
         Parse raw protein data into a structured format.
@@ -96,7 +148,9 @@ class UniprotFetchService:
             isoforms=[
                 Isoform(
                     isoform_name=isoform.get("name", {}).get("value"),
-                    sequence_status=isoform.get("isoformSequenceStatus")
+                    sequence_status=isoform.get("isoformSequenceStatus"),
+                    isoform_id=next(iter(isoform.get("isoformIds", [])), None),
+                    sequence=self._isoform_sequence(isoform, data),
                 )
                 for comment in data.get("comments", [])
                 if comment.get("commentType") == "ALTERNATIVE PRODUCTS"
@@ -118,4 +172,21 @@ class UniprotFetchService:
         protein_data.pdb_link = pdb_file_download_link(
             protein_data.pdb_ids[0]) if len(protein_data.pdb_ids) > 0 else ""
         protein_data.sequence = data.get("sequence", "")
-        return protein_data
+        return get_intern_table().protein(protein_data)
+
+    @staticmethod
+    def _isoform_sequence(isoform: dict, data: dict) -> Optional[str]:
+        """
+        The residues of an isoform: the canonical sequence for the displayed
+        isoform, otherwise from the isoform sequences fetched alongside.
+        """
+        if isoform.get("isoformSequenceStatus") == "Displayed":
+            sequence = data.get("sequence")
+            if isinstance(sequence, dict):
+                return sequence.get("value")
+            return parse_fasta(sequence)[1] if sequence else None
+        sequences = data.get("isoformSequences", {})
+        for isoform_id in isoform.get("isoformIds", []):
+            if isoform_id in sequences:
+                return sequences[isoform_id]
+        return None
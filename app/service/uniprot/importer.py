@@ -0,0 +1,166 @@
+"""
+Bulk-import a UniProtKB dump into the local store.
+
+    PYTHONPATH=app python -m service.uniprot.importer uniprot_sprot.dat.gz --store uniprot.sqlite
+
+The dump is streamed entry by entry and parsed with
+`UniprotFetchService.parse_protein_data` across a pool of worker
+processes; at most two batches per worker are in flight, so memory use
+does not grow with the dump. Entries whose version is already in the
+store are skipped before parsing, so re-running an import is incremental.
+"""
+import argparse
+import itertools
+import logging
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Iterator, List, Optional, Tuple
+
+from service.uniprot.dump import detect_format, entry_from_text, iter_entry_texts, open_dump
+from service.uniprot.fetch import UniprotFetchService
+from service.uniprot.store import UniprotStore
+
+logger = logging.getLogger(__name__)
+
+# Per worker process: the read connection used to skip unchanged entries
+_worker_store: Optional[UniprotStore] = None
+
+
+@dataclass
+class ImportStats:
+    read: int = 0
+    skipped: int = 0
+    written: int = 0
+    failed: int = 0
+
+
+def _store_for(store_path: str) -> UniprotStore:
+    global _worker_store
+    if _worker_store is None or _worker_store.path != store_path:
+        _worker_store = UniprotStore(store_path)
+    return _worker_store
+
+
+def _entry_version(entry: dict) -> int:
+    return entry.get("entryAudit", {}).get("entryVersion") or 0
+
+
+def parse_batch(texts: List[str], fmt: str, store_path: str) -> Tuple[list, list, int, int]:
+    """
+    Parse a batch of raw entries into store rows. Runs in a worker process.
+
+    Returns:
+        tuple: The entry rows and PDB cross-references to write, the number
+        of entries skipped because the store already has their version, and
+        the number that failed.
+    """
+    store = _store_for(store_path)
+    service = UniprotFetchService()
+    rows = []
+    xrefs = []
+    skipped = failed = 0
+    for text in texts:
+        try:
+            entry = entry_from_text(text, fmt)
+            accession = entry.get("primaryAccession")
+            version = _entry_version(entry)
+            stored = store.version(accession)
+            if stored is not None and stored >= version:
+                skipped += 1
+                continue
+            protein_data = service.parse_protein_data(entry)
+            rows.append((accession, version, UniprotStore.encode(protein_data)))
+            xrefs.append((accession, protein_data.pdb_ids))
+        except (ValueError, KeyError, TypeError, AttributeError) as e:
+            failed += 1
+            logger.warning(f"Skipping unparseable entry: {e}")
+    return rows, xrefs, skipped, failed
+
+
+class _InlineExecutor(Executor):
+    """Runs submitted work immediately; used for single-process imports."""
+
+    def submit(self, fn, *args, **kwargs):
+        future = Future()
+        future.set_result(fn(*args, **kwargs))
+        return future
+
+
+def batched(iterable, size: int) -> Iterator[list]:
+    iterator = iter(iterable)
+    while batch := list(itertools.islice(iterator, size)):
+        yield batch
+
+
+def run_import(dump_path: str, store_path: str, workers: int = 0, batch_size: int = 500) -> ImportStats:
+    """
+    Import a dump into the store.
+
+    Args:
+        dump_path (str): JSON or flat-file dump, optionally gzip-compressed.
+        store_path (str): The SQLite store to create or update.
+        workers (int): Parser processes; 0 parses in this process.
+        batch_size (int): Entries per parse batch and write transaction.
+
+    Returns:
+        ImportStats: Counts of entries read, skipped, written and failed.
+    """
+    store = UniprotStore(store_path)
+    stats = ImportStats()
+
+    with open_dump(dump_path) as stream:
+        head = stream.read(1 << 16)
+        fmt = detect_format(head)
+        stream.seek(0)
+        texts = iter_entry_texts(stream)
+
+        executor = ProcessPoolExecutor(workers) if workers > 0 else _InlineExecutor()
+        in_flight = deque()
+
+        def collect(future):
+            rows, xrefs, skipped, failed = future.result()
+            stats.written += store.put_many(rows)
+            store.put_xrefs(xrefs)
+            stats.skipped += skipped
+            stats.failed += failed
+
+        with executor:
+            for batch in batched(texts, batch_size):
+                stats.read += len(batch)
+                in_flight.append(executor.submit(parse_batch, batch, fmt, store_path))
+                if len(in_flight) >= 2 * max(workers, 1):
+                    collect(in_flight.popleft())
+            while in_flight:
+                collect(in_flight.popleft())
+
+    store.close()
+    return stats
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Import a UniProtKB dump into the local store")
+    parser.add_argument("dump", help="JSON or flat-file dump, optionally .gz")
+    parser.add_argument("--store", required=True, help="SQLite store to create or update")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="parser processes (default: CPU count)")
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    workers = args.workers if args.workers is not None else os.cpu_count() or 1
+
+    started = time.monotonic()
+    stats = run_import(args.dump, args.store, workers, args.batch_size)
+    logger.info(
+        f"Imported {args.dump} in {time.monotonic() - started:.1f}s: "
+        f"{stats.read} read, {stats.written} written, "
+        f"{stats.skipped} unchanged, {stats.failed} failed")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
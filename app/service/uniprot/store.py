@@ -0,0 +1,129 @@
+import sqlite3
+import zlib
+from functools import lru_cache
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from core.config import get_config
+from schema.protein import ProteinData
+
+
+class UniprotStore:
+    """
+    Local SQLite store of parsed UniProt entries, keyed by accession.
+
+    Entries are stored as zlib-compressed `ProteinData` JSON alongside their
+    UniProt entry version, so re-imports only replace entries that changed.
+    The database runs in WAL mode, so the API can read while an import is
+    writing.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            " accession TEXT PRIMARY KEY,"
+            " entry_version INTEGER NOT NULL,"
+            " data BLOB NOT NULL"
+            ") WITHOUT ROWID"
+        )
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS pdb_xref ("
+            " accession TEXT NOT NULL,"
+            " pdb_id TEXT NOT NULL,"
+            " PRIMARY KEY (accession, pdb_id)"
+            ") WITHOUT ROWID"
+        )
+
+    def close(self):
+        self.connection.close()
+
+    def __len__(self) -> int:
+        return self.connection.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    @staticmethod
+    def encode(protein_data: ProteinData) -> bytes:
+        return zlib.compress(protein_data.model_dump_json().encode())
+
+    @staticmethod
+    def decode(data: bytes) -> ProteinData:
+        return ProteinData.model_validate_json(zlib.decompress(data))
+
+    def get(self, accession: str) -> Optional[ProteinData]:
+        """
+        Look up an entry.
+
+        Args:
+            accession (str): The UniProt accession.
+
+        Returns:
+            ProteinData: The stored entry, or None if it is not in the store.
+        """
+        row = self.connection.execute(
+            "SELECT data FROM entries WHERE accession = ?", (accession.upper(),)
+        ).fetchone()
+        return self.decode(row[0]) if row else None
+
+    def version(self, accession: str) -> Optional[int]:
+        row = self.connection.execute(
+            "SELECT entry_version FROM entries WHERE accession = ?", (accession,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def versions(self) -> Dict[str, int]:
+        return dict(self.connection.execute("SELECT accession, entry_version FROM entries"))
+
+    def put_many(self, rows: Iterable[Tuple[str, int, bytes]]) -> int:
+        """
+        Insert or update entries in one transaction. Existing entries are
+        only replaced by a newer entry version.
+
+        Args:
+            rows (Iterable[Tuple[str, int, bytes]]): (accession, entry
+                version, encoded data) tuples.
+
+        Returns:
+            int: The number of rows inserted or replaced.
+        """
+        with self.connection:
+            self.connection.execute("BEGIN")
+            cursor = self.connection.executemany(
+                "INSERT INTO entries (accession, entry_version, data) VALUES (?, ?, ?) "
+                "ON CONFLICT(accession) DO UPDATE SET"
+                " entry_version = excluded.entry_version, data = excluded.data"
+                " WHERE excluded.entry_version > entries.entry_version",
+                rows,
+            )
+            return cursor.rowcount
+
+    def put_xrefs(self, xrefs: Iterable[Tuple[str, List[str]]]):
+        """
+        Replace the PDB cross-references of the given entries.
+
+        Args:
+            xrefs (Iterable[Tuple[str, List[str]]]): (accession, PDB IDs) tuples.
+        """
+        with self.connection:
+            self.connection.execute("BEGIN")
+            for accession, pdb_ids in xrefs:
+                self.connection.execute("DELETE FROM pdb_xref WHERE accession = ?", (accession,))
+                self.connection.executemany(
+                    "INSERT OR IGNORE INTO pdb_xref (accession, pdb_id) VALUES (?, ?)",
+                    ((accession, pdb_id) for pdb_id in pdb_ids),
+                )
+
+    def xref_pairs(self) -> Iterator[Tuple[str, str]]:
+        yield from self.connection.execute("SELECT accession, pdb_id FROM pdb_xref")
+
+    def __iter__(self) -> Iterator[ProteinData]:
+        for (data,) in self.connection.execute("SELECT data FROM entries"):
+            yield self.decode(data)
+
+
+# get_uniprot_store returns the configured local UniProt store, if any
+@lru_cache
+def get_uniprot_store() -> Optional[UniprotStore]:
+    path = get_config().uniprot_store_path
+    return UniprotStore(path) if path else None
@@ -1,2 +1,7 @@
 def pdb_file_download_link(pdb_id: str) -> str:
-    return f"https://files.rcsb.org/download/{pdb_id}.pdb"
+    """
+    The coordinate file URL of a PDB entry on the currently fastest mirror.
+    """
+    # Imported here as service.pdb imports this module
+    from service.pdb.mirrors import get_mirror_router
+    return get_mirror_router().download_link(pdb_id)
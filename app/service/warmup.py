@@ -0,0 +1,118 @@
+import asyncio
+import logging
+from functools import lru_cache
+from typing import Callable, Iterable, List
+
+from core.config import Config, get_config
+from service.cache import ProteinCache
+from service.resolver import ProteinResolver
+
+logger = logging.getLogger(__name__)
+
+
+class CacheWarmer:
+    """
+    Preloads the protein cache in the background from a list of hot IDs.
+
+    Fetches run with bounded concurrency and yield to live traffic: before
+    each fetch a worker waits (up to `max_yield` seconds) while live
+    requests are waiting on an upstream.
+    """
+
+    def __init__(
+        self,
+        resolver_factory: Callable[[], ProteinResolver] = ProteinResolver.standalone,
+        concurrency: int = 4,
+        max_yield: float = 1.0,
+    ):
+        self.resolver_factory = resolver_factory
+        self.concurrency = concurrency
+        self.max_yield = max_yield
+        self.total = 0
+        self.done = 0
+        self.failed = 0
+        self.complete = True
+
+    @staticmethod
+    def read_manifest(path: str) -> List[str]:
+        """
+        Read protein IDs from a manifest file, one per line. Blank lines and
+        lines starting with `#` are ignored.
+        """
+        with open(path) as file:
+            lines = (line.split("#", 1)[0].strip() for line in file)
+            return [line for line in lines if line]
+
+    @classmethod
+    def preload_ids(cls, cfg: Config, cache: ProteinCache) -> List[str]:
+        """
+        Collect the IDs to preload: the manifest entries first, then the
+        top-N keys from the previous run's access statistics.
+        """
+        ids = []
+        if cfg.preload_manifest:
+            try:
+                ids.extend(cls.read_manifest(cfg.preload_manifest))
+            except OSError as e:
+                logger.warning(f"Could not read preload manifest {cfg.preload_manifest}: {e}")
+        if cfg.preload_top_n and cfg.cache_stats_path:
+            stats = cache.load_access_stats(cfg.cache_stats_path)
+            ids.extend(sorted(stats, key=stats.get, reverse=True)[:cfg.preload_top_n])
+        return list(dict.fromkeys(protein_id.upper() for protein_id in ids))
+
+    def progress(self) -> dict:
+        return {
+            "total": self.total,
+            "done": self.done,
+            "failed": self.failed,
+            "complete": self.complete,
+        }
+
+    async def _yield_to_live_traffic(self):
+        waited = 0.0
+        while ProteinResolver.live_in_flight > 0 and waited < self.max_yield:
+            await asyncio.sleep(0.01)
+            waited += 0.01
+
+    def start(self, protein_ids: Iterable[str]) -> asyncio.Task:
+        """
+        Start preloading the given IDs in a background task.
+
+        Args:
+            protein_ids (Iterable[str]): The IDs to preload.
+
+        Returns:
+            asyncio.Task: The running warm-up task.
+        """
+        protein_ids = list(protein_ids)
+        self.total = len(protein_ids)
+        self.done = 0
+        self.failed = 0
+        self.complete = False
+        return asyncio.create_task(self._run(protein_ids))
+
+    async def _run(self, protein_ids: List[str]):
+        pending = iter(protein_ids)
+        resolver = self.resolver_factory()
+
+        async def worker():
+            for protein_id in pending:
+                await self._yield_to_live_traffic()
+                try:
+                    await resolver.resolve(protein_id, background=True)
+                    self.done += 1
+                except Exception as e:
+                    self.failed += 1
+                    logger.warning(f"Cache warm-up failed for protein ID {protein_id}: {e}")
+
+        try:
+            await asyncio.gather(*(worker() for _ in range(self.concurrency)))
+        finally:
+            self.complete = True
+        logger.info(f"Cache warm-up finished: {self.done} loaded, {self.failed} failed")
+
+
+# get_cache_warmer returns the process-wide cache warmer
+@lru_cache
+def get_cache_warmer() -> CacheWarmer:
+    return CacheWarmer(concurrency=get_config().warmup_concurrency)
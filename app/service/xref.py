@@ -0,0 +1,137 @@
+import csv
+import gzip
+import itertools
+import logging
+import threading
+from collections import defaultdict
+from functools import lru_cache
+from typing import Dict, Iterable, List, Set, Tuple
+
+from core.config import Config
+from service.uniprot.store import UniprotStore
+
+logger = logging.getLogger(__name__)
+
+
+class CrossReferenceIndex:
+    """
+    Bidirectional in-memory index between UniProt accessions and PDB IDs.
+
+    It is fed from the PDB cross-references of every UniProt entry that is
+    fetched or imported, and can be bulk loaded from SIFTS
+    `pdb_chain_uniprot.tsv` mapping files.
+    """
+
+    def __init__(self):
+        self._pdb_ids: Dict[str, Set[str]] = defaultdict(set)
+        self._accessions: Dict[str, Set[str]] = defaultdict(set)
+        # Bulk loads run in a thread while requests read the index
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._accessions)
+
+    def add(self, accession: str, pdb_ids: Iterable[str]):
+        """
+        Record the PDB structures of a UniProt entry, replacing any it was
+        recorded with before so that dropped cross-references go away.
+
+        Args:
+            accession (str): The UniProt accession.
+            pdb_ids (Iterable[str]): The PDB IDs cross-referenced by the entry.
+        """
+        accession = accession.upper()
+        pdb_ids = {pdb_id.upper() for pdb_id in pdb_ids}
+        with self._lock:
+            for pdb_id in self._pdb_ids.pop(accession, set()) - pdb_ids:
+                accessions = self._accessions[pdb_id]
+                accessions.discard(accession)
+                if not accessions:
+                    del self._accessions[pdb_id]
+            if pdb_ids:
+                self._pdb_ids[accession] = pdb_ids
+            for pdb_id in pdb_ids:
+                self._accessions[pdb_id].add(accession)
+
+    def add_pairs(self, pairs: Iterable[Tuple[str, str]]) -> int:
+        """
+        Record (UniProt accession, PDB ID) pairs.
+
+        Returns:
+            int: The number of pairs read.
+        """
+        count = 0
+        pairs = iter(pairs)
+        # Take the lock per chunk so bulk loads don't stall lookups
+        while chunk := list(itertools.islice(pairs, 10000)):
+            with self._lock:
+                for accession, pdb_id in chunk:
+                    accession, pdb_id = accession.upper(), pdb_id.upper()
+                    self._pdb_ids[accession].add(pdb_id)
+                    self._accessions[pdb_id].add(accession)
+            count += len(chunk)
+        return count
+
+    def pdb_ids_for(self, accession: str) -> List[str]:
+        with self._lock:
+            return sorted(self._pdb_ids.get(accession.upper(), ()))
+
+    def accessions_for(self, pdb_id: str) -> List[str]:
+        with self._lock:
+            return sorted(self._accessions.get(pdb_id.upper(), ()))
+
+    def lookup(self, protein_id: str) -> dict:
+        """
+        Look up either direction by the shape of the ID: 4 characters is a
+        PDB ID, anything else a UniProt accession.
+        """
+        if len(protein_id) == 4:
+            return {"pdb_ids": [protein_id.upper()], "uniprot_accessions": self.accessions_for(protein_id)}
+        return {"pdb_ids": self.pdb_ids_for(protein_id), "uniprot_accessions": [protein_id.upper()]}
+
+    def load_sifts(self, path: str) -> int:
+        """
+        Bulk load a SIFTS `pdb_chain_uniprot.tsv` (or `.tsv.gz`) file.
+
+        Args:
+            path (str): The mapping file.
+
+        Returns:
+            int: The number of mapping rows read.
+        """
+        opener = gzip.open if path.endswith(".gz") else open
+        with opener(path, "rt") as file:
+            rows = (line for line in file if not line.startswith("#"))
+            reader = csv.DictReader(rows, delimiter="\t")
+            return self.add_pairs((row["SP_PRIMARY"], row["PDB"]) for row in reader)
+
+
+def load_cross_references(index: CrossReferenceIndex, cfg: Config) -> int:
+    """
+    Bulk load the index from the configured SIFTS mapping file and the
+    cross-references of the local UniProt store. Blocking; meant to run in
+    a thread at startup.
+
+    Returns:
+        int: The number of pairs loaded.
+    """
+    loaded = 0
+    if cfg.sifts_mapping_path:
+        try:
+            loaded += index.load_sifts(cfg.sifts_mapping_path)
+        except (OSError, KeyError) as e:
+            logger.warning(f"Could not load SIFTS mapping {cfg.sifts_mapping_path}: {e}")
+    if cfg.uniprot_store_path:
+        # A connection of its own, as the shared one serves requests
+        store = UniprotStore(cfg.uniprot_store_path)
+        try:
+            loaded += index.add_pairs(store.xref_pairs())
+        finally:
+            store.close()
+    return loaded
+
+
+# get_xref_index returns the process-wide cross-reference index
+@lru_cache
+def get_xref_index() -> CrossReferenceIndex:
+    return CrossReferenceIndex()
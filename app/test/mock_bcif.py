@@ -0,0 +1,165 @@
+"""
+BinaryCIF and text mmCIF renderings of synthetic atom_site tables, for the
+decoder tests, the offline upstream and the parse benchmarks.
+"""
+import random
+
+import msgpack
+import numpy as np
+
+# Two chains of a small model: A has residues 1-2, B one residue and a
+# water; model 2 repeats chain A's first atom
+ATOMS = {
+    "id": [1, 2, 3, 4, 5, 6, 7],
+    "type_symbol": ["N", "C", "C", "O", "N", "O", "N"],
+    "label_asym_id": ["A", "A", "A", "B", "B", "C", "A"],
+    "auth_seq_id": [1, 1, 2, 5, 5, 300, 1],
+    # None is "." (masked), as for waters
+    "label_seq_id": [1, 1, 2, 5, 5, None, 1],
+    "Cartn_x": [1.0, 2.5, 300.0, -4.25, 0.0, 10.0, 1.0],
+    "Cartn_y": [0.5, -1.0, 2.0, 3.0, -200.75, 0.0, 0.5],
+    "Cartn_z": [0.0, 0.0, 1.5, 1.5, 1.5, -2.0, 0.0],
+    "pdbx_PDB_model_num": [1, 1, 1, 1, 1, 1, 2],
+}
+
+
+def byte_array(values, dtype: str, type_code: int):
+    return np.asarray(values, dtype=dtype).tobytes(), [{"kind": "ByteArray", "type": type_code}]
+
+
+def delta_run_length(values):
+    """
+    Delta then RunLength, as used for atom ids and sequence numbers.
+    """
+    values = np.asarray(values, dtype=np.int32)
+    deltas = np.diff(values, prepend=values[0])
+    deltas[0] = 0
+    starts = np.flatnonzero(np.diff(deltas, prepend=deltas[0] - 1))
+    counts = np.diff(np.append(starts, len(deltas)))
+    pairs = np.column_stack([deltas[starts], counts]).ravel()
+    data, encoding = byte_array(pairs, "<i4", 3)
+    return data, [
+        {"kind": "Delta", "origin": int(values[0]), "srcType": 3},
+        {"kind": "RunLength", "srcType": 3, "srcSize": len(values)},
+        *encoding,
+    ]
+
+
+def fixed_point_packed(values, factor: int = 1000, byte_count: int = 1):
+    """
+    FixedPoint, Delta and IntegerPacking into int8 or int16, as used for
+    coordinates.
+    """
+    integers = np.round(np.asarray(values) * factor).astype(np.int32)
+    deltas = np.diff(integers, prepend=0)
+    info = np.iinfo(np.int8 if byte_count == 1 else np.int16)
+    packed = []
+    for value in deltas.tolist():
+        while value >= info.max:
+            packed.append(info.max)
+            value -= info.max
+        while value <= info.min:
+            packed.append(info.min)
+            value -= info.min
+        packed.append(value)
+    data, encoding = byte_array(packed, "<i1", 1) if byte_count == 1 else byte_array(packed, "<i2", 2)
+    return data, [
+        {"kind": "FixedPoint", "factor": factor, "srcType": 33},
+        {"kind": "Delta", "origin": 0, "srcType": 3},
+        {"kind": "IntegerPacking", "byteCount": byte_count, "isUnsigned": False, "srcSize": len(deltas)},
+        *encoding,
+    ]
+
+
+def string_array(values):
+    strings = sorted(set(values))
+    positions = {string: code for code, string in enumerate(strings)}
+    codes = [positions[value] for value in values]
+    offsets = np.cumsum([0, *map(len, strings)])
+    data, data_encoding = byte_array(codes, "<u1", 4)
+    offset_data, offset_encoding = byte_array(offsets, "<i4", 3)
+    return data, [{
+        "kind": "StringArray",
+        "dataEncoding": data_encoding,
+        "stringData": "".join(strings),
+        "offsetEncoding": offset_encoding,
+        "offsets": offset_data,
+    }]
+
+
+def column(name, encoded, mask=None):
+    data, encoding = encoded
+    column = {"name": name, "data": {"data": data, "encoding": encoding}, "mask": None}
+    if mask is not None:
+        mask_data, mask_encoding = byte_array(mask, "<u1", 4)
+        column["mask"] = {"data": mask_data, "encoding": mask_encoding}
+    return column
+
+
+def label_seq_ids(atoms: dict) -> list:
+    return atoms.get("label_seq_id") or atoms["auth_seq_id"]
+
+
+def make_bcif(atoms: dict = ATOMS, entry_id: str = "1ABC", byte_count: int = 1) -> bytes:
+    rows = len(atoms["id"])
+    label_seq = label_seq_ids(atoms)
+    columns = [
+        column("id", delta_run_length(atoms["id"])),
+        column("type_symbol", string_array(atoms["type_symbol"])),
+        column("label_asym_id", string_array(atoms["label_asym_id"])),
+        column("label_seq_id", byte_array([seq or 0 for seq in label_seq], "<i4", 3),
+               mask=[int(seq is None) for seq in label_seq]),
+        column("auth_seq_id", delta_run_length(atoms["auth_seq_id"])),
+        *(column(axis, fixed_point_packed(atoms[axis], byte_count=byte_count))
+          for axis in ("Cartn_x", "Cartn_y", "Cartn_z")),
+        column("B_iso_or_equiv", byte_array([20.5] * rows, "<f4", 32), mask=[0] * (rows - 1) + [2]),
+        column("pdbx_PDB_model_num", delta_run_length(atoms["pdbx_PDB_model_num"])),
+    ]
+    return msgpack.packb({
+        "version": "0.3.0",
+        "encoder": "test",
+        "dataBlocks": [{
+            "header": entry_id,
+            "categories": [
+                {"name": "_entry", "rowCount": 1, "columns": [column("id", string_array([entry_id]))]},
+                {"name": "_atom_site", "rowCount": rows, "columns": columns},
+            ],
+        }],
+    })
+
+
+def make_mmcif(atoms: dict = ATOMS, entry_id: str = "1ABC") -> str:
+    """
+    The same atoms as a text mmCIF atom_site loop.
+    """
+    names = ["id", "type_symbol", "label_asym_id", "label_seq_id", "auth_seq_id",
+             "Cartn_x", "Cartn_y", "Cartn_z", "B_iso_or_equiv", "pdbx_PDB_model_num"]
+    lines = [f"data_{entry_id}", "#", f"_entry.id {entry_id}", "#", "loop_"]
+    lines += [f"_atom_site.{name}" for name in names]
+    for row in zip(atoms["id"], atoms["type_symbol"], atoms["label_asym_id"], label_seq_ids(atoms),
+                   atoms["auth_seq_id"], atoms["Cartn_x"], atoms["Cartn_y"], atoms["Cartn_z"],
+                   atoms["pdbx_PDB_model_num"]):
+        atom_id, element, chain, label_seq, seq, x, y, z, model = row
+        label_seq = "." if label_seq is None else label_seq
+        lines.append(f"{atom_id} {element} {chain} {label_seq} {seq} {x:.3f} {y:.3f} {z:.3f} 20.50 {model}")
+    lines.append("#")
+    return "\n".join(lines) + "\n"
+
+
+def protein_atoms(atom_count: int, seed: int = 0) -> dict:
+    """
+    A synthetic structure of `atom_count` atoms: chains of residues of 8
+    atoms, placed along a random walk with bond-length steps.
+    """
+    rng = random.Random(seed)
+    walk = np.cumsum(np.random.default_rng(seed).normal(0, 0.9, (atom_count, 3)), axis=0).round(3)
+    return {
+        "id": list(range(1, atom_count + 1)),
+        "type_symbol": [rng.choice("CCCCNNOS") for _ in range(atom_count)],
+        "label_asym_id": [chr(ord("A") + (i // 8) // 500 % 26) for i in range(atom_count)],
+        "auth_seq_id": [(i // 8) % 500 + 1 for i in range(atom_count)],
+        "Cartn_x": walk[:, 0].tolist(),
+        "Cartn_y": walk[:, 1].tolist(),
+        "Cartn_z": walk[:, 2].tolist(),
+        "pdbx_PDB_model_num": [1] * atom_count,
+    }
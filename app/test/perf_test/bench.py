@@ -0,0 +1,303 @@
+"""
+Offline microbenchmarks for the parsing, validation and serialization hot paths.
+
+Run from the repository root:
+
+    PYTHONPATH=app python app/test/perf_test/bench.py --save app/test/perf_test/baseline.json
+    PYTHONPATH=app python app/test/perf_test/bench.py --compare app/test/perf_test/baseline.json
+
+Each benchmark records ops/sec and the peak traced memory of a single call,
+and the size of its input where that is part of the comparison.
+When comparing against a baseline the run exits with status 1 if any
+benchmark got slower, or allocates more, by more than `--threshold`.
+"""
+import argparse
+import asyncio
+import copy
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict
+
+import numpy as np
+from fastapi.encoders import jsonable_encoder
+
+from schema.pdb import PDBEntry
+from schema.protein import ProteinResponse
+from service.bcif import parse_bcif
+from service.fasta import PackedSequence
+from service.features import FeatureTable
+from service.pdb import PDBFetchService
+from service.uniprot import UniprotFetchService
+from test.mock_bcif import make_bcif, make_mmcif, protein_atoms
+from test.mock_values import mock_pdb_return, mock_uniprot_return
+
+BENCHMARKS: Dict[str, Callable[[], Callable[[], object]]] = {}
+
+# How many times the synthetic large entries repeat their list fields
+SCALE = 50
+# Atoms of the synthetic structure parsed as BinaryCIF and as text mmCIF
+STRUCTURE_ATOMS = 100000
+
+
+def benchmark(name: str):
+    """
+    Register a benchmark. The decorated function does the setup and returns
+    the zero-argument callable that is timed.
+    """
+    def register(setup: Callable[[], Callable[[], object]]):
+        BENCHMARKS[name] = setup
+        return setup
+    return register
+
+
+def fetched_uniprot_entry() -> dict:
+    """
+    The recorded entry as `UniprotFetchService.fetch_protein_data` returns
+    it, with the FASTA text in place of UniProt's own sequence object.
+    """
+    entry = copy.deepcopy(mock_uniprot_return)
+    residues = entry["sequence"]["value"]
+    entry["sequence"] = f">sp|{entry['primaryAccession']}|{entry['uniProtkbId']}\n" + "".join(
+        residues[i:i + 60] + "\n" for i in range(0, len(residues), 60))
+    return entry
+
+
+def scaled_uniprot_entry(scale: int = SCALE) -> dict:
+    entry = fetched_uniprot_entry()
+    entry["features"] = entry.get("features", []) * scale
+    entry["comments"] = entry.get("comments", []) * scale
+    entry["uniProtKBCrossReferences"] = entry.get("uniProtKBCrossReferences", []) * scale
+    return entry
+
+
+def scaled_pdb_payload(scale: int = SCALE) -> dict:
+    payload = mock_pdb_return.model_dump(by_alias=True)
+    for key, value in payload.items():
+        if isinstance(value, list):
+            payload[key] = value * scale
+    return payload
+
+
+def with_input(fn: Callable[[], object], size: int) -> Callable[[], object]:
+    """
+    Record the size in bytes of what a benchmark parses.
+    """
+    fn.input_bytes = size
+    return fn
+
+
+def parse_mmcif_atom_site(text: str) -> dict:
+    """
+    Read the atom_site loop of a text mmCIF file into columns, numeric ones
+    as NumPy arrays: the tokenizing path BinaryCIF decoding replaces.
+    """
+    lines = iter(text.splitlines())
+    for line in lines:
+        if line.startswith("_atom_site."):
+            break
+    names = [line[len("_atom_site."):]]
+    rows = []
+    for line in lines:
+        if line.startswith("_atom_site."):
+            names.append(line[len("_atom_site."):])
+        elif line.startswith("#"):
+            break
+        else:
+            rows.append(line.split())
+    columns = dict(zip(names, map(list, zip(*rows))))
+    for name in ("id", "auth_seq_id", "pdbx_PDB_model_num"):
+        columns[name] = np.array(columns[name], dtype=np.int32)
+    for name in ("Cartn_x", "Cartn_y", "Cartn_z", "B_iso_or_equiv"):
+        columns[name] = np.array(columns[name], dtype=np.float64)
+    return columns
+
+
+def run_coroutine(loop: asyncio.AbstractEventLoop, factory):
+    return lambda: loop.run_until_complete(factory())
+
+
+@benchmark("uniprot_parse")
+def bench_uniprot_parse():
+    service = UniprotFetchService()
+    entry = fetched_uniprot_entry()
+    return lambda: service.parse_protein_data(entry)
+
+
+@benchmark("uniprot_parse_large")
+def bench_uniprot_parse_large():
+    service = UniprotFetchService()
+    entry = scaled_uniprot_entry()
+    return lambda: service.parse_protein_data(entry)
+
+
+@benchmark("pdb_entry_validation")
+def bench_pdb_entry_validation():
+    payload = mock_pdb_return.model_dump(by_alias=True)
+    return lambda: PDBEntry(**payload)
+
+
+@benchmark("pdb_entry_validation_large")
+def bench_pdb_entry_validation_large():
+    payload = scaled_pdb_payload()
+    return lambda: PDBEntry(**payload)
+
+
+@benchmark("pdb_parse")
+def bench_pdb_parse():
+    service = PDBFetchService()
+    loop = asyncio.new_event_loop()
+    return run_coroutine(loop, lambda: service.parse_protein_data(mock_pdb_return))
+
+
+@benchmark("response_encoding")
+def bench_response_encoding():
+    data = UniprotFetchService().parse_protein_data(fetched_uniprot_entry())
+    return lambda: json.dumps(jsonable_encoder({"protein_id": "P01308", "data": data}))
+
+
+@benchmark("response_encoding_large")
+def bench_response_encoding_large():
+    data = UniprotFetchService().parse_protein_data(scaled_uniprot_entry())
+    return lambda: json.dumps(jsonable_encoder({"protein_id": "P01308", "data": data}))
+
+
+@benchmark("response_encoding_model")
+def bench_response_encoding_model():
+    data = UniprotFetchService().parse_protein_data(fetched_uniprot_entry())
+    return lambda: ProteinResponse.model_construct(protein_id="P01308", data=data).to_json()
+
+
+@benchmark("response_encoding_model_large")
+def bench_response_encoding_model_large():
+    data = UniprotFetchService().parse_protein_data(scaled_uniprot_entry())
+    return lambda: ProteinResponse.model_construct(protein_id="P01308", data=data).to_json()
+
+
+@benchmark("sequence_decode_large")
+def bench_sequence_decode_large():
+    # A titin-sized sequence, decoded as on every cache hit's summary
+    residues = fetched_uniprot_entry()["sequence"].split("\n", 1)[1].replace("\n", "")
+    sequence = PackedSequence("sp|Q8WZ42|TITIN_HUMAN", (residues * 35000)[:35000])
+    return sequence.fasta
+
+
+@benchmark("structure_parse_bcif")
+def bench_structure_parse_bcif():
+    content = make_bcif(protein_atoms(STRUCTURE_ATOMS), byte_count=2)
+    return with_input(lambda: parse_bcif(content, ("atom_site",)), len(content))
+
+
+@benchmark("structure_parse_mmcif")
+def bench_structure_parse_mmcif():
+    text = make_mmcif(protein_atoms(STRUCTURE_ATOMS))
+    return with_input(lambda: parse_mmcif_atom_site(text), len(text.encode()))
+
+
+@benchmark("feature_table_build")
+def bench_feature_table_build():
+    features = UniprotFetchService().parse_protein_data(scaled_uniprot_entry()).features
+    return lambda: FeatureTable(features)
+
+
+@benchmark("feature_range_query")
+def bench_feature_range_query():
+    table = FeatureTable(UniprotFetchService().parse_protein_data(scaled_uniprot_entry()).features)
+    return lambda: table.to_features(table.select("Domain", 20, 60)[:100])
+
+
+def measure(fn: Callable[[], object], min_time: float) -> Dict[str, float]:
+    """
+    Time `fn` for at least `min_time` seconds and trace one call's peak memory.
+    """
+    fn()  # warm-up
+
+    ops = 0
+    start = time.perf_counter()
+    elapsed = 0.0
+    while elapsed < min_time:
+        fn()
+        ops += 1
+        elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "ops_per_sec": round(ops / elapsed, 2),
+        "peak_kib": round(peak / 1024, 2),
+    }
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list:
+    """
+    Return a description of every benchmark that regressed past `threshold`.
+    """
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        if current["ops_per_sec"] < previous["ops_per_sec"] * (1 - threshold):
+            regressions.append(
+                f"{name}: {current['ops_per_sec']} ops/s vs baseline {previous['ops_per_sec']}")
+        if current["peak_kib"] > previous["peak_kib"] * (1 + threshold):
+            regressions.append(
+                f"{name}: {current['peak_kib']} KiB peak vs baseline {previous['peak_kib']}")
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--save", help="write results to this baseline file")
+    parser.add_argument("--compare", help="compare results against this baseline file")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="allowed relative regression (default 0.2)")
+    parser.add_argument("--min-time", type=float, default=0.5,
+                        help="seconds to spend timing each benchmark")
+    parser.add_argument("-k", dest="filter", default="",
+                        help="only run benchmarks whose name contains this")
+    args = parser.parse_args(argv)
+
+    # Read before --save can overwrite it, when both name the same file
+    baseline = None
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)["results"]
+
+    results = {}
+    for name, setup in BENCHMARKS.items():
+        if args.filter not in name:
+            continue
+        fn = setup()
+        results[name] = measure(fn, args.min_time)
+        if hasattr(fn, "input_bytes"):
+            results[name]["input_kib"] = round(fn.input_bytes / 1024, 2)
+        print(f"{name:32} {results[name]['ops_per_sec']:>12.2f} ops/s "
+              f"{results[name]['peak_kib']:>12.2f} KiB"
+              + (f" {results[name]['input_kib']:>12.2f} KiB input" if "input_kib" in results[name] else ""))
+
+    if args.save:
+        with open(args.save, "w") as file:
+            json.dump({
+                "python": sys.version.split()[0],
+                "platform": platform.platform(),
+                "results": results,
+            }, file, indent=2)
+
+    if baseline is not None:
+        regressions = compare(results, baseline, args.threshold)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,168 @@
+"""
+Local stand-in for the UniProt and RCSB REST APIs used by the load harness.
+
+It replays recorded responses for any requested ID: the bundled UniProt
+entry (`test/uniprot_test_response.json`) and PDB entry (`mock_values.py`)
+are re-keyed to the requested accession, and recordings placed in
+`FAKE_RECORDINGS_DIR` (`uniprot/<id>.json`, `uniprot/<id>.fasta`,
+`pdb/<id>.json`) take precedence. PDB entries have one chain, with the
+bundled UniProt entry's sequence, and BinaryCIF coordinates are a synthetic
+structure of `FAKE_ATOMS` atoms (default 5000).
+
+Behaviour is configured through the environment:
+
+    FAKE_LATENCY      fixed:<ms> | uniform:<low_ms>:<high_ms> | lognormal:<median_ms>:<sigma>
+    FAKE_ERROR_RATE   fraction of requests answered with a 503 (default 0)
+    FAKE_SEED         seed for the latency and error generator
+
+Run from the repository root:
+
+    PYTHONPATH=app uvicorn test.perf_test.fake_upstream:app --port 8900
+"""
+import asyncio
+import copy
+import json
+import math
+import os
+import random
+from functools import lru_cache
+
+from fastapi import FastAPI, Response
+from fastapi.responses import PlainTextResponse
+
+from test.mock_bcif import make_bcif, protein_atoms
+from test.mock_values import mock_pdb_return, mock_uniprot_return
+
+RECORDINGS_DIR = os.environ.get("FAKE_RECORDINGS_DIR", "")
+ERROR_RATE = float(os.environ.get("FAKE_ERROR_RATE", "0"))
+ATOM_COUNT = int(os.environ.get("FAKE_ATOMS", "5000"))
+
+rng = random.Random(os.environ.get("FAKE_SEED"))
+
+
+def latency_sampler(spec: str):
+    """
+    Build a function returning a latency in seconds from a FAKE_LATENCY spec.
+    """
+    if not spec:
+        return lambda: 0.0
+    kind, *params = spec.split(":")
+    values = [float(p) for p in params]
+    match kind:
+        case "fixed":
+            return lambda: values[0] / 1000
+        case "uniform":
+            return lambda: rng.uniform(values[0], values[1]) / 1000
+        case "lognormal":
+            return lambda: rng.lognormvariate(math.log(values[0]), values[1]) / 1000
+    raise ValueError(f"Unknown latency distribution {spec!r}")
+
+
+sample_latency = latency_sampler(os.environ.get("FAKE_LATENCY", ""))
+
+
+def read_recording(*parts: str):
+    if not RECORDINGS_DIR:
+        return None
+    path = os.path.join(RECORDINGS_DIR, *parts)
+    if not os.path.exists(path):
+        return None
+    with open(path) as file:
+        return file.read()
+
+
+def uniprot_json(accession: str) -> str:
+    recorded = read_recording("uniprot", f"{accession}.json")
+    if recorded is not None:
+        return recorded
+    entry = copy.copy(mock_uniprot_return)
+    entry["primaryAccession"] = accession
+    return json.dumps(entry)
+
+
+def uniprot_fasta(accession: str) -> str:
+    recorded = read_recording("uniprot", f"{accession}.fasta")
+    if recorded is not None:
+        return recorded
+    residues = mock_uniprot_return["sequence"]["value"]
+    return f">sp|{accession}|{mock_uniprot_return['uniProtkbId']}\n" + "".join(
+        residues[i:i + 60] + "\n" for i in range(0, len(residues), 60))
+
+
+def pdb_json(entry_id: str) -> str:
+    recorded = read_recording("pdb", f"{entry_id}.json")
+    if recorded is not None:
+        return recorded
+    entry = mock_pdb_return.model_dump(by_alias=True)
+    entry["rcsb_id"] = entry_id
+    entry["rcsb_entry_container_identifiers"]["entry_id"] = entry_id
+    entry["rcsb_entry_container_identifiers"]["rcsb_id"] = entry_id
+    return json.dumps(entry)
+
+
+def pdb_fasta(entry_id: str) -> str:
+    residues = mock_uniprot_return["sequence"]["value"]
+    return f">{entry_id}_1|Chain A|{mock_uniprot_return['uniProtkbId']}\n{residues}\n"
+
+
+@lru_cache
+def structure_bcif(entry_id: str) -> bytes:
+    return make_bcif(protein_atoms(ATOM_COUNT), entry_id, byte_count=2)
+
+
+async def upstream_weather():
+    """
+    Apply the configured latency, and return an error response if this
+    request was picked to fail.
+    """
+    delay = sample_latency()
+    if delay > 0:
+        await asyncio.sleep(delay)
+    if ERROR_RATE > 0 and rng.random() < ERROR_RATE:
+        return Response(status_code=503)
+    return None
+
+
+app = FastAPI(title="Fake UniProt/RCSB upstream")
+
+
+@app.get("/uniprotkb/stream")
+async def uniprot_stream(query: str, format: str = "fasta"):
+    error = await upstream_weather()
+    if error is not None:
+        return error
+    return PlainTextResponse(uniprot_fasta(query.removeprefix("accession:")))
+
+
+@app.get("/uniprotkb/{accession}")
+async def uniprot_entry(accession: str, format: str = "json"):
+    error = await upstream_weather()
+    if error is not None:
+        return error
+    if format == "fasta":
+        return PlainTextResponse(uniprot_fasta(accession))
+    return Response(uniprot_json(accession), media_type="application/json")
+
+
+@app.get("/rest/v1/core/entry/{entry_id}")
+async def pdb_entry(entry_id: str):
+    error = await upstream_weather()
+    if error is not None:
+        return error
+    return Response(pdb_json(entry_id), media_type="application/json")
+
+
+@app.get("/fasta/entry/{entry_id}")
+async def pdb_sequences(entry_id: str):
+    error = await upstream_weather()
+    if error is not None:
+        return error
+    return PlainTextResponse(pdb_fasta(entry_id.upper()))
+
+
+@app.get("/models/{entry_id}.bcif")
+async def pdb_structure(entry_id: str):
+    error = await upstream_weather()
+    if error is not None:
+        return error
+    return Response(structure_bcif(entry_id.upper()), media_type="application/octet-stream")
@@ -0,0 +1,82 @@
+"""
+Locust scenarios for the offline load harness (see `run_offline_load.py`).
+
+IDs are drawn from a Zipf distribution over a fixed catalogue, so a small
+set of hot proteins gets most of the traffic. Tasks are tagged by phase:
+
+    cold   every request asks for an ID that has not been requested before
+    warm   requests follow the Zipf mix, including client-side batches
+
+The catalogue is controlled through LOAD_UNIPROT_IDS, LOAD_PDB_IDS,
+LOAD_ZIPF_S and LOAD_BATCH_SIZE.
+"""
+import itertools
+import os
+import random
+
+from locust import HttpUser, between, tag, task
+
+UNIPROT_IDS = int(os.environ.get("LOAD_UNIPROT_IDS", "5000"))
+PDB_IDS = int(os.environ.get("LOAD_PDB_IDS", "5000"))
+ZIPF_S = float(os.environ.get("LOAD_ZIPF_S", "1.1"))
+BATCH_SIZE = int(os.environ.get("LOAD_BATCH_SIZE", "20"))
+
+ALPHABET = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+
+
+def uniprot_id(n: int) -> str:
+    return f"P{n:05d}"
+
+
+def pdb_id(n: int) -> str:
+    return "1" + "".join(ALPHABET[(n // 36 ** i) % 36] for i in range(3))
+
+
+def zipf_cum_weights(size: int, s: float) -> list:
+    return list(itertools.accumulate(1 / rank ** s for rank in range(1, size + 1)))
+
+
+UNIPROT_WEIGHTS = zipf_cum_weights(UNIPROT_IDS, ZIPF_S)
+PDB_WEIGHTS = zipf_cum_weights(PDB_IDS, ZIPF_S)
+
+# Cold-phase IDs start past the Zipf catalogue so they never collide with it
+cold_ids = itertools.count(max(UNIPROT_IDS, PDB_IDS))
+
+
+def zipf_uniprot_id() -> str:
+    return uniprot_id(random.choices(range(UNIPROT_IDS), cum_weights=UNIPROT_WEIGHTS)[0])
+
+
+def zipf_pdb_id() -> str:
+    return pdb_id(random.choices(range(PDB_IDS), cum_weights=PDB_WEIGHTS)[0])
+
+
+class OfflineProteinApiUser(HttpUser):
+    wait_time = between(0, 0.1)
+
+    @tag("warm")
+    @task(6)
+    def fetch_uniprot_data(self):
+        self.client.get(f"/api/v1/protein/{zipf_uniprot_id()}", name="/protein/[uniprot]")
+
+    @tag("warm")
+    @task(3)
+    def fetch_pdb_data(self):
+        self.client.get(f"/api/v1/protein/{zipf_pdb_id()}", name="/protein/[pdb]")
+
+    @tag("warm")
+    @task(1)
+    def fetch_batch(self):
+        for _ in range(BATCH_SIZE):
+            protein_id = zipf_uniprot_id() if random.random() < 0.7 else zipf_pdb_id()
+            self.client.get(f"/api/v1/protein/{protein_id}", name="/protein/[batch]")
+
+    @tag("cold")
+    @task(2)
+    def fetch_cold_uniprot_data(self):
+        self.client.get(f"/api/v1/protein/{uniprot_id(next(cold_ids))}", name="/protein/[uniprot]")
+
+    @tag("cold")
+    @task(1)
+    def fetch_cold_pdb_data(self):
+        self.client.get(f"/api/v1/protein/{pdb_id(next(cold_ids))}", name="/protein/[pdb]")
@@ -0,0 +1,128 @@
+"""
+Offline end-to-end load test: runs the API against the fake upstream and
+drives it with locust once per API worker count and phase.
+
+Run from the repository root (requires locust):
+
+    PYTHONPATH=app python app/test/perf_test/run_offline_load.py --workers 1,2,4
+
+A JSON report with throughput and latency percentiles per worker count and
+phase is written to `--report` and summarised on stdout. Upstream latency
+and error rate are passed through to the fake server with `--latency` and
+`--error-rate`.
+"""
+import argparse
+import csv
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+
+import httpx
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+APP_DIR = os.path.dirname(os.path.dirname(HERE))
+
+
+def wait_until_up(url: str, timeout: float = 30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(url).status_code < 500:
+                return
+        except httpx.TransportError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"{url} did not come up within {timeout}s")
+
+
+@contextmanager
+def serve(app: str, port: int, env: dict, workers: int = 1):
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", app, "--app-dir", APP_DIR,
+         "--port", str(port), "--workers", str(workers), "--log-level", "warning"],
+        env={**os.environ, **env},
+    )
+    try:
+        wait_until_up(f"http://127.0.0.1:{port}/docs")
+        yield f"http://127.0.0.1:{port}"
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def run_locust(host: str, phase: str, users: int, duration: str, csv_prefix: str):
+    # locust exits non-zero whenever a request failed, which injected
+    # upstream errors make expected; the stats file is checked instead
+    subprocess.run(
+        [sys.executable, "-m", "locust", "-f", os.path.join(HERE, "locust_offline.py"),
+         "--headless", "--host", host, "--tags", phase,
+         "-u", str(users), "-r", str(users), "-t", duration,
+         "--csv", csv_prefix, "--only-summary"],
+    )
+
+
+def read_summary(csv_prefix: str) -> dict:
+    with open(f"{csv_prefix}_stats.csv") as file:
+        for row in csv.DictReader(file):
+            if row["Name"] == "Aggregated":
+                return {
+                    "requests": int(row["Request Count"]),
+                    "failures": int(row["Failure Count"]),
+                    "rps": float(row["Requests/s"]),
+                    "p50_ms": float(row["50%"]),
+                    "p95_ms": float(row["95%"]),
+                    "p99_ms": float(row["99%"]),
+                }
+    raise RuntimeError(f"No aggregated row in {csv_prefix}_stats.csv")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Offline load test against a fake upstream")
+    parser.add_argument("--workers", default="1,2,4", help="comma separated API worker counts")
+    parser.add_argument("--phases", default="cold,warm", help="comma separated locust phases")
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--duration", default="30s")
+    parser.add_argument("--latency", default="lognormal:80:0.5", help="FAKE_LATENCY spec")
+    parser.add_argument("--error-rate", default="0.0", help="FAKE_ERROR_RATE")
+    parser.add_argument("--upstream-port", type=int, default=8900)
+    parser.add_argument("--api-port", type=int, default=8000)
+    parser.add_argument("--report", default="load_report.json")
+    args = parser.parse_args(argv)
+
+    upstream_env = {"FAKE_LATENCY": args.latency, "FAKE_ERROR_RATE": args.error_rate}
+    report = []
+
+    with serve("test.perf_test.fake_upstream:app", args.upstream_port, upstream_env) as upstream:
+        api_env = {
+            "UNIPROT_BASE_URL": f"{upstream}/uniprotkb",
+            "PDB_BASE_URL": f"{upstream}/rest/v1/core/entry",
+            "PDB_MODELS_BASE_URL": f"{upstream}/models",
+            "PDB_FASTA_BASE_URL": f"{upstream}/fasta/entry",
+            # Never fail over to the real PDBe and PDBj
+            "PDB_MIRRORS": "rcsb",
+        }
+        for workers in (int(w) for w in args.workers.split(",")):
+            # A fresh API process per worker count, so each starts cold
+            with serve("app:app", args.api_port, api_env, workers=workers) as api, \
+                    tempfile.TemporaryDirectory() as tmp:
+                for phase in args.phases.split(","):
+                    prefix = os.path.join(tmp, f"{workers}-{phase}")
+                    run_locust(api, phase, args.users, args.duration, prefix)
+                    report.append({"workers": workers, "phase": phase, **read_summary(prefix)})
+
+    with open(args.report, "w") as file:
+        json.dump(report, file, indent=2)
+
+    print(f"{'workers':>7} {'phase':>6} {'rps':>9} {'p50':>7} {'p95':>7} {'p99':>7} {'fail':>6}")
+    for row in report:
+        print(f"{row['workers']:>7} {row['phase']:>6} {row['rps']:>9.1f} {row['p50_ms']:>7.0f} "
+              f"{row['p95_ms']:>7.0f} {row['p99_ms']:>7.0f} {row['failures']:>6}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,113 @@
+"""
+Startup benchmark: how long a fresh API process takes to import and to
+answer its first requests, against the fake upstream.
+
+Run from the repository root:
+
+    PYTHONPATH=app python app/test/perf_test/startup_bench.py --runs 5
+
+For each run a new Python process imports the app (import time) and a new
+API server is started and polled until `/health`, then a protein lookup,
+first succeed (times measured from spawning the server). Medians over the
+runs are printed and written to `--report`; with `--budget` the run exits
+with status 1 when the first protein response takes longer than that.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+from test.perf_test.run_offline_load import APP_DIR, serve
+
+IMPORT_SNIPPET = "import time; start = time.perf_counter(); import app; print(time.perf_counter() - start)"
+
+
+def import_time() -> float:
+    output = subprocess.run(
+        [sys.executable, "-c", IMPORT_SNIPPET],
+        cwd=APP_DIR, env={**os.environ, "PYTHONPATH": APP_DIR},
+        capture_output=True, text=True, check=True,
+    ).stdout
+    return float(output.strip().splitlines()[-1])
+
+
+def wait_for(client: httpx.Client, url: str, started: float, timeout: float) -> float:
+    """
+    Poll a URL until it answers 200.
+
+    Returns:
+        float: Seconds from `started` to the first successful response.
+    """
+    while time.perf_counter() - started < timeout:
+        try:
+            if client.get(url).status_code == 200:
+                return time.perf_counter() - started
+        except httpx.TransportError:
+            pass
+        time.sleep(0.005)
+    raise RuntimeError(f"{url} did not answer within {timeout}s")
+
+
+def time_to_first_responses(port: int, env: dict, protein_id: str, timeout: float) -> dict:
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app:app", "--app-dir", APP_DIR,
+         "--port", str(port), "--log-level", "warning"],
+        env={**os.environ, **env},
+    )
+    try:
+        with httpx.Client(timeout=timeout) as client:
+            health = wait_for(client, f"http://127.0.0.1:{port}/health", started, timeout)
+            protein = wait_for(client, f"http://127.0.0.1:{port}/api/v1/protein/{protein_id}", started, timeout)
+        return {"first_health_s": health, "first_protein_s": protein}
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Startup benchmark against a fake upstream")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--protein-id", default="P69905")
+    parser.add_argument("--upstream-port", type=int, default=8900)
+    parser.add_argument("--api-port", type=int, default=8000)
+    parser.add_argument("--timeout", type=float, default=60)
+    parser.add_argument("--budget", type=float, help="maximum seconds to the first protein response")
+    parser.add_argument("--report", default="startup_report.json")
+    args = parser.parse_args(argv)
+
+    runs = []
+    with serve("test.perf_test.fake_upstream:app", args.upstream_port, {"FAKE_LATENCY": "fixed:0"}) as upstream:
+        api_env = {
+            "UNIPROT_BASE_URL": f"{upstream}/uniprotkb",
+            "PDB_BASE_URL": f"{upstream}/rest/v1/core/entry",
+            "PDB_MODELS_BASE_URL": f"{upstream}/models",
+            "PDB_FASTA_BASE_URL": f"{upstream}/fasta/entry",
+            # Never fail over to the real PDBe and PDBj
+            "PDB_MIRRORS": "rcsb",
+        }
+        for _ in range(args.runs):
+            runs.append({
+                "import_s": import_time(),
+                **time_to_first_responses(args.api_port, api_env, args.protein_id, args.timeout),
+            })
+
+    summary = {name: statistics.median(run[name] for run in runs) for name in runs[0]}
+    with open(args.report, "w") as file:
+        json.dump({"python": sys.version.split()[0], "median": summary, "runs": runs}, file, indent=2)
+
+    for name, value in summary.items():
+        print(f"{name:16} {value * 1000:>9.1f} ms")
+    if args.budget is not None and summary["first_protein_s"] > args.budget:
+        print(f"OVER BUDGET first protein response after {summary['first_protein_s']:.3f}s")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
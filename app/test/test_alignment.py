@@ -0,0 +1,67 @@
+import random
+import pytest
+from service import alignment
+from service.alignment import substitution_matrix, AlignmentCache, align
+from service.fasta import ALPHABET
+
+
+def reference_score(first: str, second: str, gap: int, local: bool) -> int:
+    """Textbook quadratic DP, cell by cell."""
+    previous = [0 if local else -gap * j for j in range(len(second) + 1)]
+    best = 0
+    for i, x in enumerate(first, 1):
+        row = [0 if local else -gap * i]
+        for j, y in enumerate(second, 1):
+            cell = max(
+                previous[j - 1] + substitution_matrix()[ALPHABET.index(x), ALPHABET.index(y)],
+                previous[j] - gap,
+                row[j - 1] - gap,
+            )
+            row.append(max(cell, 0) if local else cell)
+        best = max(best, *row)
+        previous = row
+    return best if local else previous[-1]
+
+
+def alignment_score(aligned_a: str, aligned_b: str, gap: int) -> int:
+    return sum(
+        -gap if "-" in (x, y) else int(substitution_matrix()[ALPHABET.index(x), ALPHABET.index(y)])
+        for x, y in zip(aligned_a, aligned_b)
+    )
+
+
+@pytest.mark.parametrize("mode", ["global", "local"])
+@pytest.mark.parametrize("full_matrix_cells", [4, 1 << 20])
+def test_align_matches_reference(monkeypatch, mode, full_matrix_cells):
+    # A tiny full-matrix threshold forces Hirschberg's recursion throughout
+    monkeypatch.setattr(alignment, "FULL_MATRIX_CELLS", full_matrix_cells)
+    rng = random.Random(7)
+    for _ in range(40):
+        first = "".join(rng.choices(ALPHABET[:20], k=rng.randint(1, 40)))
+        second = "".join(rng.choices(ALPHABET[:20], k=rng.randint(1, 40)))
+        gap = rng.choice([2, 4, 8])
+
+        result = align(first, second, mode, gap)
+
+        assert result["score"] == reference_score(first, second, gap, mode == "local")
+        assert alignment_score(result["aligned_a"], result["aligned_b"], gap) == result["score"]
+        assert result["aligned_a"].replace("-", "") == first[result["start_a"] - 1:result["end_a"]]
+        assert result["aligned_b"].replace("-", "") == second[result["start_b"] - 1:result["end_b"]]
+
+
+def test_local_alignment_finds_shared_region():
+    result = align("WWWWMKVLAAGIVGHHHH", "PPMKVLAAGIVGPP", "local")
+
+    assert result["aligned_a"] == result["aligned_b"] == "MKVLAAGIVG"
+    assert (result["start_a"], result["end_a"]) == (5, 14)
+    assert (result["start_b"], result["end_b"]) == (3, 12)
+    assert result["identity"] == 1.0
+
+
+def test_alignment_cache_reuses_results():
+    cache = AlignmentCache(max_entries=1)
+    first = cache.align("MKVLAAG", "MKVIAAG")
+
+    assert cache.align("MKVLAAG", "MKVIAAG") is first
+    cache.align("MKVLAAG", "MKVIAAG", mode="local")
+    assert cache.align("MKVLAAG", "MKVIAAG") is not first
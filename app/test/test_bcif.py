@@ -0,0 +1,85 @@
+import numpy as np
+import pytest
+from unittest.mock import AsyncMock
+from fastapi.testclient import TestClient
+from app import app
+from service.bcif import StringColumn, decode_data, parse_bcif, structure_summary
+from service.pdb import PDBFetchService
+from test.mock_bcif import ATOMS, byte_array, make_bcif
+
+BCIF_URL = "https://models.rcsb.org"
+
+
+def test_decodes_each_encoding():
+    atom_site = parse_bcif(make_bcif(), ("atom_site",))["atom_site"]
+
+    assert atom_site["id"].tolist() == ATOMS["id"]
+    assert atom_site["auth_seq_id"].tolist() == ATOMS["auth_seq_id"]
+    # Large deltas span several saturated int8 values
+    assert np.allclose(atom_site["Cartn_x"], ATOMS["Cartn_x"])
+    assert np.allclose(atom_site["Cartn_y"], ATOMS["Cartn_y"])
+    assert isinstance(atom_site["label_asym_id"], StringColumn)
+    assert [atom_site["label_asym_id"][i] for i in range(3)] == ["A", "A", "A"]
+    assert atom_site["label_asym_id"].strings == ("A", "B", "C")
+
+
+def test_masked_values():
+    atom_site = parse_bcif(make_bcif())["atom_site"]
+
+    assert np.isnan(atom_site["B_iso_or_equiv"][-1])
+    assert atom_site.masks["label_seq_id"].tolist() == [0, 0, 0, 0, 0, 1, 0]
+
+
+def test_only_requested_categories_are_decoded():
+    assert set(parse_bcif(make_bcif(), ("atom_site",))) == {"atom_site"}
+    assert set(parse_bcif(make_bcif())) == {"entry", "atom_site"}
+
+
+def test_interval_quantization():
+    data, _ = byte_array([0, 2, 4], "<i4", 3)
+    values = decode_data(data, [
+        {"kind": "IntervalQuantization", "min": 1.0, "max": 2.0, "numSteps": 5, "srcType": 32},
+        {"kind": "ByteArray", "type": 3},
+    ])
+    assert values.tolist() == [1.0, 1.5, 2.0]
+
+
+def test_structure_summary():
+    summary = structure_summary(parse_bcif(make_bcif())["atom_site"])
+
+    assert summary["atom_count"] == 7
+    assert summary["model_count"] == 2
+    assert summary["chains"] == [
+        {"chain_id": "A", "atom_count": 3, "residue_count": 2},
+        {"chain_id": "B", "atom_count": 2, "residue_count": 1},
+        {"chain_id": "C", "atom_count": 1, "residue_count": 1},
+    ]
+    assert summary["elements"] == {"C": 2, "N": 3, "O": 2}
+    assert summary["bounding_box"] == {"min": [-4.25, -200.75, -2.0], "max": [300.0, 3.0, 1.5]}
+
+
+@pytest.mark.asyncio
+async def test_fetch_structure(httpx_mock):
+    httpx_mock.add_response(url=f"{BCIF_URL}/1ABC.bcif", content=b"bcif")
+    httpx_mock.add_response(url=f"{BCIF_URL}/9XYZ.bcif", status_code=404)
+
+    assert await PDBFetchService().fetch_structure("1ABC") == b"bcif"
+    with pytest.raises(LookupError):
+        await PDBFetchService().fetch_structure("9XYZ")
+
+
+def test_structure_endpoint():
+    service = AsyncMock()
+    service.fetch_structure.return_value = make_bcif()
+    app.dependency_overrides[PDBFetchService] = lambda: service
+    try:
+        client = TestClient(app)
+        response = client.get("/api/v1/protein/1ABC/structure")
+        invalid = client.get("/api/v1/protein/P69905/structure")
+    finally:
+        app.dependency_overrides.clear()
+
+    assert response.status_code == 200
+    assert response.json()["protein_id"] == "1ABC"
+    assert response.json()["chains"][0] == {"chain_id": "A", "atom_count": 3, "residue_count": 2}
+    assert invalid.status_code == 400
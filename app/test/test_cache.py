@@ -0,0 +1,185 @@
+import asyncio
+import os
+import time
+import pytest
+from unittest.mock import AsyncMock
+from core.config import Config
+from schema.protein import ProteinData, EntryAudit, Isoform
+from service.cache import ProteinCache, snapshot_periodically
+from service.resolver import ProteinResolver
+from service.warmup import CacheWarmer
+from service.similarity import KmerIndex
+from service.xref import CrossReferenceIndex
+
+
+def make_protein(accession: str, entry_version: int = 1) -> ProteinData:
+    return ProteinData(
+        primary_accession=accession,
+        entry_audit=EntryAudit(entry_version=entry_version),
+    )
+
+
+def test_cache_get_and_set():
+    cache = ProteinCache()
+    protein = make_protein("P12345", entry_version=7)
+
+    assert cache.get("P12345") is None
+    cache.set("p12345", protein)
+
+    assert cache.get("P12345") is protein
+    assert "P12345" in cache
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_isoform_sequences_are_packed():
+    protein = ProteinData(
+        primary_accession="P12345",
+        sequence=">sp|P12345|TEST\nMKVLAAGIVG\n",
+        isoforms=[
+            Isoform(isoform_id="P12345-1", sequence_status="Displayed", sequence="MKVLAAGIVG"),
+            Isoform(isoform_id="P12345-2", sequence="MKVLWW"),
+            Isoform(isoform_id="P12345-3"),
+        ],
+    )
+    cached = ProteinCache().set("P12345", protein)
+
+    assert all(isoform.sequence is None for isoform in cached.data.isoforms)
+    assert cached.isoform_sequences[0] is cached.sequence
+    assert [isoform.sequence for isoform in cached.isoforms()] == ["MKVLAAGIVG", "MKVLWW", None]
+    assert cached.materialize() == protein
+
+
+def test_cache_expires_entries():
+    cache = ProteinCache()
+    cache.set("P12345", make_protein("P12345"), ttl=0)
+
+    assert cache.get("P12345") is None
+    assert len(cache) == 0
+
+
+def test_cache_evicts_least_recently_used():
+    cache = ProteinCache(max_entries=2)
+    cache.set("P00001", make_protein("P00001"))
+    cache.set("P00002", make_protein("P00002"))
+    cache.get("P00001")
+    cache.set("P00003", make_protein("P00003"))
+
+    assert "P00001" in cache
+    assert "P00002" not in cache
+    assert "P00003" in cache
+
+
+def test_access_stats_round_trip(tmp_path):
+    cache = ProteinCache()
+    for protein_id in ["P00001", "P00002", "P00002", "4HHB", "4HHB", "4HHB"]:
+        cache.get(protein_id)
+    path = tmp_path / "stats.json"
+
+    cache.save_access_stats(str(path))
+
+    assert cache.top_keys(2) == ["4HHB", "P00002"]
+    assert ProteinCache.load_access_stats(str(path)) == {"4HHB": 3, "P00002": 2, "P00001": 1}
+
+
+def test_preload_ids_from_manifest_and_stats(tmp_path):
+    manifest = tmp_path / "hot.txt"
+    manifest.write_text("# hot proteins\nP12345\n\n4hhb  # haemoglobin\nP12345\n")
+    stats = tmp_path / "stats.json"
+    stats.write_text('{"P00001": 1, "P00002": 5, "4HHB": 9}')
+    cfg = Config(preload_manifest=str(manifest), preload_top_n=2, cache_stats_path=str(stats))
+
+    assert CacheWarmer.preload_ids(cfg, ProteinCache()) == ["P12345", "4HHB", "P00002"]
+
+
+@pytest.mark.asyncio
+async def test_warmer_loads_cache_with_bounded_concurrency():
+    cache = ProteinCache()
+    running = 0
+    max_running = 0
+
+    async def fetch_protein_data(protein_id):
+        nonlocal running, max_running
+        running += 1
+        max_running = max(max_running, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        if protein_id == "P00003":
+            raise Exception("upstream down")
+        return {"primaryAccession": protein_id}
+
+    uniprot_service = AsyncMock()
+    uniprot_service.get_local = lambda protein_id: None
+    uniprot_service.fetch_protein_data.side_effect = fetch_protein_data
+    uniprot_service.parse_protein_data = lambda raw: make_protein(raw["primaryAccession"])
+    warmer = CacheWarmer(
+        resolver_factory=lambda: ProteinResolver(
+            AsyncMock(), uniprot_service, cache, CrossReferenceIndex(), KmerIndex()),
+        concurrency=2,
+    )
+
+    await warmer.start([f"P0000{i}" for i in range(1, 7)])
+
+    assert max_running == 2
+    assert warmer.progress() == {"total": 6, "done": 5, "failed": 1, "complete": True}
+    assert "P00001" in cache and "P00003" not in cache
+    # Background loads do not count as accesses
+    assert cache.stats()["misses"] == 0
+
+
+def test_snapshot_restore_keeps_expiry_and_version(tmp_path):
+    path = str(tmp_path / "cache.snapshot")
+    cache = ProteinCache()
+    cache.set("P12345", make_protein("P12345", entry_version=42), ttl=600)
+    cache.set("4HHB", make_protein("4HHB"), ttl=0)
+
+    assert cache.snapshot(path) == 1
+
+    restored = ProteinCache()
+    assert restored.restore(path) == 1
+    assert restored.get("P12345") == make_protein("P12345", entry_version=42)
+    assert restored._entries["P12345"].expires_at == cache._entries["P12345"].expires_at
+    assert restored._entries["P12345"].version == 42
+    assert "4HHB" not in restored
+
+
+@pytest.mark.asyncio
+async def test_final_snapshot_after_periodic_write(tmp_path, monkeypatch):
+    path = str(tmp_path / "cache.snapshot")
+    cache = ProteinCache()
+    for i in range(200):
+        cache.set(f"P{i:05d}", make_protein(f"P{i:05d}"))
+    write_snapshot = ProteinCache.write_snapshot
+    writes = []
+
+    def slow_write(path, entries):
+        # Only the periodic write, the first, is slow
+        writes.append(len(entries))
+        if len(writes) == 1:
+            time.sleep(0.1)
+        write_snapshot(path, entries)
+
+    monkeypatch.setattr(ProteinCache, "write_snapshot", staticmethod(slow_write))
+    # As at shutdown: cancelled while a periodic write runs in its thread
+    task = asyncio.create_task(snapshot_periodically(cache, path, 0))
+    await asyncio.sleep(0.02)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    cache.set("P99999", make_protein("P99999"))
+    assert cache.snapshot(path) == 201
+    # Nothing still running replaces the final snapshot afterwards
+    await asyncio.sleep(0.2)
+
+    assert writes == [200, 201]
+    assert ProteinCache().restore(path) == 201
+    assert os.listdir(tmp_path) == ["cache.snapshot"]
+
+
+def test_restore_missing_or_corrupt_snapshot(tmp_path):
+    cache = ProteinCache()
+    assert cache.restore(str(tmp_path / "missing")) == 0
+
+    corrupt = tmp_path / "corrupt"
+    corrupt.write_bytes(b"not a snapshot")
+    assert cache.restore(str(corrupt)) == 0
@@ -1,12 +1,18 @@
+import asyncio
 import pytest
 import json
 from unittest.mock import AsyncMock
 from fastapi.testclient import TestClient
 from fastapi import status
+from fastapi.encoders import jsonable_encoder
 from app import app  # Replace with the entry point of your FastAPI app
 from service.pdb import PDBFetchService
 from service.uniprot import UniprotFetchService
-from schema.protein import ProteinData, EntryAudit
+from service.cache import ProteinCache, get_protein_cache
+from service.similarity import KmerIndex, get_kmer_index
+from service.xref import CrossReferenceIndex, get_xref_index
+from service.fasta import fasta
+from schema.protein import ProteinData, EntryAudit, Feature, Isoform, DiseaseAssociation
 from schema.pdb import (PDBEntry,
                         Author,
                         RcsbEntryInfo,
@@ -261,6 +267,7 @@ def mock_uniprot_service():
 
     # Mock fetch_protein_data
     mock_service.fetch_protein_data.return_value = mock_uniprot_return
+    mock_service.get_local.return_value = None
 
     # Mock parse_protein_data
     # TODO: update mock
@@ -277,6 +284,12 @@ def override_dependencies(mock_pdb_service, mock_uniprot_service):
     """Override FastAPI dependencies with mocks."""
     app.dependency_overrides[PDBFetchService] = lambda: mock_pdb_service
     app.dependency_overrides[UniprotFetchService] = lambda: mock_uniprot_service
+    cache = ProteinCache()
+    app.dependency_overrides[get_protein_cache] = lambda: cache
+    xref = CrossReferenceIndex()
+    app.dependency_overrides[get_xref_index] = lambda: xref
+    similarity = KmerIndex()
+    app.dependency_overrides[get_kmer_index] = lambda: similarity
 
 
 @pytest.fixture
@@ -327,10 +340,8 @@ async def test_retrieve_protein_by_pdb_id(client, mock_pdb_service, mock_uniprot
             "functions": [],
             "subunit_structure": [],
             "subcellular_locations": [],
-            "disease_associations": [],
-            "isoforms": [],
-            "features": [],
             "pdb_ids": [],
+            "uniprot_accessions": [],
             "pdb_link": "https://example.com/pdb/4HHB",
             "sequence": None
         }
@@ -365,10 +376,8 @@ async def test_retrieve_protein_by_uniprot_id(client, mock_uniprot_service, mock
             "functions": [],
             "subunit_structure": [],
             "subcellular_locations": [],
-            "disease_associations": [],
-            "isoforms": [],
-            "features": [],
             "pdb_ids": [],
+            "uniprot_accessions": [],
             "pdb_link": None,
             "sequence": None
         }
@@ -377,3 +386,205 @@ async def test_retrieve_protein_by_uniprot_id(client, mock_uniprot_service, mock
     mock_uniprot_service.parse_protein_data.assert_called_once_with(
         mock_uniprot_return)  # TODO: revisit
     mock_pdb_service.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_retrieve_protein_served_from_cache(client, mock_uniprot_service):
+    """Repeated requests for the same ID only go upstream once."""
+    first = client.get("/api/v1/protein/Q9H9Q4")
+    second = client.get("/api/v1/protein/q9h9q4")
+
+    assert first.status_code == second.status_code == status.HTTP_200_OK
+    assert second.json()["data"] == first.json()["data"]
+    mock_uniprot_service.fetch_protein_data.assert_awaited_once_with("Q9H9Q4")
+
+
+@pytest.mark.asyncio
+async def test_pdb_response_enriched_from_uniprot(client, mock_uniprot_service, mock_pdb_service):
+    """A PDB entry picks up the annotations of an already resolved UniProt entry."""
+    mock_uniprot_service.parse_protein_data.return_value = ProteinData(
+        primary_accession="P69905",
+        recommended_name="Hemoglobin subunit alpha",
+        functions=["Involved in oxygen transport"],
+        pdb_ids=["4HHB"],
+    )
+    client.get("/api/v1/protein/P69905")
+
+    response = client.get("/api/v1/protein/4HHB")
+
+    data = response.json()["data"]
+    assert data["uniprot_accessions"] == ["P69905"]
+    assert data["recommended_name"] == "Hemoglobin subunit alpha"
+    assert data["functions"] == ["Involved in oxygen transport"]
+    assert data["entry_audit"]["first_public_date"] == "1984-07-17T00:00:00+0000"
+    assert client.get("/api/v1/xref/4hhb").json() == {
+        "protein_id": "4hhb",
+        "pdb_ids": ["4HHB"],
+        "uniprot_accessions": ["P69905"],
+    }
+    mock_uniprot_service.fetch_protein_data.assert_awaited_once_with("P69905")
+
+
+@pytest.mark.asyncio
+async def test_retrieve_protein_structures(client, mock_uniprot_service, mock_pdb_service):
+    """Structures are fanned out to the PDB and reported one status each."""
+    mock_uniprot_service.parse_protein_data.return_value = ProteinData(
+        primary_accession="P69905",
+        pdb_ids=["4HHB", "1BAD", "2SLO", "3XXX"],
+    )
+
+    async def fetch(pdb_id):
+        if pdb_id == "1BAD":
+            raise ValueError("Upstream failure")
+        if pdb_id == "2SLO":
+            await asyncio.sleep(5)
+        return mock_pdb_return
+
+    mock_pdb_service.fetch_protein_data.side_effect = fetch
+
+    response = client.get("/api/v1/protein/P69905/structures?limit=3&deadline=0.5")
+
+    assert response.status_code == status.HTTP_200_OK
+    body = response.json()
+    assert body["data"]["primary_accession"] == "P69905"
+    structures = {s["pdb_id"]: s for s in body["structures"]}
+    assert list(structures) == ["4HHB", "1BAD", "2SLO"]
+    assert structures["4HHB"]["status"] == "ok"
+    assert structures["4HHB"]["data"]["uniprot_accessions"] == ["P69905"]
+    assert structures["1BAD"] == {"pdb_id": "1BAD", "status": "error", "data": None, "error": "Upstream failure"}
+    assert structures["2SLO"]["status"] == "timeout"
+
+
+@pytest.mark.asyncio
+async def test_retrieve_protein_structures_requires_uniprot_id(client):
+    response = client.get("/api/v1/protein/4HHB/structures")
+
+    assert response.status_code == 400
+
+
+@pytest.fixture
+def annotated_entry(mock_uniprot_service):
+    mock_uniprot_service.parse_protein_data.return_value = ProteinData(
+        primary_accession="Q8WZ42",
+        features=[
+            Feature(type="Domain", location="1 - 90", description="Ig-like 1"),
+            Feature(type="Region", location="50 - 200", description="Disordered"),
+            Feature(type="Domain", location="300 - 390", description="Ig-like 2"),
+            Feature(type="Domain", location="None - None", description="Unplaced"),
+        ],
+        isoforms=[Isoform(isoform_name=f"{i}") for i in range(1, 4)],
+        disease_associations=[DiseaseAssociation(disease_name="Cardiomyopathy", acronym="CMD1G")],
+    )
+
+
+@pytest.mark.asyncio
+async def test_summary_omits_heavy_lists(client, annotated_entry):
+    summary = client.get("/api/v1/protein/Q8WZ42").json()["data"]
+    full = client.get("/api/v1/protein/Q8WZ42?full=true").json()["data"]
+
+    assert "features" not in summary and "isoforms" not in summary
+    assert "disease_associations" not in summary
+    assert len(full["features"]) == 4
+    assert len(full["isoforms"]) == 3
+
+
+@pytest.mark.asyncio
+async def test_protein_response_matches_generic_encoding(client, mock_uniprot_service, annotated_entry):
+    entry = mock_uniprot_service.parse_protein_data.return_value
+    response = client.get("/api/v1/protein/Q8WZ42?full=true")
+
+    assert response.headers["content-type"] == "application/json"
+    assert response.json() == jsonable_encoder({"protein_id": "Q8WZ42", "data": entry})
+    assert "ProteinResponse" in client.get("/openapi.json").json()["components"]["schemas"]
+
+
+@pytest.mark.asyncio
+async def test_retrieve_protein_features_paged_and_filtered(client, mock_uniprot_service, annotated_entry):
+    page = client.get("/api/v1/protein/Q8WZ42/features?offset=1&limit=2").json()
+    assert page["total"] == 4
+    assert [f["description"] for f in page["items"]] == ["Disordered", "Ig-like 2"]
+
+    domains = client.get("/api/v1/protein/Q8WZ42/features?type=domain&start=80&end=310").json()
+    assert [f["description"] for f in domains["items"]] == ["Ig-like 1", "Ig-like 2"]
+
+    region = client.get("/api/v1/protein/Q8WZ42/features?start=95&end=99").json()
+    assert [f["description"] for f in region["items"]] == ["Disordered"]
+    mock_uniprot_service.fetch_protein_data.assert_awaited_once_with("Q8WZ42")
+
+
+@pytest.mark.asyncio
+async def test_retrieve_protein_isoforms_and_diseases(client, annotated_entry):
+    isoforms = client.get("/api/v1/protein/Q8WZ42/isoforms?limit=2").json()
+    diseases = client.get("/api/v1/protein/Q8WZ42/diseases").json()
+
+    assert isoforms["total"] == 3
+    assert [i["isoform_name"] for i in isoforms["items"]] == ["1", "2"]
+    assert diseases["items"] == [{"disease_name": "Cardiomyopathy", "acronym": "CMD1G", "cross_reference": ""}]
+    assert client.get("/api/v1/protein/Q8WZ4/features").status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_retrieve_protein_sequence_window(client, mock_uniprot_service):
+    text = fasta("sp|P01308|INS_HUMAN Insulin",
+                 "MALWMRLLPLLALLALWGPDPAAAFVNQHLCGSHLVEALYLVCGERGFFYTPKTRREAEDLQVGQVELGGGPGAGSLQPL"
+                 "ALEGSLQKRGIVEQCCTSICSLYQLENYCN")
+    mock_uniprot_service.parse_protein_data.return_value = ProteinData(
+        primary_accession="P01308", sequence=text)
+
+    window = client.get("/api/v1/protein/P01308/sequence?start=25&end=54").json()
+    whole = client.get("/api/v1/protein/P01308/sequence").json()
+
+    assert window["header"] == "sp|P01308|INS_HUMAN Insulin"
+    assert window["length"] == 110
+    assert window["sequence"] == "FVNQHLCGSHLVEALYLVCGERGFFYTPKT"
+    assert len(whole["sequence"]) == 110 and whole["end"] == 110
+    assert client.get("/api/v1/protein/P01308").json()["data"]["sequence"] == text
+    assert client.get("/api/v1/protein/P01308/sequence?start=200").status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_find_similar_proteins(client, mock_uniprot_service):
+    """Resolved sequences are indexed and ranked by shared k-mers."""
+    sequences = {
+        "P01308": "MALWMRLLPLLALLALWGPDPAAAFVNQHLCGSHLVEALYLVCGERGFFYTPKT",
+        "P01315": "MALWMRLLPLLALLALWGPDPAAAFVNQHLCGSHLVEALYLVCGERGFFYTPKS",
+        "P69905": "MVLSPADKTNVKAAWGKVGAHAGEYGAEALERMFLSFPTTKTYFPHFDLSHGSA",
+    }
+    for accession, residues in sequences.items():
+        mock_uniprot_service.parse_protein_data.return_value = ProteinData(
+            primary_accession=accession, sequence=fasta(f"sp|{accession}|TEST", residues))
+        client.get(f"/api/v1/protein/{accession}")
+
+    by_sequence = client.post("/api/v1/protein/similar", json={"sequence": sequences["P01308"][:30]}).json()
+    by_id = client.post("/api/v1/protein/similar", json={"protein_id": "P01308", "limit": 1}).json()
+
+    assert by_sequence["indexed"] == 3
+    assert [hit["accession"] for hit in by_sequence["hits"]] == ["P01308", "P01315"]
+    assert by_sequence["hits"][0]["coverage"] == 1.0
+    assert by_id["hits"] == [{"accession": "P01315", "shared_kmers": 49, "coverage": 0.98}]
+    assert client.post("/api/v1/protein/similar", json={}).status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_align_proteins(client, mock_uniprot_service, mock_pdb_service):
+    """Proteins can be aligned by UniProt accession, PDB chain or raw sequence."""
+    mock_uniprot_service.parse_protein_data.return_value = ProteinData(
+        primary_accession="P69905", sequence=fasta("sp|P69905|HBA_HUMAN", "MVLSPADKTNVKAAWGKVGAHAGEYGAEALERMF"))
+    mock_pdb_service.fetch_chain_sequence.return_value = ("4HHB_1|Chains A, C", "MVLSPADKTNVKAAWGKVGAHAGEYGAEALERMF")
+
+    response = client.post("/api/v1/protein/align", json={
+        "first": {"protein_id": "P69905"},
+        "second": {"protein_id": "4HHB.A"},
+    })
+    local = client.post("/api/v1/protein/align", json={
+        "first": {"sequence": "WWWWMKVLAAGIVGHHHH"},
+        "second": {"sequence": ">query\nPPMKVLAAGIVGPP\n"},
+        "mode": "local",
+    })
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["identity"] == 1.0
+    assert response.json()["second"] == "4HHB.A"
+    mock_pdb_service.fetch_chain_sequence.assert_awaited_once_with("4HHB", "A")
+    assert local.json()["aligned_a"] == "MKVLAAGIVG"
+    assert client.post("/api/v1/protein/align", json={"first": {}, "second": {}}).status_code == 400
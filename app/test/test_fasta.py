@@ -0,0 +1,66 @@
+import pickle
+import random
+from service.fasta import ALPHABET, FastaStreamParser, PackedSequence, fasta, parse_fasta, record_accession
+
+
+def random_residues(n: int, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    return "".join(rng.choice(ALPHABET) for _ in range(n))
+
+
+def test_parse_fasta():
+    header, residues = parse_fasta(">sp|P01308|INS_HUMAN Insulin\nMALWMRLLPL\nLALLALWGPD\n")
+
+    assert header == "sp|P01308|INS_HUMAN Insulin"
+    assert residues == "MALWMRLLPLLALLALWGPD"
+    assert parse_fasta("MALW MRLL\n") == ("", "MALWMRLL")
+
+
+def test_packed_sequence_slices():
+    residues = random_residues(1003)
+    sequence = PackedSequence("header", residues)
+
+    assert len(sequence) == 1003
+    assert len(sequence.data) == 126 * 5
+    assert sequence.residues() == residues
+    for start, end in [(1, 1), (1, 8), (8, 9), (17, 40), (999, 1003), (500, 5000)]:
+        assert sequence.slice(start, end) == residues[start - 1:end]
+    assert sequence.slice(10, 9) == ""
+
+
+def test_from_fasta_round_trip():
+    text = fasta("sp|P01308|INS_HUMAN", random_residues(130, seed=1))
+    sequence = PackedSequence.from_fasta(text)
+
+    assert sequence.header == "sp|P01308|INS_HUMAN"
+    assert sequence.raw is None
+    assert sequence.fasta() == text
+    assert pickle.loads(pickle.dumps(sequence)).fasta() == text
+    assert PackedSequence.from_fasta(None) is None
+
+
+def test_from_fasta_keeps_text_it_cannot_reproduce():
+    text = ">sp|X|Y\nmalwb1\n"
+    sequence = PackedSequence.from_fasta(text)
+
+    assert sequence.slice() == "MALWBX"
+    assert sequence.fasta() == text
+
+
+def test_stream_parser_handles_arbitrary_chunks():
+    text = (">sp|P01308|INS_HUMAN Insulin\nMALWMRLLPL\nLALLALWGPD\n"
+            ">sp|P01308-2|INS_HUMAN Isoform 2 of Insulin\nMALW\n\n"
+            ">sp|P01308-3|INS_HUMAN Isoform 3 of Insulin\nMRLL")
+    expected = [
+        ("sp|P01308|INS_HUMAN Insulin", "MALWMRLLPLLALLALWGPD"),
+        ("sp|P01308-2|INS_HUMAN Isoform 2 of Insulin", "MALW"),
+        ("sp|P01308-3|INS_HUMAN Isoform 3 of Insulin", "MRLL"),
+    ]
+    for size in (1, 3, 7, len(text)):
+        parser = FastaStreamParser()
+        records = []
+        for i in range(0, len(text), size):
+            records.extend(parser.feed(text[i:i + size]))
+        records.extend(parser.close())
+        assert records == expected
+    assert [record_accession(header) for header, _ in expected] == ["P01308", "P01308-2", "P01308-3"]
@@ -0,0 +1,65 @@
+import pickle
+import random
+from schema.protein import Feature
+from service.features import FeatureTable, parse_location
+
+
+def make_features(n: int, seed: int = 0):
+    rng = random.Random(seed)
+    features = []
+    for i in range(n):
+        start = rng.randint(1, 5000)
+        end = start + rng.randint(0, 300)
+        features.append(Feature(
+            type=rng.choice(["Domain", "Region", "Modified residue", "Helix"]),
+            location=f"{start} - {end}",
+            description=rng.choice(["", "Disordered", f"Ig-like {i}"]),
+        ))
+    features.append(Feature(type="Domain", location="None - None", description="Unplaced"))
+    features.append(Feature(type="Site", location="<1 - 40", description=None))
+    return features
+
+
+def test_feature_table_round_trip():
+    features = make_features(200)
+    table = FeatureTable(features)
+
+    assert len(table) == len(features)
+    assert table.to_features() == features
+    assert set(table.types) == {"Domain", "Region", "Modified residue", "Helix", "Site"}
+
+
+def test_overlapping_matches_linear_scan():
+    features = make_features(500, seed=1)
+    table = FeatureTable(features)
+
+    for start, end in [(1, 1), (100, 180), (2500, 2500), (4900, 6000), (None, 50), (5200, None)]:
+        expected = []
+        for i, feature in enumerate(features):
+            feature_start, feature_end = parse_location(feature.location)
+            if feature_start is None:
+                continue
+            if (start is None or feature_end >= start) and (end is None or feature_start <= end):
+                expected.append(i)
+        assert table.overlapping(start, end) == expected
+
+
+def test_select_by_type_and_range():
+    table = FeatureTable([
+        Feature(type="Domain", location="1 - 90"),
+        Feature(type="Region", location="50 - 200"),
+        Feature(type="Domain", location="300 - 390"),
+    ])
+
+    assert table.select("domain") == [0, 2]
+    assert table.select("Domain", start=80, end=310) == [0, 2]
+    assert table.select(start=95, end=99) == [1]
+    assert table.select("Helix") == []
+
+
+def test_feature_table_pickles():
+    features = make_features(50)
+    table = pickle.loads(pickle.dumps(FeatureTable(features)))
+
+    assert table.to_features() == features
+    assert table.overlapping(100, 200) == FeatureTable(features).overlapping(100, 200)
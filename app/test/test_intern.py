@@ -0,0 +1,81 @@
+import pytest
+from pydantic import ValidationError
+from schema.protein import DiseaseAssociation, Feature, Organism, ProteinData
+from service.cache import ProteinCache
+from service.features import FeatureTable
+from service.intern import InternTable, get_intern_table
+
+
+def make_protein(accession: str) -> ProteinData:
+    return ProteinData(
+        primary_accession=accession,
+        organism=Organism(scientific_name="Homo sapiens", common_name="Human"),
+        subcellular_locations=["".join(["Cyto", "plasm"])],
+        disease_associations=[DiseaseAssociation(disease_name="Cardiomyopathy", cross_reference="MIM")],
+    )
+
+
+def interned_protein(accession: str) -> ProteinData:
+    # As parsed entries are
+    return get_intern_table().protein(make_protein(accession))
+
+
+def test_equal_values_share_one_instance():
+    table = InternTable()
+    first, second = table.protein(make_protein("P00001")), table.protein(make_protein("P00002"))
+
+    assert first.organism is second.organism
+    assert first.disease_associations[0] is second.disease_associations[0]
+    assert first.subcellular_locations[0] is second.subcellular_locations[0]
+    assert table.stats()["hits"] == 3
+    assert table.model(Organism(scientific_name="Mus musculus")) is not first.organism
+
+
+def test_interned_models_are_immutable():
+    with pytest.raises(ValidationError):
+        Organism(scientific_name="Homo sapiens").scientific_name = "Mus musculus"
+
+
+def test_table_is_bounded():
+    table = InternTable(max_entries=2)
+    for name in ("a1", "b2", "c3"):
+        table.string(name)
+
+    assert len(table) == 2
+    kept = "".join(["c", "3"])
+    assert table.string(kept) is not kept
+
+
+def test_feature_types_and_restored_entries_are_interned(tmp_path):
+    features = [Feature(type="".join(["Hel", "ix"]), location="1 - 5")]
+    assert FeatureTable(features).types[0] is FeatureTable(list(features)).types[0]
+
+    path = str(tmp_path / "cache.snapshot")
+    cache = ProteinCache()
+    cache.set("P00001", make_protein("P00001"))
+    cache.snapshot(path)
+    restored = ProteinCache()
+    restored.restore(path)
+
+    live = get_intern_table().protein(make_protein("P00002"))
+    assert restored.get("P00001").organism is live.organism
+    assert "interning" in restored.stats()
+
+
+def test_saved_bytes_follow_cached_entries():
+    cache = ProteinCache(max_entries=2)
+    cache.set("P00001", interned_protein("P00001"))
+    assert cache.stats()["interning"]["saved_bytes"] == 0
+
+    cache.set("P00002", interned_protein("P00002"))
+    saved = cache.stats()["interning"]["saved_bytes"]
+    assert saved > 0
+    # Reads do not add to it, replacing an entry does not count it twice
+    cache.get("P00001")
+    cache.set("P00002", interned_protein("P00002"))
+    assert cache.stats()["interning"]["saved_bytes"] == saved
+
+    cache.set("P00003", interned_protein("P00003"))
+    assert cache.stats()["interning"]["saved_bytes"] == saved
+    cache.invalidate("P00002")
+    assert cache.stats()["interning"]["saved_bytes"] == 0
@@ -0,0 +1,120 @@
+import asyncio
+import json
+import pytest
+from unittest.mock import AsyncMock
+from fastapi.testclient import TestClient
+from app import app
+from schema.protein import ProteinData, Feature
+from service.cache import CachedProtein, ProteinCache
+from service.jobs import COMPLETED, JobManager, JobStore, get_job_manager
+from service.resolver import ProteinResolver
+from service.similarity import KmerIndex
+from service.xref import CrossReferenceIndex
+
+
+def make_resolver(fail: set = frozenset()):
+    async def resolve_entry(protein_id, background=False, store=True):
+        if protein_id in fail:
+            raise ValueError(f"Upstream failure for {protein_id}")
+        return CachedProtein.compact(ProteinData(
+            primary_accession=protein_id, features=[Feature(type="Domain", location="1 - 9")]))
+
+    resolver = AsyncMock()
+    resolver.resolve_entry.side_effect = resolve_entry
+    return resolver
+
+
+def test_job_runs_and_checkpoints(tmp_path):
+    store = JobStore(str(tmp_path / "jobs.sqlite"))
+    resolver = make_resolver(fail={"P00003"})
+    manager = JobManager(store, resolver_factory=lambda: resolver, concurrency=2, checkpoint_items=2)
+    job_id = manager.submit([f"P0000{i}" for i in range(1, 6)])
+
+    asyncio.run(manager._run(job_id))
+
+    status = manager.status(job_id)
+    assert (status["status"], status["total"], status["done"], status["failed"]) == (COMPLETED, 5, 4, 1)
+    results = list(store.iter_results(job_id, batch_size=2))
+    assert [protein_id for protein_id, *_ in results] == [f"P0000{i}" for i in range(1, 6)]
+    assert results[2][1:] == ("error", None, "Upstream failure for P00003")
+
+
+def test_job_resumes_from_checkpoint(tmp_path):
+    path = str(tmp_path / "jobs.sqlite")
+    store = JobStore(path)
+    job_id = JobManager(store).submit(["P00001", "P00002", "P00003"])
+    # A previous run got as far as checkpointing the first item
+    store.set_status(job_id, "running")
+    store.save_results(job_id, [(0, "ok", None, None)])
+    store.close()
+
+    resolver = make_resolver()
+    manager = JobManager(JobStore(path), resolver_factory=lambda: resolver)
+
+    async def restart():
+        task = manager.start()
+        while manager.status(job_id)["status"] != COMPLETED:
+            await asyncio.sleep(0.01)
+        await manager.stop()
+        return task
+
+    asyncio.run(restart())
+
+    assert manager.status(job_id)["done"] == 3
+    assert [call.args[0] for call in resolver.resolve_entry.await_args_list] == ["P00002", "P00003"]
+
+
+def test_job_items_bypass_cache(tmp_path):
+    cache = ProteinCache(max_entries=2)
+    cache.set("P00001", ProteinData(primary_accession="P00001"))
+    cache.set("P00002", ProteinData(primary_accession="P00002"))
+    similarity = KmerIndex()
+    uniprot_service = AsyncMock()
+    uniprot_service.get_local = lambda protein_id: None
+    uniprot_service.fetch_protein_data.side_effect = lambda protein_id: {"primaryAccession": protein_id}
+    uniprot_service.parse_protein_data = lambda raw: ProteinData(
+        primary_accession=raw["primaryAccession"], sequence=">sp\nMVLSPADKTNVKAAWGKVGAHAGEYGAEALERMF")
+    resolver = ProteinResolver(AsyncMock(), uniprot_service, cache, CrossReferenceIndex(), similarity)
+    store = JobStore(str(tmp_path / "jobs.sqlite"))
+    manager = JobManager(store, resolver_factory=lambda: resolver, concurrency=1)
+    job_id = manager.submit(["P00001", "P00003", "P00004"])
+
+    asyncio.run(manager._run(job_id))
+
+    assert manager.status(job_id)["done"] == 3
+    # Cached entries are served, fetched ones neither cached nor indexed
+    assert [call.args[0] for call in uniprot_service.fetch_protein_data.await_args_list] == ["P00003", "P00004"]
+    assert "P00003" not in cache and "P00004" not in cache and len(similarity) == 0
+    # Nor does the job's hit on P00001 make it more recent than P00002
+    cache.set("P00005", ProteinData(primary_accession="P00005"))
+    assert "P00001" not in cache and "P00002" in cache
+
+
+@pytest.fixture
+def manager(tmp_path):
+    resolver = make_resolver()
+    manager = JobManager(JobStore(str(tmp_path / "jobs.sqlite")), resolver_factory=lambda: resolver)
+    app.dependency_overrides[get_job_manager] = lambda: manager
+    yield manager
+    del app.dependency_overrides[get_job_manager]
+
+
+def test_job_endpoints(manager):
+    client = TestClient(app)
+
+    submitted = client.post("/api/v1/jobs", json={"protein_ids": ["P00001", "4HHB"], "full": True})
+    job_id = submitted.json()["job_id"]
+    assert submitted.status_code == 202
+    assert submitted.json()["status"] == "queued"
+
+    asyncio.run(manager._run(job_id))
+
+    assert client.get(f"/api/v1/jobs/{job_id}").json()["done"] == 2
+    events = client.get(f"/api/v1/jobs/{job_id}/events")
+    assert events.headers["content-type"].startswith("text/event-stream")
+    assert json.loads(events.text.removeprefix("data: "))["status"] == COMPLETED
+    lines = [json.loads(line) for line in client.get(f"/api/v1/jobs/{job_id}/results").text.splitlines()]
+    assert [line["protein_id"] for line in lines] == ["P00001", "4HHB"]
+    assert lines[0]["data"]["features"] == [{"type": "Domain", "location": "1 - 9", "description": ""}]
+    assert client.get("/api/v1/jobs/unknown").status_code == 404
+    assert client.post("/api/v1/jobs", json={"protein_ids": ["bad id"]}).status_code == 400
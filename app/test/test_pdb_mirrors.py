@@ -0,0 +1,248 @@
+import asyncio
+import pytest
+from schema.pdb import PDBEntry
+from test.mock_values import mock_pdb_return
+from service.pdb.mirrors import (EntryNotFound, MirrorRouter, PDBeMirror, PDBjMirror, PDBMirror,
+                                 RCSBMirror, build_mirrors)
+
+
+class FakeMirror(PDBMirror):
+    def __init__(self, name: str, delay: float = 0, error: Exception = None):
+        self.name = name
+        self.delay = delay
+        self.error = error
+        self.calls = 0
+
+    async def fetch_entry(self, pdb_id: str, timeout: float) -> PDBEntry:
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.error is not None:
+            raise self.error
+        return PDBEntry(rcsb_id=pdb_id, struct={"title": self.name})
+
+    def download_link(self, pdb_id: str) -> str:
+        return f"https://{self.name}/{pdb_id}"
+
+
+def test_pdbe_summary_normalised():
+    entry = PDBeMirror.normalise("4hhb", {
+        "title": "The crystal structure of human deoxyhaemoglobin",
+        "deposition_date": "19840307",
+        "release_date": "19840717",
+        "revision_date": "20240522",
+        "experimental_method": ["X-ray diffraction"],
+        "entry_authors": ["Fermi, G.", "Perutz, M.F."],
+        "assemblies": [{"assembly_id": "1", "preferred": True}],
+    })
+
+    assert entry.rcsb_entry_container_identifiers.entry_id == "4HHB"
+    assert entry.rcsb_accession_info.initial_release_date == "1984-07-17T00:00:00+0000"
+    assert entry.rcsb_accession_info.revision_date == "2024-05-22T00:00:00+0000"
+    assert [author.name for author in entry.audit_author] == ["Fermi, G.", "Perutz, M.F."]
+    assert entry.exptl[0].method == "X-RAY DIFFRACTION"
+    assert entry.struct.title.startswith("The crystal structure")
+
+
+def test_pdbj_mmjson_normalised():
+    entry = PDBjMirror.normalise("4hhb", {
+        "struct": {"title": ["Hemoglobin"]},
+        "cell": {"length_a": [63.15], "angle_beta": [99.34]},
+        "exptl": {"method": ["X-RAY DIFFRACTION"]},
+        "pdbx_database_status": {"recvd_initial_deposition_date": ["1984-03-07"], "status_code": ["REL"]},
+        "pdbx_audit_revision_history": {
+            "ordinal": [1, 2],
+            "major_revision": [1, 4],
+            "minor_revision": [0, 2],
+            "revision_date": ["1984-07-17", "2024-05-22"],
+        },
+        "audit_author": {"name": ["Fermi, G.", "Perutz, M.F."], "pdbx_ordinal": [1, None]},
+    })
+
+    assert entry.struct.title == "Hemoglobin"
+    assert entry.cell.length_a == 63.15
+    assert entry.rcsb_accession_info.initial_release_date == "1984-07-17T00:00:00+0000"
+    assert (entry.rcsb_accession_info.major_revision, entry.rcsb_accession_info.minor_revision) == (4, 2)
+    assert entry.rcsb_accession_info.status_code == "REL"
+    assert len(entry.pdbx_audit_revision_history) == 2
+    assert entry.audit_author[1].pdbx_ordinal == 0
+
+
+def test_dates_match_across_mirrors():
+    pdbe = PDBeMirror.normalise("4hhb", {
+        "deposition_date": "19840307", "release_date": "19840717", "revision_date": "20240522",
+    })
+    pdbj = PDBjMirror.normalise("4hhb", {
+        "pdbx_database_status": {"recvd_initial_deposition_date": ["1984-03-07"]},
+        "pdbx_audit_revision_history": {"ordinal": [1, 2], "revision_date": ["1984-07-17", "2024-05-22"]},
+    })
+    fields = ("deposit_date", "initial_release_date", "revision_date")
+
+    rcsb = [getattr(mock_pdb_return.rcsb_accession_info, field) for field in fields]
+    assert [getattr(pdbe.rcsb_accession_info, field) for field in fields] == rcsb
+    assert [getattr(pdbj.rcsb_accession_info, field) for field in fields] == rcsb
+    assert pdbj.pdbx_audit_revision_history[-1].revision_date == rcsb[2]
+
+
+def test_router_ranks_by_latency_ewma():
+    rcsb, pdbe, pdbj = FakeMirror("rcsb"), FakeMirror("pdbe"), FakeMirror("pdbj")
+    router = MirrorRouter([rcsb, pdbe, pdbj])
+
+    # Untried mirrors keep the configured order
+    assert router.ranked() == [rcsb, pdbe, pdbj]
+    assert router.download_link("4HHB") == "https://rcsb/4HHB"
+
+    router.record(rcsb, 0.2, ok=True)
+    router.record(pdbe, 0.05, ok=True)
+    assert router.ranked() == [pdbe, rcsb, pdbj]
+    assert router.download_link("4HHB") == "https://pdbe/4HHB"
+
+    router.record(pdbe, 0.6, ok=True)
+    assert router.latency["pdbe"] == pytest.approx(0.3 * 0.6 + 0.7 * 0.05)
+    assert router.ranked()[0] is rcsb
+
+
+@pytest.mark.asyncio
+async def test_router_fails_over_and_cools_down():
+    rcsb = FakeMirror("rcsb", error=Exception("503"))
+    pdbe, pdbj = FakeMirror("pdbe"), FakeMirror("pdbj")
+    router = MirrorRouter([rcsb, pdbe, pdbj], max_failures=2, cooldown=60)
+
+    entry = await router.fetch_entry("4HHB")
+    assert entry.struct.title == "pdbe"
+    # A failure counts as a timeout, so the next request skips the mirror
+    await router.fetch_entry("4HHB")
+    assert (rcsb.calls, pdbe.calls) == (1, 2)
+    assert router.healthy(rcsb)
+
+    router.record(rcsb, 5, ok=False)
+    assert router.stats()["rcsb"]["healthy"] is False
+    # Behind even untried mirrors while cooling down
+    assert router.ranked() == [pdbe, pdbj, rcsb]
+
+
+@pytest.mark.asyncio
+async def test_router_probes_untried_and_stale_mirrors():
+    rcsb, pdbe, pdbj = FakeMirror("rcsb", delay=0.02), FakeMirror("pdbe"), FakeMirror("pdbj", error=Exception("503"))
+    router = MirrorRouter([rcsb, pdbe, pdbj], probe_interval=0.05)
+
+    await router.fetch_entry("4HHB")
+    assert (rcsb.calls, pdbe.calls, pdbj.calls) == (1, 0, 0)
+
+    await asyncio.sleep(0.06)
+    await router.fetch_entry("4HHB")
+    await asyncio.gather(*router._probes)
+    # Probed in the background, once per interval; the faster one now serves
+    assert (rcsb.calls, pdbe.calls, pdbj.calls) == (2, 1, 1)
+    assert router.latency["pdbj"] == router.timeout
+    assert router.ranked()[0] is pdbe
+    await router.fetch_entry("4HHB")
+    assert (rcsb.calls, pdbe.calls, pdbj.calls) == (2, 2, 1)
+
+    unprobed = MirrorRouter([FakeMirror("rcsb"), FakeMirror("pdbe")], probe_interval=0)
+    await asyncio.sleep(0.01)
+    await unprobed.fetch_entry("4HHB")
+    assert not unprobed._probes and unprobed.mirrors[1].calls == 0
+
+
+@pytest.mark.asyncio
+async def test_router_does_not_fail_over_on_missing_entry():
+    rcsb = FakeMirror("rcsb", error=EntryNotFound("missing"))
+    pdbe = FakeMirror("pdbe")
+    router = MirrorRouter([rcsb, pdbe])
+
+    with pytest.raises(EntryNotFound):
+        await router.fetch_entry("0XXX")
+    assert pdbe.calls == 0
+
+
+@pytest.mark.asyncio
+async def test_router_races_the_two_fastest():
+    slow, fast = FakeMirror("rcsb", delay=0.2), FakeMirror("pdbe", delay=0.01)
+    router = MirrorRouter([slow, fast], race=True)
+
+    entry = await router.fetch_entry("4HHB")
+
+    assert entry.struct.title == "pdbe"
+    assert router.ranked()[0] is fast
+
+
+@pytest.mark.asyncio
+async def test_race_losers_keep_their_own_latency():
+    slow, fast = FakeMirror("rcsb", delay=0.2), FakeMirror("pdbe", delay=0.02)
+    router = MirrorRouter([slow, fast], race=True)
+    router.record(slow, 0.2, ok=True)
+
+    for _ in range(5):
+        await router.fetch_entry("4HHB")
+
+    # The loser's cancelled requests never pull it towards the winner
+    assert router.latency["rcsb"] >= 0.2
+    assert router.latency["pdbe"] < 0.1
+    untried = MirrorRouter([FakeMirror("rcsb", delay=0.2), FakeMirror("pdbe")], race=True)
+    await untried.fetch_entry("4HHB")
+    assert untried.latency["rcsb"] is None
+
+
+@pytest.mark.asyncio
+async def test_rcsb_mirror_fetch(httpx_mock):
+    httpx_mock.add_response(
+        url="https://data.rcsb.org/rest/v1/core/entry/4HHB",
+        json={"rcsb_entry_container_identifiers": {"entry_id": "4HHB"}},
+    )
+    httpx_mock.add_response(url="https://data.rcsb.org/rest/v1/core/entry/0XXX", status_code=404)
+
+    entry = await RCSBMirror().fetch_entry("4HHB", timeout=5)
+    assert entry.rcsb_entry_container_identifiers.entry_id == "4HHB"
+    with pytest.raises(EntryNotFound):
+        await RCSBMirror().fetch_entry("0XXX", timeout=5)
+
+
+@pytest.mark.asyncio
+async def test_structures_fail_over_to_mirrors_serving_bcif(httpx_mock):
+    httpx_mock.add_response(url="https://models.rcsb.org/4HHB.bcif", status_code=503)
+    httpx_mock.add_response(url="https://www.ebi.ac.uk/pdbe/entry-files/download/4hhb.bcif", content=b"bcif")
+    router = MirrorRouter([PDBjMirror(), RCSBMirror(), PDBeMirror()])
+
+    # PDBj serves no BinaryCIF and is skipped
+    assert await router.fetch_structure("4HHB") == b"bcif"
+    assert router._failures == {"pdbj": 0, "rcsb": 1, "pdbe": 0}
+    assert router.download_link("4HHB").endswith(".cif")
+
+
+@pytest.mark.asyncio
+async def test_sequences_fail_over_in_rcsb_form(httpx_mock):
+    alpha, beta = "MVLSPADKTNVKAAWGKVGAHAGEYGAEALERMF", "MHLTPEEKSAVTALWGKVNVDEVGGEALGRLL"
+    httpx_mock.add_response(url="https://www.rcsb.org/fasta/entry/4HHB", status_code=503)
+    httpx_mock.add_response(url="https://www.ebi.ac.uk/pdbe/api/pdb/entry/molecules/4hhb", json={"4hhb": [
+        {"entity_id": 1, "in_chains": ["A", "C"], "molecule_name": ["Hemoglobin subunit alpha"], "sequence": alpha},
+        {"entity_id": 2, "in_chains": ["B", "D"], "molecule_name": ["Hemoglobin subunit beta"], "sequence": beta},
+        {"entity_id": 5, "in_chains": ["I"], "molecule_name": ["water"]},
+    ]})
+    router = MirrorRouter([RCSBMirror(), PDBeMirror()])
+
+    records = await router.fetch_sequences("4HHB")
+
+    assert records == [
+        ("4HHB_1|Chains A, C|Hemoglobin subunit alpha", alpha),
+        ("4HHB_2|Chains B, D|Hemoglobin subunit beta", beta),
+    ]
+    assert router._failures == {"rcsb": 1, "pdbe": 0}
+    assert PDBjMirror.sequences("4hhb", {
+        "entity": {"id": [1, 2], "pdbx_description": ["Hemoglobin subunit alpha", "Hemoglobin subunit beta"]},
+        "entity_poly": {
+            "entity_id": [1, 2],
+            "pdbx_strand_id": ["A,C", "B,D"],
+            "pdbx_seq_one_letter_code_can": [alpha[:20] + "\n" + alpha[20:], beta],
+        },
+    }) == records
+
+
+def test_build_mirrors():
+    mirrors = build_mirrors("pdbe, rcsb", "http://localhost/entry", "http://localhost/models",
+                            "http://localhost/fasta/entry")
+    assert [mirror.name for mirror in mirrors] == ["pdbe", "rcsb"]
+    assert mirrors[1].base_url == "http://localhost/entry"
+    assert mirrors[1].bcif_link("4HHB") == "http://localhost/models/4HHB.bcif"
+    assert mirrors[1].fasta_url == "http://localhost/fasta/entry"
+    with pytest.raises(ValueError):
+        build_mirrors("rcsb,nope")
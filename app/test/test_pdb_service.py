@@ -65,3 +65,23 @@ async def test_parse_protein_data(pdb_service):
     assert parsed_data.primary_accession == expected_protein_data.primary_accession
     assert parsed_data.entry_audit.first_public_date == expected_protein_data.entry_audit.first_public_date
     assert parsed_data.pdb_link == pdb_file_download_link("4HHB")
+
+
+@pytest.mark.asyncio
+async def test_fetch_chain_sequence(pdb_service, httpx_mock):
+    """The chain's entity is picked out of the entry's FASTA records."""
+    httpx_mock.add_response(
+        url="https://www.rcsb.org/fasta/entry/4HHB",
+        text=">4HHB_1|Chains A, C|Hemoglobin subunit alpha|Homo sapiens (9606)\nMVLSPADKTNVKAAWGKVGAHAGEYGAEALERMF\n"
+             ">4HHB_2|Chains B[auth D]|Hemoglobin subunit beta|Homo sapiens (9606)\nMHLTPEEKSAVTALWGKVNVDEVGGEALGRLL\n",
+        is_reusable=True,
+    )
+
+    _, alpha = await pdb_service.fetch_chain_sequence("4HHB", "C")
+    header, beta = await pdb_service.fetch_chain_sequence("4HHB", "D")
+    _, first = await pdb_service.fetch_chain_sequence("4HHB")
+
+    assert alpha == first == "MVLSPADKTNVKAAWGKVGAHAGEYGAEALERMF"
+    assert header.startswith("4HHB_2") and beta.startswith("MHLTPEEK")
+    with pytest.raises(LookupError):
+        await pdb_service.fetch_chain_sequence("4HHB", "Z")
@@ -0,0 +1,50 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from core.config import Config
+from core.profiling import ProfilingMiddleware
+
+
+def make_client(config: Config) -> TestClient:
+    app = FastAPI()
+    app.add_middleware(ProfilingMiddleware, config=config)
+
+    @app.get("/api/v1/protein/{protein_id}")
+    async def protein(protein_id: str):
+        return {"protein_id": protein_id}
+
+    return TestClient(app)
+
+
+def test_profiles_request_with_admin_token(tmp_path):
+    client = make_client(Config(profiling_token="secret", profiling_dir=str(tmp_path)))
+
+    client.get("/api/v1/protein/P12345")
+    assert list(tmp_path.iterdir()) == []
+
+    client.get("/api/v1/protein/P12345", headers={"X-Profile-Token": "wrong"})
+    assert list(tmp_path.iterdir()) == []
+
+    response = client.get("/api/v1/protein/P12345", headers={"X-Profile-Token": "secret"})
+    assert response.status_code == 200
+    profiles = list(tmp_path.iterdir())
+    assert len(profiles) == 1
+    assert profiles[0].name.endswith("-GET-api_v1_protein_P12345.pstats")
+
+
+def test_profiles_sampled_requests(tmp_path):
+    client = make_client(Config(profiling_sample_rate=1.0, profiling_dir=str(tmp_path)))
+
+    client.get("/api/v1/protein/P12345")
+
+    assert len(list(tmp_path.iterdir())) == 1
+
+
+@pytest.mark.parametrize("token,rate,enabled", [
+    ("", 0.0, False),
+    ("secret", 0.0, True),
+    ("", 0.01, True),
+])
+def test_profiling_enabled(token, rate, enabled):
+    config = Config(profiling_token=token, profiling_sample_rate=rate)
+    assert config.profiling_enabled is enabled
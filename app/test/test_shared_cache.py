@@ -0,0 +1,173 @@
+import multiprocessing
+import time
+from schema.protein import ProteinData, EntryAudit
+from service.cache import ProteinCache
+from service import shared_cache
+from service.shared_cache import SharedCache, acquire_leadership
+
+
+def make_protein(accession: str, entry_version: int = 1) -> ProteinData:
+    return ProteinData(
+        primary_accession=accession,
+        sequence=">sp|" + accession + "|TEST\nMKV\n",
+        entry_audit=EntryAudit(entry_version=entry_version),
+    )
+
+
+def test_shared_cache_get_set_delete(tmp_path):
+    shared = SharedCache(str(tmp_path / "cache"), size=1 << 20, shards=4)
+
+    assert shared.get("P12345") is None
+    shared.set("P12345", {"a": 1}, time.time() + 60, version=3)
+    value, _, version = shared.get("P12345")
+    assert value == {"a": 1}
+    assert version == 3
+    assert len(shared) == 1
+
+    shared.set("P12345", {"a": 2}, time.time() + 60)
+    assert shared.get("P12345")[0] == {"a": 2}
+    assert len(shared) == 1
+
+    shared.delete("P12345")
+    assert shared.get("P12345") is None
+    assert len(shared) == 0
+
+
+def test_shared_cache_expiry_and_full_shards(tmp_path):
+    shared = SharedCache(str(tmp_path / "cache"), size=1 << 20, shards=2)
+    shared.set("OLD", "x", time.time() - 1)
+    assert shared.get("OLD") is None
+
+    # Far more than fits: shards are cleared as they fill up
+    for i in range(2000):
+        assert shared.set(f"K{i}", "y" * 1000, time.time() + 60)
+    assert shared.get("K1999")[0] == "y" * 1000
+    assert shared.stats()["shard_resets"] > 0
+    assert not shared.set("HUGE", "z" * (1 << 20), time.time() + 60)
+
+
+def test_rewrites_reuse_shard_space(tmp_path):
+    shared = SharedCache(str(tmp_path / "cache"), size=1 << 20, shards=2)
+    keys = [f"P{i:05d}" for i in range(100)]
+    for key in keys:
+        shared.set(key, "x" * 2000, time.time() + 60)
+
+    # Extending rewrites the slot only; same-sized and smaller values are
+    # overwritten in place, larger ones compact the shard when it fills
+    for round in range(20):
+        for key in keys:
+            assert shared.extend(key, time.time() + 120 + round)
+            shared.set(key, "y" * (1000 + 1000 * (round % 3)), time.time() + 60)
+
+    assert shared.stats()["shard_resets"] == 0
+    assert shared.stats()["shard_compactions"] > 0
+    assert all(shared.get(key)[0] == "y" * 2000 for key in keys)
+    assert len(shared) == 100
+    assert shared.extend("MISSING", time.time() + 60) is None
+
+
+def test_extend_keeps_entries_through_sync_rounds(tmp_path):
+    cache = ProteinCache(shared=SharedCache(str(tmp_path / "cache"), size=8 << 20, shards=8))
+    for i in range(200):
+        # About 13 KB each: the segment holds every entry, but not five
+        # copies of each
+        cache.set(f"P{i:05d}", make_protein(f"P{i:05d}").model_copy(
+            update={"sequence": f">sp|P{i:05d}|TEST\n" + "MKV" * 7000 + "\n"}))
+
+    for _ in range(4):
+        for i in range(200):
+            assert cache.extend(f"P{i:05d}", 86400)
+
+    assert cache.shared.stats()["shard_resets"] == 0
+    assert len(cache.shared) == 200
+    assert cache.shared.get("P00000")[1] > time.time() + 3600
+
+
+def test_shared_cache_delete_keeps_probe_runs(tmp_path):
+    shared = SharedCache(str(tmp_path / "cache"), size=1 << 20, shards=1)
+    keys = [f"P{i:05d}" for i in range(300)]
+    for key in keys:
+        shared.set(key, key, time.time() + 60)
+    for key in keys[::2]:
+        shared.delete(key)
+
+    assert all(shared.get(key) is None for key in keys[::2])
+    assert all(shared.get(key)[0] == key for key in keys[1::2])
+
+
+def _fill(path: str, start: int, count: int):
+    shared = SharedCache(path, size=4 << 20, shards=8)
+    for i in range(start, start + count):
+        shared.set(f"P{i:05d}", make_protein(f"P{i:05d}"), time.time() + 60)
+        assert shared.get(f"P{start:05d}") is not None
+    shared.close()
+
+
+def test_shared_cache_across_processes(tmp_path):
+    path = str(tmp_path / "cache")
+    context = multiprocessing.get_context("fork")
+    workers = [context.Process(target=_fill, args=(path, n * 100, 100)) for n in range(4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+        assert worker.exitcode == 0
+
+    shared = SharedCache(path, size=4 << 20, shards=8)
+    assert len(shared) == 400
+    assert all(shared.get(f"P{i:05d}")[0].primary_accession == f"P{i:05d}" for i in range(400))
+
+
+def test_protein_cache_falls_through_to_shared(tmp_path):
+    path = str(tmp_path / "cache")
+    first = ProteinCache(shared=SharedCache(path, size=1 << 20, shards=4))
+    second = ProteinCache(shared=SharedCache(path, size=1 << 20, shards=4))
+
+    first.set("p12345", make_protein("P12345", entry_version=7))
+    found = second.get("P12345")
+
+    assert found.primary_accession == "P12345"
+    assert found.sequence == ">sp|P12345|TEST\nMKV\n"
+    assert second.stats()["hits"] == 1
+    assert second.stats()["shared"]["hits"] == 1
+    assert [key for key, _, _, version in second.snapshot_entries()] == ["P12345"]
+
+    second.invalidate("P12345")
+    first.clear()
+    assert first.get("P12345") is None
+
+
+def test_local_copies_follow_other_workers_writes(tmp_path):
+    path = str(tmp_path / "cache")
+    first = ProteinCache(shared=SharedCache(path, size=1 << 20, shards=1))
+    second = ProteinCache(shared=SharedCache(path, size=1 << 20, shards=1))
+
+    first.set("P12345", make_protein("P12345", entry_version=1))
+    held = second.lookup("P12345")
+    assert held.data.entry_audit.entry_version == 1
+
+    # Writes to other keys of the shard keep the local copy
+    first.set("P54321", make_protein("P54321"))
+    assert second.lookup("P12345") is held
+    assert second.stats()["shared"]["hits"] == 1
+
+    first.invalidate("P12345")
+    assert "P12345" not in second
+    assert second.get("P12345") is None
+
+    first.set("P12345", make_protein("P12345", entry_version=2))
+    assert second.get("P12345").entry_audit.entry_version == 2
+
+
+def _contend(path: str) -> bool:
+    # A forked child inherits the parent's module state but not its locks
+    shared_cache._leader_fd = None
+    return acquire_leadership(path)
+
+
+def test_single_leader(tmp_path):
+    path = str(tmp_path / "cache")
+    assert acquire_leadership(path)
+    context = multiprocessing.get_context("fork")
+    with context.Pool(1) as pool:
+        assert pool.apply(_contend, (path,)) is False
@@ -0,0 +1,56 @@
+import random
+from service.fasta import ALPHABET
+from service import similarity
+from service.similarity import KmerIndex
+
+
+def random_residues(rng: random.Random, n: int) -> str:
+    return "".join(rng.choice(ALPHABET[:20]) for _ in range(n))
+
+
+def test_search_ranks_by_shared_kmers():
+    rng = random.Random(0)
+    base = random_residues(rng, 300)
+    index = KmerIndex(k=4)
+    index.add("P00001", base)
+    index.add("P00002", base[:150] + random_residues(rng, 150))
+    index.add("P00003", random_residues(rng, 300))
+
+    hits = index.search(base, limit=2)
+
+    assert [hit["accession"] for hit in hits] == ["P00001", "P00002"]
+    assert hits[0]["coverage"] == 1.0
+    assert 0.4 < hits[1]["coverage"] < 0.6
+    assert index.search("MK") == []
+
+
+def test_readding_replaces_sequence():
+    index = KmerIndex(k=3)
+    index.add("P00001", "MKVLAAGIVG")
+    index.add("p00001", "WWWYYYHHHC")
+
+    assert len(index) == 1
+    assert index.search("MKVLAAGIVG") == []
+    assert index.search("WWWYYY")[0]["accession"] == "P00001"
+    assert index.search("WWWYYY", exclude="P00001") == []
+
+
+def test_unchanged_readd_is_skipped_and_retired_numbers_compacted(monkeypatch):
+    monkeypatch.setattr(similarity, "COMPACT_MIN_RETIRED", 4)
+    rng = random.Random(1)
+    index = KmerIndex(k=3)
+    index.add("P00001", "MKVLAAGIVG")
+    index.add("P00001", "MKVLAAGIVG")
+    assert len(index._accessions) == 1
+
+    index.add("P00002", "WWWYYYHHHC")
+    for _ in range(4):
+        index.add("P00001", random_residues(rng, 50))
+    final = random_residues(rng, 50)
+    index.add("P00001", final)
+
+    # Compacted down to the live sequences, which are still found
+    assert len(index._accessions) <= 4
+    assert index.search(final)[0]["accession"] == "P00001"
+    assert index.search("WWWYYYHHHC")[0]["accession"] == "P00002"
+    assert index.search("MKVLAAGIVG") == []
@@ -0,0 +1,152 @@
+import asyncio
+import time
+import pytest
+from unittest.mock import AsyncMock
+from schema.pdb import PDBEntry
+from schema.protein import ProteinData, EntryAudit
+from service.cache import ProteinCache
+from service.shared_cache import SharedCache
+from service.sync import UpstreamSync, parse_id_list, parse_versions
+
+STATUS_URL = "https://files.wwpdb.org/pub/pdb/data/status/latest"
+UNIPROT_URL = "https://rest.uniprot.org/uniprotkb"
+
+
+def make_entry(protein_id: str, entry_version: int = 1, revision_date: str = "") -> ProteinData:
+    return ProteinData(
+        primary_accession=protein_id,
+        entry_audit=EntryAudit(entry_version=entry_version, last_annotation_update_date=revision_date),
+    )
+
+
+@pytest.fixture
+def cache():
+    cache = ProteinCache(ttl=60)
+    cache.set("1ABC", make_entry("1ABC", revision_date="2020-01-01"))
+    cache.set("2ABC", make_entry("2ABC", revision_date="2020-01-01"))
+    cache.set("3ABC", make_entry("3ABC", revision_date="2021-06-01"))
+    cache.set("4ABC", make_entry("4ABC"))
+    cache.set("P00001", make_entry("P00001", entry_version=5))
+    cache.set("P00002", make_entry("P00002", entry_version=7))
+    cache.set("P00003", make_entry("P00003", entry_version=2))
+    return cache
+
+
+@pytest.fixture
+def resolver(cache):
+    resolver = AsyncMock()
+
+    async def fetch_pdb(pdb_id):
+        return PDBEntry(rcsb_accession_info={"revision_date": "2024-05-22" if pdb_id == "2ABC" else "2021-06-01"})
+
+    async def resolve_entry(protein_id, background=False):
+        return cache.set(protein_id, make_entry(protein_id, entry_version=99))
+
+    resolver.pdb_fetch_service.fetch_protein_data.side_effect = fetch_pdb
+    resolver.resolve_entry.side_effect = resolve_entry
+    return resolver
+
+
+def test_parse_lists():
+    assert parse_id_list("1abc\n2ABC\n\nnot-an-id\n") == {"1ABC", "2ABC"}
+    assert parse_versions("Entry\tEntry version\nP00001\t5\nP00002\t8\n") == {"P00001": 5, "P00002": 8}
+
+
+def expires_at(cache: ProteinCache, key: str) -> float:
+    return {k: expiry for k, _, expiry, _ in cache.snapshot_entries()}[key]
+
+
+@pytest.mark.asyncio
+async def test_pdb_sync_refreshes_changed_and_drops_obsolete(cache, resolver, httpx_mock):
+    httpx_mock.add_response(url=f"{STATUS_URL}/modified.pdb", text="2abc\n3abc\n9xyz\n")
+    httpx_mock.add_response(url=f"{STATUS_URL}/obsolete.pdb", text="4abc\n")
+    sync = UpstreamSync(cache, lambda: resolver, verified_ttl=86400)
+
+    await sync.sync_pdb(resolver)
+
+    # 2ABC has a new revision date, 3ABC was modified before it was cached
+    assert [call.args[0] for call in resolver.resolve_entry.call_args_list] == ["2ABC"]
+    assert cache.lookup("2ABC").data.entry_audit.entry_version == 99
+    assert "4ABC" not in cache
+    for key in ("1ABC", "2ABC", "3ABC"):
+        assert expires_at(cache, key) > time.time() + 3600
+    assert expires_at(cache, "P00001") < time.time() + 3600
+    assert sync.progress()["refreshed"] == 1
+
+
+@pytest.mark.asyncio
+async def test_uniprot_sync_compares_entry_versions_once_per_release(cache, resolver, httpx_mock):
+    httpx_mock.add_response(
+        url=f"{UNIPROT_URL}/search?query=*&fields=accession&format=tsv&size=1",
+        text="Entry\n", headers={"X-UniProt-Release": "2024_05"}, is_reusable=True,
+    )
+    httpx_mock.add_response(
+        url=f"{UNIPROT_URL}/search?query=accession%3AP00001+OR+accession%3AP00002+OR+accession%3AP00003"
+            f"&fields=accession%2Cversion&format=tsv&size=3",
+        text="Entry\tEntry version\nP00001\t5\nP00002\t8\n",
+    )
+    sync = UpstreamSync(cache, lambda: resolver, refresh=False, verified_ttl=86400)
+
+    await sync.sync_uniprot(resolver)
+
+    assert "P00001" in cache and expires_at(cache, "P00001") > time.time() + 3600
+    # Changed and dropped without refresh; P00003 is gone upstream
+    assert "P00002" not in cache and "P00003" not in cache
+    resolver.resolve_entry.assert_not_called()
+    assert sync.uniprot_release == "2024_05"
+
+    # Same release: nothing is compared again
+    await sync.sync_uniprot(resolver)
+    assert len(httpx_mock.get_requests()) == 3
+
+
+@pytest.mark.asyncio
+async def test_sync_in_leader_reaches_other_workers(tmp_path, resolver, httpx_mock):
+    path = str(tmp_path / "cache")
+    leader = ProteinCache(ttl=60, shared=SharedCache(path, size=1 << 20, shards=2))
+    worker = ProteinCache(ttl=60, shared=SharedCache(path, size=1 << 20, shards=2))
+    for key in ("2ABC", "3ABC", "4ABC"):
+        leader.set(key, make_entry(key, revision_date="2021-06-01"))
+        assert worker.get(key) is not None
+    resolver.resolve_entry.side_effect = (
+        lambda protein_id, background=False: leader.set(protein_id, make_entry(protein_id, entry_version=99)))
+    httpx_mock.add_response(url=f"{STATUS_URL}/modified.pdb", text="2abc\n3abc\n")
+    httpx_mock.add_response(url=f"{STATUS_URL}/obsolete.pdb", text="4abc\n")
+
+    await UpstreamSync(leader, lambda: resolver, verified_ttl=86400).sync_pdb(resolver)
+
+    # Refreshed and dropped in the worker too; verified entries keep serving
+    assert worker.get("2ABC").entry_audit.entry_version == 99
+    assert worker.get("4ABC") is None
+    assert worker.get("3ABC").entry_audit.last_annotation_update_date == "2021-06-01"
+    assert expires_at(worker, "3ABC") > time.time() + 3600
+
+
+@pytest.mark.asyncio
+async def test_pdb_sync_checks_modified_entries_concurrently(cache, resolver, httpx_mock):
+    httpx_mock.add_response(url=f"{STATUS_URL}/modified.pdb", text="1abc\n2abc\n3abc\n")
+    httpx_mock.add_response(url=f"{STATUS_URL}/obsolete.pdb", text="")
+    in_flight, peak = 0, 0
+
+    async def fetch_pdb(pdb_id):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return PDBEntry(rcsb_accession_info={"revision_date": "2020-01-01"})
+
+    resolver.pdb_fetch_service.fetch_protein_data.side_effect = fetch_pdb
+    sync = UpstreamSync(cache, lambda: resolver, concurrency=2)
+
+    await sync.sync_pdb(resolver, await cache.collect_entries())
+
+    assert peak == 2
+    assert [call.args[0] for call in resolver.resolve_entry.call_args_list] == ["3ABC"]
+
+
+def test_extend_never_shortens(cache):
+    before = expires_at(cache, "P00001")
+    assert cache.extend("P00001", 1)
+    assert expires_at(cache, "P00001") == before
+    assert not cache.extend("P99999", 1)
@@ -2,6 +2,7 @@ import pytest
 from pytest_httpx import HTTPXMock
 from service.uniprot.fetch import UniprotFetchService
 from schema import ProteinData, EntryAudit, Organism
+from service.utils import pdb_file_download_link
 
 # Mock FASTA sequence
 mock_fasta_sequence = ">Mock FASTA Header\nMTEYKLVVVGAGGVGKSALTIQLIQNHFVDEYDPTIEDSYRKQVE\n"
@@ -52,7 +53,8 @@ expected_protein_data = ProteinData(
     isoforms=[],
     features=[],
     pdb_ids=["4HHB"],
-    pdb_link="https://files.rcsb.org/download/4HHB.pdb.gz",
+    # The mmCIF file on the currently fastest mirror
+    pdb_link=pdb_file_download_link("4HHB"),
     sequence=mock_fasta_sequence
 )
 
@@ -74,7 +76,8 @@ async def test_fetch_protein_data(uniprot_service, httpx_mock: HTTPXMock):
         status_code=200
     )
     httpx_mock.add_response(
-        url=f"https://rest.uniprot.org/uniprotkb/{protein_id}?format=fasta",
+        url=f"https://rest.uniprot.org/uniprotkb/stream?query=accession:{protein_id}"
+            f"&format=fasta&includeIsoform=true",
         text=mock_fasta_sequence,
         status_code=200
     )
@@ -100,4 +103,39 @@ def test_parse_protein_data(uniprot_service):
     assert parsed_data.recommended_name == expected_protein_data.recommended_name
     assert parsed_data.entry_audit.first_public_date == expected_protein_data.entry_audit.first_public_date
     assert parsed_data.sequence == expected_protein_data.sequence
-    assert parsed_data.pdb_link == expected_protein_data.pdb_link 
+    assert parsed_data.pdb_link == expected_protein_data.pdb_link
+    assert "cif" in parsed_data.pdb_link and "4hhb" in parsed_data.pdb_link.lower() 
+
+
+@pytest.mark.asyncio
+async def test_fetch_isoform_sequences(uniprot_service, httpx_mock: HTTPXMock):
+    """Isoform sequences come from the same FASTA stream and attach to their isoforms."""
+    protein_id = "P12345"
+    entry = dict(mock_uniprot_response, comments=[{
+        "commentType": "ALTERNATIVE PRODUCTS",
+        "isoforms": [
+            {"name": {"value": "1"}, "isoformIds": ["P12345-1"], "isoformSequenceStatus": "Displayed"},
+            {"name": {"value": "2"}, "isoformIds": ["P12345-2"], "isoformSequenceStatus": "Described"},
+            {"name": {"value": "3"}, "isoformIds": ["Q00000-1"], "isoformSequenceStatus": "External"},
+        ],
+    }])
+    httpx_mock.add_response(
+        url=f"https://rest.uniprot.org/uniprotkb/{protein_id}?format=json",
+        json=entry,
+    )
+    httpx_mock.add_response(
+        url=f"https://rest.uniprot.org/uniprotkb/stream?query=accession:{protein_id}"
+            f"&format=fasta&includeIsoform=true",
+        text=">sp|P12345|MOCK_HUMAN Mock\nMTEYKLVVVG\nAGGV\n"
+             ">sp|P12345-2|MOCK_HUMAN Isoform 2 of Mock\nMTEYK\n",
+    )
+
+    parsed_data = uniprot_service.parse_protein_data(
+        await uniprot_service.fetch_protein_data(protein_id))
+
+    assert parsed_data.sequence == ">sp|P12345|MOCK_HUMAN Mock\nMTEYKLVVVGAGGV\n"
+    assert [(i.isoform_id, i.sequence) for i in parsed_data.isoforms] == [
+        ("P12345-1", "MTEYKLVVVGAGGV"),
+        ("P12345-2", "MTEYK"),
+        ("Q00000-1", None),
+    ]
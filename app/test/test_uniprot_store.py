@@ -0,0 +1,151 @@
+import copy
+import gzip
+import io
+import json
+import pytest
+from schema import ProteinData, EntryAudit
+from service.uniprot import dump
+from service.uniprot.dump import FLAT_FILE, entry_from_text, iter_entry_texts
+from service.uniprot.fetch import UniprotFetchService
+from service.uniprot.importer import run_import
+from service.uniprot.store import UniprotStore
+from test.mock_values import mock_uniprot_return
+
+flat_file_record = """ID   INS_HUMAN               Reviewed;         110 AA.
+AC   P01308; Q5EEX2;
+DT   21-JUL-1986, integrated into UniProtKB/Swiss-Prot.
+DT   21-JUL-1986, sequence version 1.
+DT   27-NOV-2024, entry version 278.
+DE   RecName: Full=Insulin;
+DE   Contains:
+DE     RecName: Full=Insulin B chain;
+OS   Homo sapiens (Human).
+CC   -!- FUNCTION: Insulin decreases blood glucose concentration.
+CC       {ECO:0000269|PubMed:123}.
+CC   -!- SUBCELLULAR LOCATION: Secreted.
+CC   -!- ALTERNATIVE PRODUCTS:
+CC       Event=Alternative splicing; Named isoforms=2;
+CC       Name=1;
+CC         IsoId=P01308-1; Sequence=Displayed;
+CC       Name=2; Synonyms=INS-IGF2;
+CC         IsoId=F8WCM5-1; Sequence=External;
+CC   -!- DISEASE: Hyperproinsulinemia (HPRI) [MIM:616214]: An autosomal
+CC       dominant condition. {ECO:0000269|PubMed:1}. Note=The disease is
+CC       caused by variants affecting the gene represented in this entry.
+CC   ---------------------------------------------------------------------------
+CC   Copyrighted by the UniProt Consortium, see https://www.uniprot.org/terms
+DR   EMBL; J00265; AAA59172.1; -; Genomic_DNA.
+DR   PDB; 1A7F; NMR; -; B=25-54.
+FT   SIGNAL          1..24
+FT   PEPTIDE         25..54
+FT                   /note="Insulin B
+FT                   chain"
+FT                   /id="PRO_0000015819"
+SQ   SEQUENCE   110 AA;  11981 MW;  C2C3B23B85E520E5 CRC64;
+     MALWMRLLPL LALLALWGPD PAAAFVNQHL CGSHLVEALY LVCGERGFFY TPKTRRERED
+     LQVGQVELGG GPGAGSLQPL ALEGSLQKRG IVEQCCTSIC SLYQLENYCN
+//
+"""
+
+
+def json_entries(count: int, entry_version: int = 1) -> list:
+    entries = []
+    for i in range(count):
+        entry = copy.deepcopy(mock_uniprot_return)
+        entry["primaryAccession"] = f"P{i:05d}"
+        entry["entryAudit"]["entryVersion"] = entry_version
+        entries.append(entry)
+    return entries
+
+
+@pytest.mark.parametrize("chunk_size", [1, 5, 1 << 20])
+def test_iter_json_records_layouts(monkeypatch, chunk_size):
+    monkeypatch.setattr(dump, "CHUNK_SIZE", chunk_size)
+    entries = [{"primaryAccession": f"P{i:05d}", "text": 'a "quoted" {[ ]}\\'} for i in range(3)]
+
+    for document in [
+        json.dumps({"results": entries}),
+        json.dumps(entries, indent=2),
+        "\n".join(json.dumps(entry) for entry in entries),
+    ]:
+        texts = iter_entry_texts(io.StringIO(document))
+        assert [json.loads(text) for text in texts] == entries
+
+
+def test_parse_flat_file_record():
+    entry = entry_from_text(flat_file_record, FLAT_FILE)
+    protein = UniprotFetchService().parse_protein_data(entry)
+
+    assert protein.primary_accession == "P01308"
+    assert protein.recommended_name == "Insulin"
+    assert protein.organism.scientific_name == "Homo sapiens"
+    assert protein.organism.common_name == "Human"
+    assert protein.entry_audit == EntryAudit(
+        first_public_date="1986-07-21",
+        last_annotation_update_date="2024-11-27",
+        sequence_version=1,
+        entry_version=278,
+    )
+    assert protein.functions == ["Insulin decreases blood glucose concentration"]
+    assert protein.subcellular_locations == ["Secreted"]
+    assert [(i.isoform_name, i.sequence_status) for i in protein.isoforms] == [
+        ("1", "Displayed"), ("2", "External")]
+    assert protein.disease_associations[0].acronym == "HPRI"
+    assert protein.disease_associations[0].cross_reference == "MIM"
+    assert [(f.type, f.location, f.description) for f in protein.features] == [
+        ("Signal", "1 - 24", ""), ("Peptide", "25 - 54", "Insulin B chain")]
+    assert protein.pdb_ids == ["1A7F"]
+    assert protein.sequence.startswith(">sp|P01308|INS_HUMAN\nMALWMRLLPL")
+
+
+def test_store_only_replaces_newer_versions(tmp_path):
+    store = UniprotStore(str(tmp_path / "store.sqlite"))
+    old = ProteinData(primary_accession="P12345", recommended_name="old")
+    new = ProteinData(primary_accession="P12345", recommended_name="new")
+
+    assert store.put_many([("P12345", 2, UniprotStore.encode(old))]) == 1
+    assert store.put_many([("P12345", 1, UniprotStore.encode(new))]) == 0
+    assert store.get("p12345").recommended_name == "old"
+
+    assert store.put_many([("P12345", 3, UniprotStore.encode(new))]) == 1
+    assert store.get("P12345").recommended_name == "new"
+    assert store.version("P12345") == 3
+    assert store.get("P99999") is None
+
+
+@pytest.mark.parametrize("workers", [0, 2])
+def test_import_json_dump_is_incremental(tmp_path, workers):
+    dump_path = tmp_path / "dump.json.gz"
+    store_path = str(tmp_path / "store.sqlite")
+    with gzip.open(dump_path, "wt") as file:
+        json.dump({"results": json_entries(5)}, file)
+
+    stats = run_import(str(dump_path), store_path, workers=workers, batch_size=2)
+    assert (stats.read, stats.written, stats.skipped, stats.failed) == (5, 5, 0, 0)
+
+    stats = run_import(str(dump_path), store_path, workers=workers, batch_size=2)
+    assert (stats.read, stats.written, stats.skipped) == (5, 0, 5)
+
+    with gzip.open(dump_path, "wt") as file:
+        json.dump({"results": json_entries(2, entry_version=2)}, file)
+    stats = run_import(str(dump_path), store_path, workers=workers, batch_size=2)
+    assert (stats.read, stats.written, stats.skipped) == (2, 2, 0)
+
+    store = UniprotStore(store_path)
+    assert len(store) == 5
+    assert store.get("P00001").entry_audit.entry_version == 2
+    assert store.get("P00004").recommended_name == "Insulin"
+
+
+def test_import_flat_file_and_resolve_locally(tmp_path):
+    dump_path = tmp_path / "uniprot_sprot.dat"
+    dump_path.write_text(flat_file_record)
+    store_path = str(tmp_path / "store.sqlite")
+
+    assert run_import(str(dump_path), store_path).written == 1
+    assert run_import(str(dump_path), store_path).skipped == 1
+
+    service = UniprotFetchService()
+    service.store = UniprotStore(store_path)
+    assert service.get_local("P01308").recommended_name == "Insulin"
+    assert service.get_local("Q99999") is None
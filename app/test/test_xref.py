@@ -0,0 +1,56 @@
+import gzip
+from core.config import Config
+from service.uniprot.store import UniprotStore
+from service.xref import CrossReferenceIndex, load_cross_references
+
+sifts_mapping = """# 2024/12/01 - 12:00 | PDB: 48.24 | UniProt: 2024.06
+PDB\tCHAIN\tSP_PRIMARY\tRES_BEG\tRES_END\tPDB_BEG\tPDB_END\tSP_BEG\tSP_END
+4hhb\tA\tP69905\t1\t141\t1\t141\t2\t142
+4hhb\tB\tP68871\t1\t146\t1\t146\t2\t147
+4hhb\tC\tP69905\t1\t141\t1\t141\t2\t142
+1a7f\tB\tP01308\t1\t29\t1\t29\t25\t53
+"""
+
+
+def test_index_maps_both_directions():
+    index = CrossReferenceIndex()
+    index.add("P69905", ["4HHB", "1a00"])
+    index.add("p68871", ["4hhb"])
+
+    assert index.pdb_ids_for("P69905") == ["1A00", "4HHB"]
+    assert index.accessions_for("4hhb") == ["P68871", "P69905"]
+    assert index.lookup("4HHB") == {"pdb_ids": ["4HHB"], "uniprot_accessions": ["P68871", "P69905"]}
+    assert index.lookup("P69905") == {"pdb_ids": ["1A00", "4HHB"], "uniprot_accessions": ["P69905"]}
+    assert index.accessions_for("9XYZ") == []
+
+
+def test_re_add_replaces_cross_references():
+    index = CrossReferenceIndex()
+    index.add("P69905", ["4HHB", "1A00"])
+    index.add("P68871", ["4HHB"])
+
+    index.add("P69905", ["4HHB", "2DN1"])
+
+    assert index.pdb_ids_for("P69905") == ["2DN1", "4HHB"]
+    assert index.accessions_for("1A00") == []
+    assert index.accessions_for("4HHB") == ["P68871", "P69905"]
+    index.add("P68871", [])
+    assert index.accessions_for("4HHB") == ["P69905"]
+
+
+def test_load_sifts_and_store(tmp_path):
+    sifts_path = tmp_path / "pdb_chain_uniprot.tsv.gz"
+    with gzip.open(sifts_path, "wt") as file:
+        file.write(sifts_mapping)
+    store_path = str(tmp_path / "store.sqlite")
+    store = UniprotStore(store_path)
+    store.put_xrefs([("P01308", ["1A7F", "1AI0"])])
+    store.put_xrefs([("P01308", ["1AI0", "3I3Z"])])
+    index = CrossReferenceIndex()
+
+    loaded = load_cross_references(index, Config(
+        sifts_mapping_path=str(sifts_path), uniprot_store_path=store_path))
+
+    assert loaded == 6
+    assert index.accessions_for("4HHB") == ["P68871", "P69905"]
+    assert index.pdb_ids_for("P01308") == ["1A7F", "1AI0", "3I3Z"]